@@ -133,6 +133,13 @@ BEGIN
   SELECT min(word_id) INTO full_token
     FROM word WHERE word = norm_term and type = 'W';
 
+  IF full_token IS NULL THEN
+    -- Indexing processes may create the same word concurrently.
+    PERFORM pg_advisory_xact_lock(hashtext('nominatim_word'));
+    SELECT min(word_id) INTO full_token
+      FROM word WHERE word = norm_term and type = 'W';
+  END IF;
+
   IF full_token IS NULL THEN
     full_token := nextval('seq_word');
     INSERT INTO word (word_id, word_token, type, word, info)
@@ -153,6 +160,12 @@ BEGIN
     SELECT min(word_id), max(info->>'count') INTO term_id, term_count
       FROM word WHERE word_token = term and type = 'w';
 
+    IF term_id IS NULL THEN
+      PERFORM pg_advisory_xact_lock(hashtext('nominatim_word'));
+      SELECT min(word_id), max(info->>'count') INTO term_id, term_count
+        FROM word WHERE word_token = term and type = 'w';
+    END IF;
+
     IF term_id IS NULL THEN
       term_id := nextval('seq_word');
       term_count := 0;
@@ -176,6 +189,13 @@ BEGIN
   SELECT min(word_id) INTO token
     FROM word WHERE word_token = partial and type = 'w';
 
+  IF token IS NULL THEN
+    -- Indexing processes may create the same word concurrently.
+    PERFORM pg_advisory_xact_lock(hashtext('nominatim_word'));
+    SELECT min(word_id) INTO token
+      FROM word WHERE word_token = partial and type = 'w';
+  END IF;
+
   IF token IS NULL THEN
     token := nextval('seq_word');
     INSERT INTO word (word_id, word_token, type, info)
@@ -197,6 +217,13 @@ BEGIN
   SELECT min(word_id) INTO return_id FROM word
     WHERE word_token = lookup_term and type = 'H';
 
+  IF return_id IS NULL THEN
+    -- Indexing processes may create the same word concurrently.
+    PERFORM pg_advisory_xact_lock(hashtext('nominatim_word'));
+    SELECT min(word_id) INTO return_id FROM word
+      WHERE word_token = lookup_term and type = 'H';
+  END IF;
+
   IF return_id IS NULL THEN
     return_id := nextval('seq_word');
     INSERT INTO word (word_id, word_token, type)
@@ -218,6 +245,13 @@ BEGIN
   SELECT min(word_id) INTO return_id
     FROM word WHERE word = norm_term and type = 'H';
 
+  IF return_id IS NULL THEN
+    -- Indexing processes may create the same word concurrently.
+    PERFORM pg_advisory_xact_lock(hashtext('nominatim_word'));
+    SELECT min(word_id) INTO return_id
+      FROM word WHERE word = norm_term and type = 'H';
+  END IF;
+
   IF return_id IS NULL THEN
     return_id := nextval('seq_word');
     INSERT INTO word (word_id, word_token, type, word, info)
@@ -240,6 +274,13 @@ BEGIN
   SELECT count(*) INTO existing
     FROM word WHERE word = postcode and type = 'P';
 
+  IF existing = 0 THEN
+    -- Indexing processes may create the same word concurrently.
+    PERFORM pg_advisory_xact_lock(hashtext('nominatim_word'));
+    SELECT count(*) INTO existing
+      FROM word WHERE word = postcode and type = 'P';
+  END IF;
+
   IF existing > 0 THEN
     RETURN TRUE;
   END IF;
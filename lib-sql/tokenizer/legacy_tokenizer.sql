@@ -156,6 +156,13 @@ BEGIN
   SELECT min(word_id), max(search_name_count) FROM word
     WHERE word_token = lookup_token and class is null and type is null
     INTO return_word_id, count;
+  IF return_word_id IS NULL THEN
+    -- Indexing processes may create the same word concurrently.
+    PERFORM pg_advisory_xact_lock(hashtext('nominatim_word'));
+    SELECT min(word_id), max(search_name_count) FROM word
+      WHERE word_token = lookup_token and class is null and type is null
+      INTO return_word_id, count;
+  END IF;
   IF return_word_id IS NULL THEN
     return_word_id := nextval('seq_word');
     INSERT INTO word VALUES (return_word_id, lookup_token, null, null, null, null, 0);
@@ -199,6 +206,13 @@ BEGIN
   SELECT min(word_id) FROM word
     WHERE word_token = lookup_token and class='place' and type='house'
     INTO return_word_id;
+  IF return_word_id IS NULL THEN
+    -- Indexing processes may create the same word concurrently.
+    PERFORM pg_advisory_xact_lock(hashtext('nominatim_word'));
+    SELECT min(word_id) FROM word
+      WHERE word_token = lookup_token and class='place' and type='house'
+      INTO return_word_id;
+  END IF;
   IF return_word_id IS NULL THEN
     return_word_id := nextval('seq_word');
     INSERT INTO word VALUES (return_word_id, lookup_token, null,
@@ -227,6 +241,16 @@ BEGIN
     RETURN false;
   END LOOP;
 
+  -- Indexing processes may create the same word concurrently.
+  PERFORM pg_advisory_xact_lock(hashtext('nominatim_word'));
+  FOR r IN
+    SELECT word_id FROM word
+    WHERE word_token = lookup_token and word = postcode
+          and class='place' and type='postcode'
+  LOOP
+    RETURN false;
+  END LOOP;
+
   INSERT INTO word VALUES (nextval('seq_word'), lookup_token, postcode,
                            'place', 'postcode', null, 0);
   RETURN true;
@@ -247,6 +271,13 @@ BEGIN
   SELECT min(word_id) FROM word
   WHERE word_token = lookup_token and class is null and type is null
   INTO return_word_id;
+  IF return_word_id IS NULL THEN
+    -- Indexing processes may create the same word concurrently.
+    PERFORM pg_advisory_xact_lock(hashtext('nominatim_word'));
+    SELECT min(word_id) FROM word
+    WHERE word_token = lookup_token and class is null and type is null
+    INTO return_word_id;
+  END IF;
   IF return_word_id IS NULL THEN
     return_word_id := nextval('seq_word');
     INSERT INTO word VALUES (return_word_id, lookup_token, src_word,
@@ -277,6 +308,13 @@ BEGIN
           FROM word
          WHERE word_token = words[j] and class is null and type is null;
 
+        IF word_ids IS NULL THEN
+          PERFORM pg_advisory_xact_lock(hashtext('nominatim_word'));
+          SELECT array_agg(word_id) INTO word_ids
+            FROM word
+           WHERE word_token = words[j] and class is null and type is null;
+        END IF;
+
         IF word_ids IS NULL THEN
           id := nextval('seq_word');
           INSERT INTO word VALUES (id, words[j], null, null, null, null, 0);
@@ -35,3 +35,4 @@ from .results import (SourceTable as SourceTable,
                       SearchResult as SearchResult,
                       SearchResults as SearchResults)
 from .localization import (Locales as Locales)
+from .result_cache import (CacheStatistics as CacheStatistics)
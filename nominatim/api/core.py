@@ -7,28 +7,42 @@
 """
 Implementation of classes for API access via libraries.
 """
-from typing import Mapping, Optional, Any, AsyncIterator, Dict, Sequence, List, Tuple
+from typing import Mapping, Optional, Any, AsyncIterator, Dict, Sequence, List, Tuple, \
+                   Iterable, Iterator, Deque, Hashable, TypeVar, Union, AsyncContextManager, \
+                   AsyncGenerator
 import asyncio
 import contextlib
+from collections import deque, OrderedDict
+import dataclasses
+import datetime as dt
+import time
 from pathlib import Path
 
 import sqlalchemy as sa
 import sqlalchemy.ext.asyncio as sa_asyncio
+from sqlalchemy.engine.default import CACHE_HIT
 
 from nominatim.errors import UsageError
 from nominatim.db.sqlalchemy_schema import SearchTables
 from nominatim.db.async_core_library import PGCORE_LIB, PGCORE_ERROR
 from nominatim.config import Configuration
 from nominatim.api.connection import SearchConnection
+from nominatim.api.logging import log_enabled
+from nominatim.api.result_cache import ResultCache, CacheStatistics, QuantizationGrid, \
+                                       freeze_value
 from nominatim.api.status import get_status, StatusResult
-from nominatim.api.lookup import get_detailed_place, get_simple_place
+from nominatim.api.lookup import get_detailed_place, get_places
 from nominatim.api.reverse import ReverseGeocoder
 from nominatim.api.search import ForwardGeocoder, Phrase, PhraseType, make_query_analyzer
 import nominatim.api.types as ntyp
-from nominatim.api.results import DetailedResult, ReverseResult, SearchResults
+from nominatim.api.results import DetailedResult, ReverseResult, ReverseResults, \
+                                  SearchResults
 
+T = TypeVar('T')
 
-class NominatimAPIAsync:
+BatchQuery = Union[str, Mapping[str, Optional[str]]]
+
+class NominatimAPIAsync: # pylint: disable=too-many-instance-attributes
     """ API loader asynchornous version.
     """
     def __init__(self, project_dir: Path,
@@ -40,6 +54,24 @@ class NominatimAPIAsync:
         self._engine: Optional[sa_asyncio.AsyncEngine] = None
         self._tables: Optional[SearchTables] = None
         self._property_cache: Dict[str, Any] = {'DB:server_version': 0}
+        self._parallel_lookups = 1
+        self._request_slots: Optional[asyncio.Semaphore] = None
+        self._spare_connections = 0
+
+        self._result_caches: Dict[str, ResultCache[Any]] = {}
+        cache_ttl = self.config.get_int('API_RESULT_CACHE_TTL')
+        cache_size = self.config.get_int('API_SEARCH_CACHE_SIZE')
+        if cache_size > 0:
+            self._result_caches['search'] = ResultCache(cache_size * 1024 * 1024, cache_ttl)
+        cache_size = self.config.get_int('API_REVERSE_CACHE_SIZE')
+        if cache_size > 0:
+            self._result_caches['reverse'] = ResultCache(cache_size * 1024 * 1024, cache_ttl)
+        self._reverse_grid = QuantizationGrid.from_config(
+                                 self.config.get_str_list('API_REVERSE_CACHE_GRID'))
+        self._cache_check_interval = self.config.get_int('API_RESULT_CACHE_CHECK_INTERVAL')
+        self._data_date: Optional[dt.datetime] = None
+        self._data_date_checked = 0.0
+        self._sql_cache_stats = CacheStatistics()
 
 
     async def setup_database(self) -> None:
@@ -55,19 +87,45 @@ class NominatimAPIAsync:
 
             dsn = self.config.get_database_params()
             pool_size = self.config.get_int('API_POOL_SIZE')
+            self._setup_spare_connections(pool_size)
 
             query = {k: v for k, v in dsn.items()
                       if k not in ('user', 'password', 'dbname', 'host', 'port')}
 
+            # Server-side prepared statements are created by the database
+            # driver for every connection.
+            connect_args: Dict[str, Any] = {}
+            prepared_cache_size = self.config.get_int('API_PREPARED_STATEMENT_CACHE_SIZE')
+            if PGCORE_LIB == 'asyncpg':
+                query.setdefault('prepared_statement_cache_size', str(prepared_cache_size))
+            elif prepared_cache_size <= 0:
+                connect_args['prepare_threshold'] = None
+
             dburl = sa.engine.URL.create(
                        f'postgresql+{PGCORE_LIB}',
                        database=dsn.get('dbname'),
                        username=dsn.get('user'), password=dsn.get('password'),
                        host=dsn.get('host'), port=int(dsn['port']) if 'port' in dsn else None,
                        query=query)
-            engine = sa_asyncio.create_async_engine(dburl, future=True,
-                                                    max_overflow=0, pool_size=pool_size,
-                                                    echo=self.config.get_bool('DEBUG_SQL'))
+            engine = sa_asyncio.create_async_engine(
+                         dburl, future=True,
+                         max_overflow=0, pool_size=pool_size + self._spare_connections,
+                         query_cache_size=self.config.get_int('API_QUERY_CACHE_SIZE'),
+                         connect_args=connect_args,
+                         echo=self.config.get_bool('DEBUG_SQL'))
+
+            sql_stats = self._sql_cache_stats
+
+            @sa.event.listens_for(engine.sync_engine, "after_cursor_execute")
+            def _count_cache_use(*args: Any) -> None:
+                # SQLAlchemy keeps compiled statements in a cache that is keyed
+                # on the structure of the statement, i.e. the shape of the
+                # search. The execution context tells if the cache was used.
+                context = args[4]
+                if context is not None and context.cache_hit == CACHE_HIT:
+                    sql_stats.hits += 1
+                else:
+                    sql_stats.misses += 1
 
             try:
                 async with engine.begin() as conn:
@@ -91,6 +149,21 @@ class NominatimAPIAsync:
             self._engine = engine
 
 
+    def _setup_spare_connections(self, pool_size: int) -> None:
+        """ Reserve spare connections for searches that are looked up ahead.
+            They are added to the connection pool on top of `pool_size`,
+            which remains available for the requests. Requests wait for
+            one of their `pool_size` slots. Lookups ahead only take a spare
+            connection when one is free and otherwise run sequentially
+            on the connection of the request.
+        """
+        parallel_lookups = self.config.get_int('API_PARALLEL_LOOKUPS')
+        if parallel_lookups > 1:
+            self._request_slots = asyncio.Semaphore(max(1, pool_size))
+            self._spare_connections = max(1, pool_size) * (parallel_lookups - 1)
+            self._parallel_lookups = parallel_lookups
+
+
     async def close(self) -> None:
         """ Close all active connections to the database. The NominatimAPIAsync
             object remains usable after closing. If a new API functions is
@@ -100,6 +173,22 @@ class NominatimAPIAsync:
             await self._engine.dispose()
 
 
+    def clear_cache(self) -> None:
+        """ Drop all cached property values, the compiled query analysis
+            data derived from them and all cached results. The caches are
+            refilled from the database with the next request.
+
+            Call this function when the tokenizer setup of the database
+            has changed while the API object was in use.
+        """
+        server_version = self._property_cache['DB:server_version']
+        self._property_cache.clear()
+        self._property_cache['DB:server_version'] = server_version
+
+        for cache in self._result_caches.values():
+            cache.clear()
+
+
     @contextlib.asynccontextmanager
     async def begin(self) -> AsyncIterator[SearchConnection]:
         """ Create a new connection with automatic transaction handling.
@@ -111,11 +200,97 @@ class NominatimAPIAsync:
         if self._engine is None:
             await self.setup_database()
 
+        if self._request_slots is None:
+            async with self._connect() as conn:
+                yield conn
+        else:
+            async with self._request_slots, self._connect() as conn:
+                yield conn
+
+
+    @contextlib.asynccontextmanager
+    async def _connect(self) -> AsyncIterator[SearchConnection]:
         assert self._engine is not None
         assert self._tables is not None
 
         async with self._engine.begin() as conn:
-            yield SearchConnection(conn, self._tables, self._property_cache)
+            yield SearchConnection(conn, self._tables, self._property_cache, self.config)
+
+
+    def _take_spare_connection(self) -> Optional[AsyncContextManager[SearchConnection]]:
+        """ Return a connection for looking up a search ahead of time
+            or None when all spare connections are in use. Never waits.
+        """
+        if self._spare_connections <= 0:
+            return None
+
+        self._spare_connections -= 1
+        return self._spare_connection()
+
+
+    @contextlib.asynccontextmanager
+    async def _spare_connection(self) -> AsyncIterator[SearchConnection]:
+        try:
+            async with self._connect() as conn:
+                yield conn
+        finally:
+            self._spare_connections += 1
+
+
+    def _make_geocoder(self, conn: SearchConnection,
+                       details: ntyp.SearchDetails) -> ForwardGeocoder:
+        if self._parallel_lookups > 1:
+            return ForwardGeocoder(conn, details, self._parallel_lookups,
+                                   self._take_spare_connection)
+        return ForwardGeocoder(conn, details)
+
+
+    async def _forward_lookup(self, conn: SearchConnection, details: ntyp.SearchDetails,
+                              phrases: List[Phrase]) -> SearchResults:
+        cache = self._result_caches.get('search')
+        if cache is None or log_enabled():
+            return await self._make_geocoder(conn, details).lookup(phrases)
+
+        await self._check_result_caches(conn)
+
+        key = (tuple((p.ptype, ' '.join(p.text.split()).lower()) for p in phrases),
+               freeze_value(details))
+        results = cache.get(key)
+        if results is None:
+            results = await self._make_geocoder(conn, details).lookup(phrases)
+            cache.put(key, results)
+
+        return results
+
+
+    async def _check_result_caches(self, conn: SearchConnection) -> None:
+        """ Drop the content of the result caches, when the data in the
+            database has been updated. The import date is checked at most
+            every API_RESULT_CACHE_CHECK_INTERVAL seconds.
+        """
+        now = time.monotonic()
+        if now - self._data_date_checked < self._cache_check_interval:
+            return
+        self._data_date_checked = now
+
+        data_date = await conn.scalar(
+                        sa.select(conn.t.import_status.c.lastimportdate).limit(1))
+        if data_date != self._data_date:
+            for cache in self._result_caches.values():
+                cache.clear()
+            self._data_date = data_date
+
+
+    def cache_statistics(self) -> Dict[str, CacheStatistics]:
+        """ Return the usage counters of the enabled result caches.
+            The entry 'sql' counts how often compiled SQL statements
+            could be reused from SQLAlchemy's statement cache.
+        """
+        stats = {name: dataclasses.replace(cache.stats)
+                 for name, cache in self._result_caches.items()}
+        stats['sql'] = dataclasses.replace(self._sql_cache_stats)
+
+        return stats
 
 
     async def status(self) -> StatusResult:
@@ -151,8 +326,7 @@ class NominatimAPIAsync:
         async with self.begin() as conn:
             if details.keywords:
                 await make_query_analyzer(conn)
-            return SearchResults(filter(None,
-                                        [await get_simple_place(conn, p, details) for p in places]))
+            return await get_places(conn, places, details)
 
 
     async def reverse(self, coord: ntyp.AnyPoint, **params: Any) -> Optional[ReverseResult]:
@@ -161,17 +335,86 @@ class NominatimAPIAsync:
             Returns the closest result that can be found or None if
             no place matches the given criteria.
         """
+        details = ntyp.ReverseDetails.from_kwargs(params)
+        if details.keywords:
+            async with self.begin() as conn:
+                await make_query_analyzer(conn)
+
+        return await self._reverse(coord, details)
+
+
+    async def reverse_batch(self, coords: Iterable[ntyp.AnyPoint],
+                            concurrency: Optional[int] = None,
+                            **params: Any) -> AsyncGenerator[Optional[ReverseResult], None]:
+        """ Reverse geocode a sequence of coordinates.
+
+            The coordinates are consumed lazily and up to 'concurrency'
+            of them are looked up at the same time, each on its own
+            connection from the pool. The default is to use all
+            NOMINATIM_API_POOL_SIZE connections. The function yields
+            one result (or None) per coordinate in the order of the input.
+        """
+        details = ntyp.ReverseDetails.from_kwargs(params)
+        num_tasks = self._batch_concurrency(concurrency)
+
+        if details.keywords:
+            async with self.begin() as conn:
+                await make_query_analyzer(conn)
+
+        pending: Deque['asyncio.Task[Optional[ReverseResult]]'] = deque()
+        try:
+            for coord in coords:
+                if len(pending) >= num_tasks:
+                    yield await pending.popleft()
+                pending.append(asyncio.create_task(self._reverse(coord, details)))
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+    def _batch_concurrency(self, concurrency: Optional[int]) -> int:
+        """ Return the number of queries of a batch that may be looked
+            up at the same time. There can be no more than the requests
+            that the pool can serve at once.
+        """
+        max_tasks = max(1, self.config.get_int('API_POOL_SIZE'))
+        return max(1, min(concurrency or max_tasks, max_tasks))
+
+
+    async def _reverse(self, coord: ntyp.AnyPoint,
+                       details: ntyp.ReverseDetails) -> Optional[ReverseResult]:
         # The following negation handles NaN correctly. Don't change.
         if not abs(coord[0]) <= 180 or not abs(coord[1]) <= 90:
             # There are no results to be expected outside valid coordinates.
             return None
 
-        details = ntyp.ReverseDetails.from_kwargs(params)
         async with self.begin() as conn:
-            if details.keywords:
-                await make_query_analyzer(conn)
-            geocoder = ReverseGeocoder(conn, details)
-            return await geocoder.lookup(coord)
+            cache = self._result_caches.get('reverse')
+            # Geometries would differ for every coordinate, so requests
+            # for them are never cached.
+            if cache is None or details.geometry_output or log_enabled():
+                return await ReverseGeocoder(conn, details).lookup(coord)
+
+            cell = self._reverse_grid.cell(coord, details.max_rank)
+            if cell is None:
+                return await ReverseGeocoder(conn, details).lookup(coord)
+
+            await self._check_result_caches(conn)
+
+            key = (cell, freeze_value(details))
+            cached = cache.get(key)
+            if cached is None:
+                result = await ReverseGeocoder(conn, details).lookup(coord)
+                # The distance is only valid for the coordinate of the
+                # request that was looked up.
+                cache.put(key, ReverseResults([dataclasses.replace(result, distance=None)]
+                                              if result is not None else []))
+                return result
+
+            return cached[0] if cached else None
 
 
     async def search(self, query: str, **params: Any) -> SearchResults:
@@ -182,9 +425,9 @@ class NominatimAPIAsync:
             raise UsageError('Nothing to search for.')
 
         async with self.begin() as conn:
-            geocoder = ForwardGeocoder(conn, ntyp.SearchDetails.from_kwargs(params))
             phrases = [Phrase(PhraseType.NONE, p.strip()) for p in query.split(',')]
-            return await geocoder.lookup(phrases)
+            return await self._forward_lookup(conn, ntyp.SearchDetails.from_kwargs(params),
+                                              phrases)
 
 
     # pylint: disable=too-many-arguments,too-many-branches
@@ -239,8 +482,7 @@ class NominatimAPIAsync:
                 if amenity:
                     details.layers |= ntyp.DataLayer.POI
 
-            geocoder = ForwardGeocoder(conn, details)
-            return await geocoder.lookup(phrases)
+            return await self._forward_lookup(conn, details, phrases)
 
 
     async def search_category(self, categories: List[Tuple[str, str]],
@@ -262,10 +504,84 @@ class NominatimAPIAsync:
                 if details.keywords:
                     await make_query_analyzer(conn)
 
-            geocoder = ForwardGeocoder(conn, details)
+            geocoder = self._make_geocoder(conn, details)
             return await geocoder.lookup_pois(categories, phrases)
 
 
+    async def search_batch(self, queries: Iterable[BatchQuery],
+                           concurrency: Optional[int] = None,
+                           dedupe_size: int = 10000,
+                           **params: Any) -> AsyncGenerator[SearchResults, None]:
+        """ Geocode a sequence of queries. Each query may either be
+            a free-text query or a mapping with the parameters of a
+            structured search as used by search_address().
+
+            The queries are consumed lazily and up to 'concurrency'
+            of them are looked up at the same time, each on its own
+            connection from the pool. The default is to use all
+            NOMINATIM_API_POOL_SIZE connections. The function yields
+            one result list per query in the order of the input. Queries with nothing to search for
+            yield an empty list.
+
+            Identical queries among the last 'dedupe_size' distinct ones
+            are only looked up once. They yield the same result object.
+        """
+        # Fail early on invalid parameters.
+        ntyp.SearchDetails.from_kwargs(params)
+        num_tasks = self._batch_concurrency(concurrency)
+
+        recent: 'OrderedDict[Hashable, asyncio.Task[SearchResults]]' = OrderedDict()
+        pending: Deque['asyncio.Task[SearchResults]'] = deque()
+        try:
+            for query in queries:
+                if len(pending) >= num_tasks:
+                    yield await pending.popleft()
+                key = _batch_query_key(query)
+                task = recent.get(key)
+                if task is None:
+                    task = asyncio.create_task(self._search_batch_query(query, params))
+                    recent[key] = task
+                    if len(recent) > dedupe_size:
+                        recent.popitem(last=False)
+                else:
+                    recent.move_to_end(key)
+                pending.append(task)
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+    async def _search_batch_query(self, query: BatchQuery,
+                                  params: Mapping[str, Any]) -> SearchResults:
+        try:
+            if isinstance(query, str):
+                return await self.search(query, **params)
+            return await self.search_address(**query, **params)
+        except UsageError:
+            # Nothing to search for.
+            return SearchResults()
+
+
+def _batch_query_key(query: BatchQuery) -> Hashable:
+    if isinstance(query, str):
+        return ' '.join(query.split()).lower()
+
+    return tuple(sorted((k, ' '.join(v.split()).lower()) for k, v in query.items() if v))
+
+
+async def _next_item(results: AsyncIterator[T]) -> List[T]:
+    """ Return a list with the next item of the iterator or an empty list,
+        when the iterator is exhausted.
+    """
+    async for item in results:
+        return [item]
+
+    return []
+
+
 
 class NominatimAPI:
     """ API loader, synchronous version.
@@ -286,6 +602,19 @@ class NominatimAPI:
         self._loop.close()
 
 
+    def clear_cache(self) -> None:
+        """ Drop all cached property values, the compiled query analysis
+            data derived from them and all cached results.
+        """
+        self._async_api.clear_cache()
+
+
+    def cache_statistics(self) -> Dict[str, CacheStatistics]:
+        """ Return the usage counters of the enabled result caches.
+        """
+        return self._async_api.cache_statistics()
+
+
     @property
     def config(self) -> Configuration:
         """ Return the configuration used by the API.
@@ -321,6 +650,18 @@ class NominatimAPI:
         return self._loop.run_until_complete(self._async_api.reverse(coord, **params))
 
 
+    def reverse_batch(self, coords: Iterable[ntyp.AnyPoint],
+                      concurrency: Optional[int] = None,
+                      **params: Any) -> Iterator[Optional[ReverseResult]]:
+        """ Reverse geocode a sequence of coordinates.
+
+            Returns an iterator over the results (or None), one for each
+            coordinate in the order of the input. See
+            NominatimAPIAsync.reverse_batch() for details.
+        """
+        return self._iterate(self._async_api.reverse_batch(coords, concurrency, **params))
+
+
     def search(self, query: str, **params: Any) -> SearchResults:
         """ Find a place by free-text search. Also known as forward geocoding.
         """
@@ -354,3 +695,30 @@ class NominatimAPI:
         """
         return self._loop.run_until_complete(
                    self._async_api.search_category(categories, near_query, **params))
+
+
+    def search_batch(self, queries: Iterable[BatchQuery],
+                     concurrency: Optional[int] = None,
+                     dedupe_size: int = 10000,
+                     **params: Any) -> Iterator[SearchResults]:
+        """ Geocode a sequence of free-text or structured queries.
+
+            Returns an iterator over the result lists, one for each query
+            in the order of the input. See NominatimAPIAsync.search_batch()
+            for details.
+        """
+        return self._iterate(self._async_api.search_batch(queries, concurrency,
+                                                          dedupe_size, **params))
+
+
+    def _iterate(self, results: AsyncGenerator[T, None]) -> Iterator[T]:
+        """ Run an asynchronous generator step by step in the event loop.
+        """
+        try:
+            while True:
+                item = self._loop.run_until_complete(_next_item(results))
+                if not item:
+                    return
+                yield item[0]
+        finally:
+            self._loop.run_until_complete(results.aclose())
@@ -330,6 +330,12 @@ def log() -> BaseLogger:
     return logger.get()
 
 
+def log_enabled() -> bool:
+    """ Check if debug information is collected in the current context.
+    """
+    return type(logger.get()) is not BaseLogger # pylint: disable=unidiomatic-typecheck
+
+
 def get_and_disable() -> str:
     """ Return the current content of the debug buffer and disable logging.
     """
@@ -7,7 +7,9 @@
 """
 Implementation of place lookup by ID.
 """
-from typing import Optional, Callable, Tuple, Type
+from typing import Optional, Callable, Tuple, Type, Sequence, Dict, List, cast
+from collections import defaultdict
+import functools
 import datetime as dt
 
 import sqlalchemy as sa
@@ -23,6 +25,45 @@ RowFunc = Callable[[Optional[SaRow], Type[nres.BaseResultT]], Optional[nres.Base
 GeomFunc = Callable[[SaSelect, SaColumn], SaSelect]
 
 
+def _select_placex(conn: SearchConnection) -> SaSelect:
+    t = conn.t.placex
+    return sa.select(t.c.place_id, t.c.osm_type, t.c.osm_id, t.c.name,
+                     t.c.class_, t.c.type, t.c.admin_level,
+                     t.c.address, t.c.extratags,
+                     t.c.housenumber, t.c.postcode, t.c.country_code,
+                     t.c.importance, t.c.wikipedia, t.c.indexed_date,
+                     t.c.parent_place_id, t.c.rank_address, t.c.rank_search,
+                     t.c.linked_place_id,
+                     t.c.centroid)
+
+
+def _select_osmline(conn: SearchConnection) -> SaSelect:
+    t = conn.t.osmline
+    return sa.select(t.c.place_id, t.c.osm_id, t.c.parent_place_id,
+                     t.c.indexed_date, t.c.startnumber, t.c.endnumber,
+                     t.c.step, t.c.address, t.c.postcode, t.c.country_code,
+                     t.c.linegeo.ST_Centroid().label('centroid'))
+
+
+def _select_tiger(conn: SearchConnection) -> SaSelect:
+    t = conn.t.tiger
+    parent = conn.t.placex
+    return sa.select(t.c.place_id, t.c.parent_place_id,
+                     parent.c.osm_type, parent.c.osm_id,
+                     t.c.startnumber, t.c.endnumber, t.c.step,
+                     t.c.postcode,
+                     t.c.linegeo.ST_Centroid().label('centroid'))\
+             .join(parent, t.c.parent_place_id == parent.c.place_id, isouter=True)
+
+
+def _select_postcode(conn: SearchConnection) -> SaSelect:
+    t = conn.t.postcode
+    return sa.select(t.c.place_id, t.c.parent_place_id,
+                     t.c.rank_search, t.c.rank_address,
+                     t.c.indexed_date, t.c.postcode, t.c.country_code,
+                     t.c.geometry.label('centroid'))
+
+
 
 async def find_in_placex(conn: SearchConnection, place: ntyp.PlaceRef,
                          add_geometries: GeomFunc) -> Optional[SaRow]:
@@ -31,14 +72,7 @@ async def find_in_placex(conn: SearchConnection, place: ntyp.PlaceRef,
     """
     log().section("Find in placex table")
     t = conn.t.placex
-    sql = sa.select(t.c.place_id, t.c.osm_type, t.c.osm_id, t.c.name,
-                    t.c.class_, t.c.type, t.c.admin_level,
-                    t.c.address, t.c.extratags,
-                    t.c.housenumber, t.c.postcode, t.c.country_code,
-                    t.c.importance, t.c.wikipedia, t.c.indexed_date,
-                    t.c.parent_place_id, t.c.rank_address, t.c.rank_search,
-                    t.c.linked_place_id,
-                    t.c.centroid)
+    sql = _select_placex(conn)
 
     if isinstance(place, ntyp.PlaceID):
         sql = sql.where(t.c.place_id == place.place_id)
@@ -63,10 +97,7 @@ async def find_in_osmline(conn: SearchConnection, place: ntyp.PlaceRef,
     """
     log().section("Find in interpolation table")
     t = conn.t.osmline
-    sql = sa.select(t.c.place_id, t.c.osm_id, t.c.parent_place_id,
-                    t.c.indexed_date, t.c.startnumber, t.c.endnumber,
-                    t.c.step, t.c.address, t.c.postcode, t.c.country_code,
-                    t.c.linegeo.ST_Centroid().label('centroid'))
+    sql = _select_osmline(conn)
 
     if isinstance(place, ntyp.PlaceID):
         sql = sql.where(t.c.place_id == place.place_id)
@@ -94,14 +125,7 @@ async def find_in_tiger(conn: SearchConnection, place: ntyp.PlaceRef,
 
     log().section("Find in TIGER table")
     t = conn.t.tiger
-    parent = conn.t.placex
-    sql = sa.select(t.c.place_id, t.c.parent_place_id,
-                    parent.c.osm_type, parent.c.osm_id,
-                    t.c.startnumber, t.c.endnumber, t.c.step,
-                    t.c.postcode,
-                    t.c.linegeo.ST_Centroid().label('centroid'))\
-            .where(t.c.place_id == place.place_id)\
-            .join(parent, t.c.parent_place_id == parent.c.place_id, isouter=True)
+    sql = _select_tiger(conn).where(t.c.place_id == place.place_id)
 
     return (await conn.execute(add_geometries(sql, t.c.linegeo))).one_or_none()
 
@@ -116,11 +140,7 @@ async def find_in_postcode(conn: SearchConnection, place: ntyp.PlaceRef,
 
     log().section("Find in postcode table")
     t = conn.t.postcode
-    sql = sa.select(t.c.place_id, t.c.parent_place_id,
-                    t.c.rank_search, t.c.rank_address,
-                    t.c.indexed_date, t.c.postcode, t.c.country_code,
-                    t.c.geometry.label('centroid')) \
-            .where(t.c.place_id == place.place_id)
+    sql = _select_postcode(conn).where(t.c.place_id == place.place_id)
 
     return (await conn.execute(add_geometries(sql, t.c.geometry))).one_or_none()
 
@@ -194,12 +214,10 @@ async def get_detailed_place(conn: SearchConnection, place: ntyp.PlaceRef,
     return result
 
 
-async def get_simple_place(conn: SearchConnection, place: ntyp.PlaceRef,
-                           details: ntyp.LookupDetails) -> Optional[nres.SearchResult]:
-    """ Retrieve a place as a simple search result from the database.
+def _simple_geometry_func(details: ntyp.LookupDetails) -> GeomFunc:
+    """ Return a function that adds the geometry output columns requested
+        in 'details' to a SQL statement.
     """
-    log().function('get_simple_place', place=place, details=details)
-
     def _add_geometry(sql: SaSelect, col: SaColumn) -> SaSelect:
         if not details.geometry_output:
             return sql
@@ -220,9 +238,17 @@ async def get_simple_place(conn: SearchConnection, place: ntyp.PlaceRef,
 
         return sql.add_columns(*out)
 
+    return _add_geometry
+
+
+async def get_simple_place(conn: SearchConnection, place: ntyp.PlaceRef,
+                           details: ntyp.LookupDetails) -> Optional[nres.SearchResult]:
+    """ Retrieve a place as a simple search result from the database.
+    """
+    log().function('get_simple_place', place=place, details=details)
 
     row_func: RowFunc[nres.SearchResult]
-    row, row_func = await find_in_all_tables(conn, place, _add_geometry)
+    row, row_func = await find_in_all_tables(conn, place, _simple_geometry_func(details))
 
     if row is None:
         return None
@@ -237,3 +263,176 @@ async def get_simple_place(conn: SearchConnection, place: ntyp.PlaceRef,
     await nres.add_result_details(conn, [result], details)
 
     return result
+
+
+class _PlaceCollector:
+    """ Keeps track of the places of a batch lookup that still need
+        to be found and the rows that were found for the others.
+    """
+
+    def __init__(self, places: Sequence[ntyp.PlaceRef]) -> None:
+        self.places = places
+        self.rows: Dict[int, Tuple[SaRow, RowFunc[nres.SearchResult]]] = {}
+
+
+    def free_place_ids(self) -> Dict[int, List[int]]:
+        """ Return the place IDs that have not been found yet together
+            with the positions in the input list they appear in.
+        """
+        out: Dict[int, List[int]] = defaultdict(list)
+        for i, place in enumerate(self.places):
+            if i not in self.rows and isinstance(place, ntyp.PlaceID):
+                out[place.place_id].append(i)
+        return out
+
+
+    def free_osm_ids(self, osm_type: Optional[str] = None
+                    ) -> Dict[Tuple[str, int], List[int]]:
+        """ Return the OSM objects that have not been found yet together
+            with the positions in the input list they appear in.
+            When 'osm_type' is given, only OSM objects of that type are
+            returned.
+        """
+        out: Dict[Tuple[str, int], List[int]] = defaultdict(list)
+        for i, place in enumerate(self.places):
+            if i not in self.rows and isinstance(place, ntyp.OsmID) \
+               and (osm_type is None or place.osm_type == osm_type):
+                out[(place.osm_type, place.osm_id)].append(i)
+        return out
+
+
+    def is_complete(self) -> bool:
+        """ Check if all places have been found.
+        """
+        return len(self.rows) == len(self.places)
+
+
+    def add_row(self, idx: int, row: SaRow, row_func: RowFunc[nres.SearchResult]) -> None:
+        """ Remember the row found for the place at position 'idx'.
+        """
+        self.rows[idx] = (row, row_func)
+
+
+async def _find_placex_batch(conn: SearchConnection, collector: _PlaceCollector,
+                             add_geometries: GeomFunc) -> None:
+    t = conn.t.placex
+
+    place_ids = collector.free_place_ids()
+    if place_ids:
+        sql = _select_placex(conn).where(t.c.place_id.in_(list(place_ids)))
+        for row in await conn.execute(add_geometries(sql, t.c.geometry)):
+            for idx in place_ids[row.place_id]:
+                collector.add_row(idx, row, nres.create_from_placex_row)
+
+    osm_ids = collector.free_osm_ids()
+    if osm_ids:
+        # Get all candidates and choose the matching class in Python.
+        # Without a class, the first class in alphabetical order is taken.
+        sql = _select_placex(conn)\
+                .where(sa.tuple_(t.c.osm_type, t.c.osm_id).in_(list(osm_ids)))\
+                .order_by(t.c.class_)
+        for row in await conn.execute(add_geometries(sql, t.c.geometry)):
+            for idx in osm_ids[(row.osm_type, row.osm_id)]:
+                if idx not in collector.rows:
+                    osm_class = cast(ntyp.OsmID, collector.places[idx]).osm_class
+                    if not osm_class or osm_class == row.class_:
+                        collector.add_row(idx, row, nres.create_from_placex_row)
+
+
+def _housenumber_distance(hnr: int, row: SaRow) -> int:
+    """ Return how far the house number lies outside of the range
+        of the interpolation row, 0 if the row contains it.
+    """
+    return max(0, hnr - int(row.endnumber), int(row.startnumber) - hnr)
+
+
+async def _find_osmline_batch(conn: SearchConnection, collector: _PlaceCollector,
+                              add_geometries: GeomFunc) -> None:
+    t = conn.t.osmline
+
+    place_ids = collector.free_place_ids()
+    if place_ids:
+        sql = _select_osmline(conn).where(t.c.place_id.in_(list(place_ids)))
+        for row in await conn.execute(add_geometries(sql, t.c.linegeo)):
+            for idx in place_ids[row.place_id]:
+                collector.add_row(idx, row, nres.create_from_osmline_row)
+
+    osm_ids = collector.free_osm_ids('W')
+    if osm_ids:
+        candidates: Dict[int, List[SaRow]] = defaultdict(list)
+        sql = _select_osmline(conn).where(t.c.osm_id.in_([oid for _, oid in osm_ids]))
+        for row in await conn.execute(add_geometries(sql, t.c.linegeo)):
+            candidates[row.osm_id].append(row)
+
+        for (_, osm_id), indexes in osm_ids.items():
+            rows = candidates.get(osm_id)
+            if not rows:
+                continue
+            for idx in indexes:
+                # There may be multiple interpolations for a single way.
+                # If 'class' contains a number, use the one that belongs to that number.
+                osm_class = cast(ntyp.OsmID, collector.places[idx]).osm_class
+                if osm_class and osm_class.isdigit():
+                    row = min(rows, key=functools.partial(_housenumber_distance,
+                                                          int(osm_class)))
+                else:
+                    row = rows[0]
+                collector.add_row(idx, row, nres.create_from_osmline_row)
+
+
+async def _find_postcode_batch(conn: SearchConnection, collector: _PlaceCollector,
+                               add_geometries: GeomFunc) -> None:
+    place_ids = collector.free_place_ids()
+    if place_ids:
+        t = conn.t.postcode
+        sql = _select_postcode(conn).where(t.c.place_id.in_(list(place_ids)))
+        for row in await conn.execute(add_geometries(sql, t.c.geometry)):
+            for idx in place_ids[row.place_id]:
+                collector.add_row(idx, row, nres.create_from_postcode_row)
+
+
+async def _find_tiger_batch(conn: SearchConnection, collector: _PlaceCollector,
+                            add_geometries: GeomFunc) -> None:
+    place_ids = collector.free_place_ids()
+    if place_ids:
+        t = conn.t.tiger
+        sql = _select_tiger(conn).where(t.c.place_id.in_(list(place_ids)))
+        for row in await conn.execute(add_geometries(sql, t.c.linegeo)):
+            for idx in place_ids[row.place_id]:
+                collector.add_row(idx, row, nres.create_from_tiger_row)
+
+
+async def get_places(conn: SearchConnection, places: Sequence[ntyp.PlaceRef],
+                     details: ntyp.LookupDetails) -> nres.SearchResults:
+    """ Retrieve a list of places as simple search results from the database.
+
+        Each data table is queried at most once for place IDs and once
+        for OSM IDs for the complete list. Results are returned in the
+        order of the input list. Places that cannot be found are left out.
+    """
+    log().function('get_places', places=places, details=details)
+
+    collector = _PlaceCollector(places)
+    add_geometries = _simple_geometry_func(details)
+
+    for name, func in (('placex', _find_placex_batch),
+                       ('interpolation', _find_osmline_batch),
+                       ('postcode', _find_postcode_batch),
+                       ('TIGER', _find_tiger_batch)):
+        if collector.is_complete():
+            break
+        log().section(f"Find in {name} table")
+        await func(conn, collector, add_geometries)
+
+    results = nres.SearchResults()
+    for i in range(len(places)):
+        if i in collector.rows:
+            row, row_func = collector.rows[i]
+            result = row_func(row, nres.SearchResult)
+            assert result is not None
+            result.bbox = getattr(row, 'bbox', None)
+            results.append(result)
+
+    await nres.add_result_details(conn, results, details)
+
+    return results
@@ -0,0 +1,196 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+In-process caches for API results.
+"""
+from typing import Any, Callable, Generic, Hashable, Optional, Set, Tuple, TypeVar, List, \
+                   Sequence
+from collections import OrderedDict
+import copy
+import dataclasses
+import enum
+import math
+import sys
+import time
+
+from nominatim.errors import UsageError
+from nominatim.api.types import Bbox, AnyPoint
+
+T = TypeVar('T')
+
+@dataclasses.dataclass
+class CacheStatistics:
+    """ Usage counters of a result cache.
+    """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    size: int = 0
+    """ Estimated memory used by the cached results in bytes.
+    """
+
+    @property
+    def hit_rate(self) -> float:
+        """ Fraction of lookups that could be answered from the cache.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def estimate_size(obj: Any, _seen: Optional[Set[int]] = None) -> int:
+    """ Return a rough estimate of the memory in bytes used by the given
+        object including all objects it references.
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, enum.Enum)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(estimate_size(k, seen) + estimate_size(v, seen)
+                          for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(estimate_size(v, seen) for v in obj)
+    if hasattr(obj, '__dict__'):
+        return size + estimate_size(vars(obj), seen)
+
+    return size
+
+
+def freeze_value(value: Any) -> Hashable:
+    """ Convert a parameter value into a hashable form that can be
+        used as part of a cache key.
+    """
+    if isinstance(value, Bbox):
+        return ('bbox', ) + value.coords
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_value(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze_value(v)) for k, v in value.items()))
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return (type(value).__name__, ) \
+               + tuple(freeze_value(getattr(value, f.name)) for f in dataclasses.fields(value))
+
+    return value # type: ignore[no-any-return]
+
+
+class ResultCache(Generic[T]):
+    """ Least-recently-used cache with a limit on the estimated memory
+        size and a maximum lifetime for each entry.
+
+        Values are copied when they are put into and taken out of the
+        cache, so that callers may freely modify the results they get.
+    """
+
+    def __init__(self, max_size: int, ttl: float,
+                 sizeof: Callable[[Any], int] = estimate_size) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.stats = CacheStatistics()
+        self._entries: 'OrderedDict[Hashable, Tuple[float, int, T]]' = OrderedDict()
+
+
+    def get(self, key: Hashable) -> Optional[T]:
+        """ Return a copy of the cached value for the given key or None
+            if there is no valid entry for the key.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return copy.deepcopy(entry[2])
+            self._remove(key)
+
+        self.stats.misses += 1
+        return None
+
+
+    def put(self, key: Hashable, value: T) -> None:
+        """ Add a copy of the value to the cache. Old entries are evicted
+            when the cache grows beyond its size limit. Values that are
+            larger than the complete cache are not saved.
+        """
+        if key in self._entries:
+            self._remove(key)
+
+        size = self.sizeof(value)
+        if size > self.max_size:
+            return
+
+        while self._entries and self.stats.size + size > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.stats.evictions += 1
+
+        self._entries[key] = (time.monotonic() + self.ttl, size, copy.deepcopy(value))
+        self.stats.size += size
+        self.stats.entries += 1
+
+
+    def clear(self) -> None:
+        """ Remove all entries from the cache. The usage counters are kept.
+        """
+        self._entries.clear()
+        self.stats.size = 0
+        self.stats.entries = 0
+
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.stats.size -= size
+        self.stats.entries -= 1
+
+
+
+class QuantizationGrid:
+    """ Maps coordinates onto the cells of a regular grid. The size of
+        the grid cells depends on the maximum rank requested: the
+        coarser the requested address, the larger the cells.
+    """
+
+    def __init__(self, sizes: Sequence[Tuple[int, float]]) -> None:
+        # Sorted by descending rank, so that the first matching entry wins.
+        self.sizes: List[Tuple[int, float]] = sorted(sizes, reverse=True)
+
+
+    @staticmethod
+    def from_config(setting: Optional[Sequence[str]]) -> 'QuantizationGrid':
+        """ Create a grid from a list of '<min rank>:<cell size>' strings.
+            Raises a UsageError when the list has an invalid format.
+        """
+        sizes = []
+        for item in setting or []:
+            rank, _, size = item.partition(':')
+            try:
+                sizes.append((int(rank), float(size)))
+            except ValueError as exp:
+                raise UsageError(f"Invalid grid definition '{item}'. "
+                                 "Expected '<rank>:<cell size>'.") from exp
+            if sizes[-1][1] < 0.0:
+                raise UsageError(f"Invalid grid definition '{item}'. "
+                                 "Cell size must not be negative.")
+
+        return QuantizationGrid(sizes)
+
+
+    def cell(self, coord: AnyPoint, max_rank: int) -> Optional[Tuple[int, int]]:
+        """ Return the index of the grid cell the coordinate falls into
+            for the given maximum rank or None when no grid is defined
+            for the rank or the cell size is 0.
+        """
+        for rank, size in self.sizes:
+            if max_rank >= rank:
+                if size == 0.0:
+                    return None
+                return math.floor(coord[0] / size), math.floor(coord[1] / size)
+
+        return None
@@ -11,14 +11,16 @@ Data classes are part of the public API while the functions are for
 internal use only. That's why they are implemented as free-standing functions
 instead of member functions.
 """
-from typing import Optional, Tuple, Dict, Sequence, TypeVar, Type, List, Any, Union
+from typing import Optional, Tuple, Dict, Sequence, TypeVar, Type, List, Any, Union, \
+                   Iterable
+from collections import defaultdict
 import enum
 import dataclasses
 import datetime as dt
 
 import sqlalchemy as sa
 
-from nominatim.typing import SaSelect, SaRow, SaColumn
+from nominatim.typing import SaSelect, SaRow, SaColumn, SaFromClause
 from nominatim.api.types import Point, Bbox, LookupDetails
 from nominatim.api.connection import SearchConnection
 from nominatim.api.logging import log
@@ -385,16 +387,13 @@ async def add_result_details(conn: SearchConnection, results: List[BaseResultT],
             await complete_address_details(conn, results)
         if details.linked_places:
             log().comment('Query linked places')
-            for result in results:
-                await complete_linked_places(conn, result)
+            await complete_linked_places(conn, results)
         if details.parented_places:
             log().comment('Query parent places')
-            for result in results:
-                await complete_parented_places(conn, result)
+            await complete_parented_places(conn, results)
         if details.keywords:
             log().comment('Query keywords')
-            for result in results:
-                await complete_keywords(conn, result)
+            await complete_keywords(conn, results)
 
 
 def _result_row_to_address_row(row: SaRow) -> AddressLine:
@@ -420,9 +419,15 @@ def _result_row_to_address_row(row: SaRow) -> AddressLine:
                        distance=row.distance)
 
 
-def _get_housenumber_details(results: List[BaseResultT]) -> Tuple[List[int], List[int]]:
-    places = []
-    hnrs = []
+AddressKey = Tuple[int, int]
+
+def _get_housenumber_details(results: List[BaseResultT]) -> Dict[AddressKey, List[BaseResultT]]:
+    """ Group the results by the (place_id, housenumber) pair for which
+        the address needs to be computed. Results without a place_id are
+        left out. The dictionary keeps the order in which the keys first
+        appear in the results.
+    """
+    out: Dict[AddressKey, List[BaseResultT]] = {}
     for result in results:
         if result.place_id:
             housenumber = -1
@@ -432,18 +437,47 @@ def _get_housenumber_details(results: List[BaseResultT]) -> Tuple[List[int], Lis
                 elif result.extratags is not None and 'startnumber' in result.extratags:
                     # details requests do not come with a specific house number
                     housenumber = int(result.extratags['startnumber'])
-            places.append(result.place_id)
-            hnrs.append(housenumber)
+            out.setdefault((result.place_id, housenumber), []).append(result)
+
+    return out
 
-    return places, hnrs
+
+def _set_address_rows(results: List[BaseResultT], lines: AddressLines) -> None:
+    """ Give all results the given address lines. When the same place
+        appears multiple times in the results, each result gets its own
+        copy of the lines.
+    """
+    results[0].address_rows = lines
+    for result in results[1:]:
+        result.address_rows = AddressLines(dataclasses.replace(l) for l in lines)
+
+
+def _add_address_rows(keyed_results: Dict[AddressKey, List[BaseResultT]],
+                      rows: Iterable[SaRow]) -> None:
+    """ Assign address rows to the results they belong to. The rows
+        must be grouped by 'result_place_id' and 'result_housenumber'.
+    """
+    current_key = None
+    current_lines = AddressLines()
+    for row in rows:
+        key = (row.result_place_id, row.result_housenumber)
+        if key != current_key:
+            if current_key is not None:
+                _set_address_rows(keyed_results[current_key], current_lines)
+            current_key = key
+            current_lines = AddressLines()
+        current_lines.append(_result_row_to_address_row(row))
+
+    if current_key is not None:
+        _set_address_rows(keyed_results[current_key], current_lines)
 
 
 async def complete_address_details(conn: SearchConnection, results: List[BaseResultT]) -> None:
     """ Retrieve information about places that make up the address of the result.
     """
-    places, hnrs = _get_housenumber_details(results)
+    keyed_results = _get_housenumber_details(results)
 
-    if not places:
+    if not keyed_results:
         return
 
     def _get_addressdata(place_id: Union[int, SaColumn], hnr: Union[int, SaColumn]) -> Any:
@@ -462,9 +496,10 @@ async def complete_address_details(conn: SearchConnection, results: List[BaseRes
                         joins_implicitly=True)
 
 
-    if len(places) == 1:
+    if len(keyed_results) == 1:
         # Optimized case for exactly one result (reverse)
-        sql = sa.select(_get_addressdata(places[0], hnrs[0]))\
+        (place_id, hnr), key_results = next(iter(keyed_results.items()))
+        sql = sa.select(_get_addressdata(place_id, hnr))\
                 .order_by(sa.column('rank_address').desc(),
                           sa.column('isaddress').desc())
 
@@ -472,13 +507,11 @@ async def complete_address_details(conn: SearchConnection, results: List[BaseRes
         for row in await conn.execute(sql):
             alines.append(_result_row_to_address_row(row))
 
-        for result in results:
-            if result.place_id == places[0]:
-                result.address_rows = alines
-                return
-
+        _set_address_rows(key_results, alines)
+        return
 
-    darray = sa.func.unnest(conn.t.types.to_array(places), conn.t.types.to_array(hnrs))\
+    darray = sa.func.unnest(conn.t.types.to_array([k[0] for k in keyed_results]),
+                            conn.t.types.to_array([k[1] for k in keyed_results]))\
                     .table_valued( # type: ignore[no-untyped-call]
                        sa.column('place_id', type_= sa.Integer),
                        sa.column('housenumber', type_= sa.Integer)
@@ -486,89 +519,140 @@ async def complete_address_details(conn: SearchConnection, results: List[BaseRes
 
     sfn = _get_addressdata(darray.c.place_id, darray.c.housenumber)
 
-    sql = sa.select(darray.c.place_id.label('result_place_id'), sfn)\
-            .order_by(darray.c.place_id,
+    sql = sa.select(darray.c.place_id.label('result_place_id'),
+                    darray.c.housenumber.label('result_housenumber'), sfn)\
+            .order_by(darray.c.place_id, darray.c.housenumber,
                       sa.column('rank_address').desc(),
                       sa.column('isaddress').desc())
 
-    current_result = None
-    for row in await conn.execute(sql):
-        if current_result is None or row.result_place_id != current_result.place_id:
-            for result in results:
-                if result.place_id == row.result_place_id:
-                    current_result = result
-                    break
-            else:
-                assert False
-            current_result.address_rows = AddressLines()
-        current_result.address_rows.append(_result_row_to_address_row(row))
-
-
-# pylint: disable=consider-using-f-string
-def _placex_select_address_row(conn: SearchConnection,
-                               centroid: Point) -> SaSelect:
+    _add_address_rows(keyed_results, await conn.execute(sql))
+
+
+def _placex_select_address_rows(conn: SearchConnection,
+                                 results: List[BaseResultT]) -> Tuple[SaSelect, SaFromClause]:
+    """ Create the base query for retrieving address rows for all
+        placex results in 'results'. Returns the query and the derived
+        table with the place_id of the results. The caller needs to add
+        the join between the placex table and the derived table.
+        The 'result_place_id' column of the query contains the place_id
+        of the result the row belongs to.
+    """
+    centroids: Dict[int, Point] = {}
+    for result in results:
+        if result.source_table == SourceTable.PLACEX and result.place_id:
+            centroids[result.place_id] = result.centroid
+
+    rtab = sa.func.unnest(conn.t.types.to_array(list(centroids.keys())),
+                          conn.t.types.to_array([c.x for c in centroids.values()]),
+                          conn.t.types.to_array([c.y for c in centroids.values()]))\
+                 .table_valued( # type: ignore[no-untyped-call]
+                     sa.column('place_id', type_=sa.BigInteger),
+                     sa.column('lon', type_=sa.Float),
+                     sa.column('lat', type_=sa.Float)
+                 ).render_derived()
+
     t = conn.t.placex
-    return sa.select(t.c.place_id, t.c.osm_type, t.c.osm_id, t.c.name,
-                     t.c.class_.label('class'), t.c.type,
-                     t.c.admin_level, t.c.housenumber,
-                     sa.literal_column("""ST_GeometryType(geometry) in
-                                        ('ST_Polygon','ST_MultiPolygon')""").label('fromarea'),
-                     t.c.rank_address,
-                     sa.literal_column(
-                         """ST_DistanceSpheroid(geometry, 'SRID=4326;POINT(%f %f)'::geometry,
-                              'SPHEROID["WGS 84",6378137,298.257223563, AUTHORITY["EPSG","7030"]]')
-                         """ % centroid).label('distance'))
-
-
-async def complete_linked_places(conn: SearchConnection, result: BaseResult) -> None:
-    """ Retrieve information about places that link to the result.
+    sql = sa.select(rtab.c.place_id.label('result_place_id'),
+                    t.c.place_id, t.c.osm_type, t.c.osm_id, t.c.name,
+                    t.c.class_.label('class'), t.c.type,
+                    t.c.admin_level, t.c.housenumber,
+                    sa.literal_column("""ST_GeometryType(geometry) in
+                                       ('ST_Polygon','ST_MultiPolygon')""").label('fromarea'),
+                    t.c.rank_address,
+                    sa.func.ST_DistanceSpheroid(
+                        t.c.geometry,
+                        sa.func.ST_SetSRID(sa.func.ST_MakePoint(rtab.c.lon, rtab.c.lat), 4326),
+                        sa.literal_column("""'SPHEROID["WGS 84",6378137,298.257223563,
+                                                       AUTHORITY["EPSG","7030"]]'""")
+                    ).label('distance'))
+
+    return sql, rtab
+
+
+def _results_by_place_id(results: List[BaseResultT]) -> Dict[int, List[BaseResultT]]:
+    out: Dict[int, List[BaseResultT]] = defaultdict(list)
+    for result in results:
+        if result.source_table == SourceTable.PLACEX and result.place_id:
+            out[result.place_id].append(result)
+    return out
+
+
+async def complete_linked_places(conn: SearchConnection, results: List[BaseResultT]) -> None:
+    """ Retrieve information about places that link to the results.
+        All linked places are fetched with a single query.
     """
-    result.linked_rows = AddressLines()
-    if result.source_table != SourceTable.PLACEX:
+    for result in results:
+        result.linked_rows = AddressLines()
+
+    by_place_id = _results_by_place_id(results)
+    if not by_place_id:
         return
 
-    sql = _placex_select_address_row(conn, result.centroid)\
-            .where(conn.t.placex.c.linked_place_id == result.place_id)
+    sql, rtab = _placex_select_address_rows(conn, results)
+    sql = sql.select_from(conn.t.placex.join(rtab,
+                                             conn.t.placex.c.linked_place_id == rtab.c.place_id))
 
     for row in await conn.execute(sql):
-        result.linked_rows.append(_result_row_to_address_row(row))
+        for result in by_place_id[row.result_place_id]:
+            assert result.linked_rows is not None
+            result.linked_rows.append(_result_row_to_address_row(row))
 
 
-async def complete_keywords(conn: SearchConnection, result: BaseResult) -> None:
-    """ Retrieve information about the search terms used for this place.
+async def complete_keywords(conn: SearchConnection, results: List[BaseResultT]) -> None:
+    """ Retrieve information about the search terms used for the results.
+        The search terms for all results are fetched with two queries,
+        one for the search_name table and one for the word table.
 
         Requires that the query analyzer was initialised to get access to
         the word table.
     """
-    t = conn.t.search_name
-    sql = sa.select(t.c.name_vector, t.c.nameaddress_vector)\
-            .where(t.c.place_id == result.place_id)
+    vectors: Dict[int, Tuple[List[int], List[int]]] = {}
 
-    result.name_keywords = []
-    result.address_keywords = []
+    place_ids = list({r.place_id for r in results if r.place_id})
+    if place_ids:
+        t = conn.t.search_name
+        sql = sa.select(t.c.place_id, t.c.name_vector, t.c.nameaddress_vector)\
+                .where(t.c.place_id.in_(place_ids))
 
-    t = conn.t.meta.tables['word']
-    sel = sa.select(t.c.word_id, t.c.word_token, t.c.word)
+        for row in await conn.execute(sql):
+            vectors[row.place_id] = (row.name_vector or [], row.nameaddress_vector or [])
 
-    for name_tokens, address_tokens in await conn.execute(sql):
-        for row in await conn.execute(sel.where(t.c.word_id == sa.any_(name_tokens))):
-            result.name_keywords.append(WordInfo(*row))
+    words: Dict[int, WordInfo] = {}
+    word_ids = list({w for names, addresses in vectors.values() for w in names + addresses})
+    if word_ids:
+        t = conn.t.meta.tables['word']
+        sql = sa.select(t.c.word_id, t.c.word_token, t.c.word)\
+                .where(t.c.word_id.in_(word_ids))
 
-        for row in await conn.execute(sel.where(t.c.word_id == sa.any_(address_tokens))):
-            result.address_keywords.append(WordInfo(*row))
+        for row in await conn.execute(sql):
+            words[row.word_id] = WordInfo(*row)
 
+    for result in results:
+        result.name_keywords = []
+        result.address_keywords = []
+        if result.place_id in vectors:
+            name_tokens, address_tokens = vectors[result.place_id]
+            result.name_keywords.extend(words[w] for w in name_tokens if w in words)
+            result.address_keywords.extend(words[w] for w in address_tokens if w in words)
 
-async def complete_parented_places(conn: SearchConnection, result: BaseResult) -> None:
-    """ Retrieve information about places that the result provides the
-        address for.
+
+async def complete_parented_places(conn: SearchConnection, results: List[BaseResultT]) -> None:
+    """ Retrieve information about places that the results provide the
+        address for. All parented places are fetched with a single query.
     """
-    result.parented_rows = AddressLines()
-    if result.source_table != SourceTable.PLACEX:
+    for result in results:
+        result.parented_rows = AddressLines()
+
+    by_place_id = _results_by_place_id(results)
+    if not by_place_id:
         return
 
-    sql = _placex_select_address_row(conn, result.centroid)\
-            .where(conn.t.placex.c.parent_place_id == result.place_id)\
-            .where(conn.t.placex.c.rank_search == 30)
+    sql, rtab = _placex_select_address_rows(conn, results)
+    sql = sql.select_from(conn.t.placex.join(rtab,
+                                             conn.t.placex.c.parent_place_id == rtab.c.place_id))\
+             .where(conn.t.placex.c.rank_search == 30)
 
     for row in await conn.execute(sql):
-        result.parented_rows.append(_result_row_to_address_row(row))
+        for result in by_place_id[row.result_place_id]:
+            assert result.parented_rows is not None
+            result.parented_rows.append(_result_row_to_address_row(row))
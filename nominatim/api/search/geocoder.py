@@ -7,7 +7,8 @@
 """
 Public interface to the search code.
 """
-from typing import List, Any, Optional, Iterator, Tuple
+from typing import List, Any, Optional, Iterator, Tuple, Dict, Callable, AsyncContextManager
+import asyncio
 import itertools
 
 from nominatim.api.connection import SearchConnection
@@ -20,14 +21,29 @@ from nominatim.api.search.query_analyzer_factory import make_query_analyzer, Abs
 from nominatim.api.search.query import Phrase, QueryStruct
 from nominatim.api.logging import log
 
+ConnectionFactory = Callable[[], Optional[AsyncContextManager[SearchConnection]]]
+
 class ForwardGeocoder:
     """ Main class responsible for place search.
+
+        When 'parallel_lookups' is larger than 1 and a 'conn_factory'
+        is given, then up to that many database searches are run
+        concurrently. The first one runs on the connection of the request,
+        the others on additional connections from the factory. The factory
+        must return None instead of waiting, when no connection is free.
+        Such searches are then run later on the connection of the request.
+        The results are still evaluated strictly in order, so that
+        the outcome is the same as with sequential execution.
     """
 
-    def __init__(self, conn: SearchConnection, params: SearchDetails) -> None:
+    def __init__(self, conn: SearchConnection, params: SearchDetails,
+                 parallel_lookups: int = 1,
+                 conn_factory: Optional[ConnectionFactory] = None) -> None:
         self.conn = conn
         self.params = params
         self.query_analyzer: Optional[AbstractQueryAnalyzer] = None
+        self.parallel_lookups = parallel_lookups if conn_factory is not None else 1
+        self.conn_factory = conn_factory
 
 
     @property
@@ -74,16 +90,36 @@ class ForwardGeocoder:
         num_results = 0
         min_ranking = 1000.0
         prev_penalty = 0.0
-        for i, search in enumerate(searches):
-            if search.penalty > prev_penalty and (search.penalty > min_ranking or i > 20):
-                break
-            log().table_dump(f"{i + 1}. Search", _dump_searches([search], query))
-            for result in await search.lookup(self.conn, self.params):
-                results.append(result)
-                min_ranking = min(min_ranking, result.ranking + 0.5, search.penalty + 0.3)
-            log().result_dump('Results', ((r.accuracy, r) for r in results[num_results:]))
-            num_results = len(results)
-            prev_penalty = search.penalty
+        pending: Dict[int, 'asyncio.Task[Optional[SearchResults]]'] = {}
+        try:
+            for i, search in enumerate(searches):
+                if search.penalty > prev_penalty and (search.penalty > min_ranking or i > 20):
+                    break
+                log().table_dump(f"{i + 1}. Search", _dump_searches([search], query))
+                if self.parallel_lookups > 1:
+                    # Start the lookups for the next searches in the list
+                    # ahead of time. Their results are only used, when the
+                    # loop gets to them.
+                    for j in range(i + 1, min(i + self.parallel_lookups, len(searches))):
+                        if j not in pending:
+                            pending[j] = asyncio.create_task(
+                                             self._pooled_lookup(searches[j]))
+                lookup_results = None
+                if i in pending:
+                    lookup_results = await pending.pop(i)
+                if lookup_results is None:
+                    lookup_results = await search.lookup(self.conn, self.params)
+                for result in lookup_results:
+                    results.append(result)
+                    min_ranking = min(min_ranking, result.ranking + 0.5, search.penalty + 0.3)
+                log().result_dump('Results', ((r.accuracy, r) for r in results[num_results:]))
+                num_results = len(results)
+                prev_penalty = search.penalty
+        finally:
+            # Lookups that were started ahead but are not needed anymore.
+            for task in pending.values():
+                task.cancel()
+            await asyncio.gather(*pending.values(), return_exceptions=True)
 
         if results:
             min_ranking = min(r.ranking for r in results)
@@ -102,6 +138,19 @@ class ForwardGeocoder:
         return results
 
 
+    async def _pooled_lookup(self, search: AbstractSearch) -> Optional[SearchResults]:
+        """ Run the lookup for the given search on a separate connection.
+            Returns None when the factory has no free connection.
+        """
+        assert self.conn_factory is not None
+        connection = self.conn_factory()
+        if connection is None:
+            return None
+
+        async with connection as conn:
+            return await search.lookup(conn, self.params)
+
+
     async def lookup_pois(self, categories: List[Tuple[str, str]],
                           phrases: List[Phrase]) -> SearchResults:
         """ Look up places by category. If phrase is given, a place search
@@ -134,10 +134,28 @@ class ICUQueryAnalyzer(AbstractQueryAnalyzer):
     async def setup(self) -> None:
         """ Set up static data structures needed for the analysis.
         """
+        # Compiling the ICU rules is expensive, so the transliterators
+        # are kept in the process-wide cache, keyed by their rules.
         rules = await self.conn.get_property('tokenizer_import_normalisation')
-        self.normalizer = Transliterator.createFromRules("normalization", rules)
-        rules = await self.conn.get_property('tokenizer_import_transliteration')
-        self.transliterator = Transliterator.createFromRules("transliteration", rules)
+
+        async def _make_normalizer() -> Any:
+            return Transliterator.createFromRules("normalization", rules)
+
+        self.normalizer = await self.conn.get_cached_value('ICUTOK', f'normalizer:{rules}',
+                                                           _make_normalizer)
+
+        trans_rules = await self.conn.get_property('tokenizer_import_transliteration')
+
+        async def _make_transliterator() -> Any:
+            return Transliterator.createFromRules("transliteration", trans_rules)
+
+        self.transliterator = await self.conn.get_cached_value('ICUTOK',
+                                                               f'transliterator:{trans_rules}',
+                                                               _make_transliterator)
+
+        self.japanese_splitter = icu_tokenizer_japanese.make_splitter(
+                                     self.conn.config.API_JAPANESE_SPLITTER,
+                                     self.conn.config.API_JAPANESE_MECAB_ARGS)
 
         if 'word' not in self.conn.t.meta.tables:
             sa.Table('word', self.conn.t.meta,
@@ -153,19 +171,12 @@ class ICUQueryAnalyzer(AbstractQueryAnalyzer):
             tokenized query.
         """
         log().section('Analyze query (using ICU tokenizer)')
-        #normalized = list(filter(lambda p: p.text,
-        #                         (qmod.Phrase(p.ptype, self.normalizer.transliterate(p.text))
-        #                          for p in phrases)))
-        splited_address = list(filter(lambda p: p.text,
-                                 (qmod.Phrase(p.ptype, icu_tokenizer_japanese.transliterate(p.text))
-                                  for p in phrases)))
-        normalized = []
-        for p in splited_address:
-          if p.text:
-            if ',' in p.text:
-              normalized.extend([qmod.Phrase(p.ptype, phrase) for phrase in p.text.split(',')])
-            else:
-              normalized.append(qmod.Phrase(p.ptype, p.text))
+        # Japanese addresses are split into prefecture, municipality
+        # and the rest before normalization.
+        normalized = list(filter(lambda p: p.text,
+                                 (qmod.Phrase(p.ptype, self.normalizer.transliterate(part))
+                                  for p in phrases
+                                  for part in self.japanese_splitter.split(p.text))))
 
         query = qmod.QueryStruct(normalized)
         log().var_dump('Normalized query', query.source)
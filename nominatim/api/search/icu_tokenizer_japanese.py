@@ -1,71 +1,127 @@
-import MeCab
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Splitting of Japanese addresses in queries.
+
+Japanese addresses are written without separators. The splitters cut
+off the prefecture and the municipality, so that they can be used as
+separate phrases. Queries that are not recognised as Japanese addresses
+are returned unchanged. This includes Chinese queries, which use the
+same ideographs.
+"""
+from typing import Any, List
+import functools
+import logging
 import re
 
-def convert_kanji_sequence_to_number(sequence):
-  kanji_map = {
-    '零': '0',
-    '一': '1',
-    '二': '2',
-    '三': '3',
-    '四': '4',  
-    '五': '5',
-    '六': '6',
-    '七': '7',
-    '八': '8',
-    '九': '9'
-  }
-  converted = ''
-  current_number = ''
-  for char in sequence:
-    if char in kanji_map:
-      current_number += kanji_map[char]
-    else:
-      converted += current_number
-      current_number = ''
-      converted += char
-  converted += current_number
-  return converted
-
-'''
-def convert_zenkaku_sequence_to_number(sequence):
-  zenkaku_map = {
-    '１': '1',
-    '２': '2',
-    '３': '3',
-    '４': '4',  
-    '５': '5',
-    '６': '6',
-    '７': '7',
-    '８': '8',
-    '９': '9'
-  }
-  converted = ''
-  current_number = ''
-  for char in sequence:
-    if char in zenkaku_map:
-      current_number += zenkaku_map[char]
-    else:
-      converted += current_number
-      current_number = ''
-      converted += char
-  converted += current_number
-  return converted
-'''
-
-def transliterate(text: str) -> str:
-    # split all words first using the normalization library
-    text = convert_kanji_sequence_to_number(text)    
-    pattern = r'''
-           (...??[都道府県])            # [group1] prefecture
-           (.+?[市区町村])              # [group2] municipalities (city/wards/towns/villages)
-           (.+)                        # [group3] other words
-           '''
-    result = re.match(pattern, text, re.VERBOSE) # perform normalization using the pattern
-    joined_group = ''.join([result.group(1),', ',result.group(2),', ',result.group(3)])
-    #print(joined_group)
-    return joined_group
-    
-# this is for debug
-#tmp = '東京都千代田区丸の内１－２'
-#print(transliterate(tmp))
+from nominatim.utils.japanese import normalize_numbers
+
+LOG = logging.getLogger()
+
+# Kana, CJK ideographs and full-width digits.
+_JAPANESE_RE = re.compile('[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uff10-\uff19]')
+
+# The 47 prefectures (都道府県).
+_PREFECTURES = ('北海道', '青森県', '岩手県', '宮城県', '秋田県', '山形県', '福島県',
+                '茨城県', '栃木県', '群馬県', '埼玉県', '千葉県', '東京都', '神奈川県',
+                '新潟県', '富山県', '石川県', '福井県', '山梨県', '長野県', '岐阜県',
+                '静岡県', '愛知県', '三重県', '滋賀県', '京都府', '大阪府', '兵庫県',
+                '奈良県', '和歌山県', '鳥取県', '島根県', '岡山県', '広島県', '山口県',
+                '徳島県', '香川県', '愛媛県', '高知県', '福岡県', '佐賀県', '長崎県',
+                '熊本県', '大分県', '宮崎県', '鹿児島県', '沖縄県')
+
+# Prefecture, optional municipality (市区町村) and the rest.
+_ADDRESS_RE = re.compile(f"({'|'.join(_PREFECTURES)})(.+?[市区町村])?(.*)", re.DOTALL)
+
+# Kana and address counters, which are only used in Japanese.
+_JAPANESE_ONLY_RE = re.compile('[\u3040-\u30ff]|丁目|番地')
+
+_SUFFIXES = frozenset('都道府県市区町村')
+
+
+class JapaneseSplitter:
+    """ Splits Japanese addresses with the help of a regular expression.
+    """
+
+    def split(self, text: str) -> List[str]:
+        """ Split the text into prefecture, municipality and the rest of
+            the address. Numbers are normalized in all parts. Text that
+            starts with none of the 47 prefectures and has neither kana
+            nor Japanese address counters is returned unchanged as a
+            single part, so that Chinese queries are left alone. So is
+            text that cannot be split.
+        """
+        if _JAPANESE_RE.search(text) is None \
+           or (_ADDRESS_RE.match(text) is None and _JAPANESE_ONLY_RE.search(text) is None):
+            return [text]
+
+        text = normalize_numbers(text)
+
+        return [p for p in (part.strip() for part in self._split(text)) if p] or [text]
+
+
+    def _split(self, text: str) -> List[str]:
+        match = _ADDRESS_RE.match(text)
+        if match is None:
+            return [text]
+
+        return [part for part in match.groups() if part]
+
+
+class MecabSplitter(JapaneseSplitter):
+    """ Splits Japanese addresses into words with the MeCab morphological
+        analyzer. The first two words that end in one of the prefecture
+        or municipality suffixes close a part. The remaining words are
+        kept together as the last part, separated by spaces.
+    """
+
+    def __init__(self, tagger: Any) -> None:
+        self.tagger = tagger
+
+
+    def _split(self, text: str) -> List[str]:
+        try:
+            words = self.tagger.parse(text).split()
+        except RuntimeError:
+            return super()._split(text)
+
+        parts: List[str] = []
+        current: List[str] = []
+        for word in words:
+            current.append(word)
+            if len(parts) < 2 and word[-1] in _SUFFIXES \
+               and (len(word) > 1 or len(current) > 1):
+                parts.append(''.join(current))
+                current = []
+
+        if current:
+            parts.append(' '.join(current))
+
+        return parts
+
+
+@functools.lru_cache(maxsize=None)
+def make_splitter(kind: str, mecab_args: str = '') -> JapaneseSplitter:
+    """ Return the splitter of the given kind, either 'pattern' or 'mecab'.
+        For MeCab, `mecab_args` are additional arguments for the tagger,
+        e.g. to choose the dictionary. The splitters are created once per
+        process. When MeCab is not available, the pattern-based splitter
+        is used instead.
+    """
+    if kind == 'mecab':
+        try:
+            import MeCab # pylint: disable=import-outside-toplevel
+        except ModuleNotFoundError:
+            LOG.warning("MeCab is not installed. Using the pattern-based "
+                        "splitter for Japanese queries.")
+        else:
+            return MecabSplitter(MeCab.Tagger(f'-Owakati {mecab_args}'.strip()))
+    elif kind != 'pattern':
+        LOG.warning("Unknown splitter '%s' for Japanese queries. "
+                    "Using the pattern-based splitter.", kind)
 
+    return JapaneseSplitter()
@@ -7,7 +7,7 @@
 """
 Factory for creating a query analyzer for the configured tokenizer.
 """
-from typing import List, cast, TYPE_CHECKING
+from typing import List, Any, cast, TYPE_CHECKING
 from abc import ABC, abstractmethod
 from pathlib import Path
 import importlib
@@ -35,11 +35,15 @@ async def make_query_analyzer(conn: SearchConnection) -> AbstractQueryAnalyzer:
     """
     name = await conn.get_property('tokenizer')
 
-    src_file = Path(__file__).parent / f'{name}_tokenizer.py'
-    if not src_file.is_file():
-        log().comment(f"No tokenizer named '{name}' available. Database not set up properly.")
-        raise RuntimeError('Tokenizer not found')
+    async def _load_module() -> Any:
+        src_file = Path(__file__).parent / f'{name}_tokenizer.py'
+        if not src_file.is_file():
+            log().comment(f"No tokenizer named '{name}' available. "
+                          "Database not set up properly.")
+            raise RuntimeError('Tokenizer not found')
 
-    module = importlib.import_module(f'nominatim.api.search.{name}_tokenizer')
+        return importlib.import_module(f'nominatim.api.search.{name}_tokenizer')
+
+    module = await conn.get_cached_value('QUERYANALYZER', name, _load_module)
 
     return cast(AbstractQueryAnalyzer, await module.create_query_analyzer(conn))
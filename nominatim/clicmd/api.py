@@ -7,16 +7,21 @@
 """
 Subcommand definitions for API calls from the command line.
 """
-from typing import Mapping, Dict, Any
+from typing import Mapping, Dict, Any, Deque, Iterator, Optional, TextIO, Tuple
 import argparse
+from collections import deque
 import logging
 import json
 import sys
+from pathlib import Path
 
 from nominatim.tools.exec_utils import run_api_script
 from nominatim.errors import UsageError
 from nominatim.clicmd.args import NominatimArgs
+from nominatim.clicmd.batch import read_batch_input, BatchWriter, BatchCheckpoint, \
+                                   ThroughputLogger
 import nominatim.api as napi
+from nominatim.api.core import BatchQuery
 import nominatim.api.v1 as api_output
 from nominatim.api.v1.helpers import zoom_to_rank, deduplicate_results
 import nominatim.api.logging as loglib
@@ -62,6 +67,128 @@ def _add_api_output_arguments(parser: argparse.ArgumentParser) -> None:
                              "Parameter is difference tolerance in degrees."))
 
 
+BATCH_SEARCH_COLUMNS = ('id', 'query', 'place_id', 'osm_type', 'osm_id',
+                        'category', 'type', 'display_name', 'lat', 'lon', 'importance')
+
+BATCH_CHECKPOINT_INTERVAL = 1000
+
+BATCH_REVERSE_COLUMNS = ('id', 'lat', 'lon', 'place_id', 'osm_type', 'osm_id',
+                         'category', 'type', 'display_name',
+                         'place_lat', 'place_lon', 'distance')
+
+def _get_search_params(args: NominatimArgs) -> Dict[str, Any]:
+    return {'max_results': args.limit + min(args.limit, 10),
+            'address_details': True, # needed for display name
+            'geometry_output': args.get_geometry_output(),
+            'geometry_simplification': args.polygon_threshold,
+            'countries': args.countrycodes,
+            'excluded': args.exclude_place_ids,
+            'viewbox': args.viewbox,
+            'bounded_viewbox': args.bounded
+           }
+
+
+def _row_to_query(row: Mapping[str, Any]) -> BatchQuery:
+    if row.get('query'):
+        return str(row['query'])
+
+    return {name: str(row[name]) for name, _ in STRUCTURED_QUERY if row.get(name)}
+
+
+def _search_result_to_csv(row: Mapping[str, Any], results: napi.SearchResults) -> Dict[str, Any]:
+    out = {'id': row.get('id'), 'query': row.get('query')}
+    if results:
+        result = results[0]
+        out.update(place_id=result.place_id,
+                   osm_type=result.osm_object[0] if result.osm_object else None,
+                   osm_id=result.osm_object[1] if result.osm_object else None,
+                   category=result.category[0], type=result.category[1],
+                   display_name=result.display_name,
+                   lat=result.centroid.lat, lon=result.centroid.lon,
+                   importance=result.importance)
+
+    return out
+
+
+def _row_to_point(row: Mapping[str, Any]) -> napi.Point:
+    try:
+        return napi.Point(float(row['lon']), float(row['lat']))
+    except (KeyError, TypeError, ValueError):
+        LOG.warning("Invalid coordinates in batch input: %s", row)
+        # Invalid coordinates will not yield a result.
+        return napi.Point(float('nan'), float('nan'))
+
+
+def _reverse_result_to_csv(row: Mapping[str, Any],
+                           result: Optional[napi.ReverseResult]) -> Dict[str, Any]:
+    out = {'id': row.get('id'), 'lat': row.get('lat'), 'lon': row.get('lon')}
+    if result is not None:
+        out.update(place_id=result.place_id,
+                   osm_type=result.osm_object[0] if result.osm_object else None,
+                   osm_id=result.osm_object[1] if result.osm_object else None,
+                   category=result.category[0], type=result.category[1],
+                   display_name=result.display_name,
+                   place_lat=result.centroid.lat, place_lon=result.centroid.lon,
+                   distance=result.distance)
+
+    return out
+
+
+def _load_batch_checkpoint(args: NominatimArgs,
+                           infile: str) -> Tuple[Optional[BatchCheckpoint], int, int]:
+    """ Return the checkpoint of a batch job together with the number of
+        input rows done and the offset in the output file to resume from.
+        The job starts from the beginning when the output file has gone.
+    """
+    if not args.checkpoint:
+        return None, 0, 0
+
+    checkpoint = BatchCheckpoint(args.checkpoint, infile)
+    done, offset = checkpoint.load()
+    if done:
+        assert args.output_file is not None
+        if not Path(args.output_file).exists():
+            LOG.warning("Output file '%s' not found. Restarting batch from the beginning.",
+                        args.output_file)
+            return checkpoint, 0, 0
+        LOG.warning("Resuming batch after %d rows.", done)
+
+    return checkpoint, done, offset
+
+
+def _open_batch_output(output_file: Optional[str], resume_offset: Optional[int]) -> TextIO:
+    """ Open the output of a batch job. When an offset is given, the
+        existing file is kept up to that point.
+    """
+    if not output_file:
+        return sys.stdout
+
+    # pylint: disable=consider-using-with
+    if resume_offset is None:
+        return open(output_file, 'w', encoding='utf-8', newline='')
+
+    outfd = open(output_file, 'r+', encoding='utf-8', newline='')
+    # Drop everything written after the checkpoint.
+    outfd.seek(resume_offset)
+    outfd.truncate()
+    return outfd
+
+
+def _format_batch_results(args: NominatimArgs, row: Mapping[str, Any],
+                          results: napi.SearchResults) -> Dict[str, Any]:
+    if args.dedupe and len(results) > 1:
+        results = deduplicate_results(results, args.limit)
+
+    if args.batch_output == 'csv':
+        return _search_result_to_csv(row, results)
+
+    options = {'extratags': args.extratags,
+               'namedetails': args.namedetails,
+               'addressdetails': args.addressdetails}
+    return {'input': row,
+            'results': json.loads(api_output.format_result(results, args.format, options))}
+
+
 def _run_api(endpoint: str, args: NominatimArgs, params: Mapping[str, object]) -> int:
     script_file = args.project_dir / 'website' / (endpoint + '.php')
 
@@ -109,22 +236,32 @@ class APISearch:
         group.add_argument('--no-dedupe', action='store_false', dest='dedupe',
                            help='Do not remove duplicates from the result list')
 
+        group = parser.add_argument_group('Batch processing')
+        group.add_argument('--batch', metavar='FILE',
+                           help=("Geocode all rows of a CSV file or a JSON lines file "
+                                 "(.json, .jsonl, .ndjson). Rows need either a 'query' "
+                                 "column or the columns of a structured query. "
+                                 "Use '-' for CSV from stdin."))
+        group.add_argument('--batch-output', choices=['jsonl', 'csv'], default='jsonl',
+                           help='Format of the streamed batch output (default: jsonl)')
+        group.add_argument('--output-file', metavar='FILE',
+                           help='Write batch output to the given file instead of stdout')
+        group.add_argument('--checkpoint', metavar='FILE',
+                           help=("Regularly save the progress of the batch to the given "
+                                 "file and resume from it, when it exists. "
+                                 "Needs --output-file."))
+
 
     def run(self, args: NominatimArgs) -> int:
+        if args.batch:
+            return self._run_batch(args)
+
         if args.format == 'debug':
             loglib.set_log_output('text')
 
         api = napi.NominatimAPI(args.project_dir)
 
-        params: Dict[str, Any] = {'max_results': args.limit + min(args.limit, 10),
-                                  'address_details': True, # needed for display name
-                                  'geometry_output': args.get_geometry_output(),
-                                  'geometry_simplification': args.polygon_threshold,
-                                  'countries': args.countrycodes,
-                                  'excluded': args.exclude_place_ids,
-                                  'viewbox': args.viewbox,
-                                  'bounded_viewbox': args.bounded
-                                 }
+        params = _get_search_params(args)
 
         if args.query:
             results = api.search(args.query, **params)
@@ -164,6 +301,51 @@ class APISearch:
         return 0
 
 
+    def _run_batch(self, args: NominatimArgs) -> int:
+        if args.format in ('xml', 'debug'):
+            raise UsageError(f"Format '{args.format}' is not supported for batch processing.")
+        if args.checkpoint and not args.output_file:
+            raise UsageError("Batch checkpoints need an output file (--output-file).")
+
+        infile = args.batch or '-'
+        checkpoint, done, offset = _load_batch_checkpoint(args, infile)
+
+        api = napi.NominatimAPI(args.project_dir)
+        locales = args.get_locales(api.config.DEFAULT_LANGUAGE)
+
+        rows: Deque[Dict[str, Any]] = deque()
+
+        def _queries() -> Iterator[BatchQuery]:
+            for num, row in enumerate(read_batch_input(infile)):
+                if num >= done:
+                    rows.append(row)
+                    yield _row_to_query(row)
+
+        outfd = _open_batch_output(args.output_file, offset if done else None)
+        try:
+            writer = BatchWriter(args.batch_output, BATCH_SEARCH_COLUMNS,
+                                 fd=outfd, write_header=not done)
+            progress = ThroughputLogger('queries')
+
+            for results in api.search_batch(_queries(), args.threads, **_get_search_params(args)):
+                results.localize(locales)
+                writer.write(_format_batch_results(args, rows.popleft(), results))
+
+                progress.add()
+                if checkpoint is not None and progress.done % BATCH_CHECKPOINT_INTERVAL == 0:
+                    checkpoint.save(done + progress.done, outfd.tell())
+
+            if checkpoint is not None:
+                checkpoint.save(done + progress.done, outfd.tell())
+        finally:
+            if outfd is not sys.stdout:
+                outfd.close()
+
+        progress.done_message()
+
+        return 0
+
+
 class APIReverse:
     """\
     Execute API reverse query.
@@ -176,9 +358,9 @@ class APIReverse:
 
     def add_args(self, parser: argparse.ArgumentParser) -> None:
         group = parser.add_argument_group('Query arguments')
-        group.add_argument('--lat', type=float, required=True,
+        group.add_argument('--lat', type=float,
                            help='Latitude of coordinate to look up (in WGS84)')
-        group.add_argument('--lon', type=float, required=True,
+        group.add_argument('--lon', type=float,
                            help='Longitude of coordinate to look up (in WGS84)')
         group.add_argument('--zoom', type=int,
                            help='Level of detail required for the address')
@@ -189,8 +371,22 @@ class APIReverse:
 
         _add_api_output_arguments(parser)
 
+        group = parser.add_argument_group('Batch processing')
+        group.add_argument('--batch', metavar='FILE',
+                           help=("Look up all coordinates from a CSV file with 'lat' "
+                                 "and 'lon' columns or a JSON lines file "
+                                 "(.json, .jsonl, .ndjson). Use '-' for CSV from stdin."))
+        group.add_argument('--batch-output', choices=['jsonl', 'csv'], default='jsonl',
+                           help='Format of the streamed batch output (default: jsonl)')
+
 
     def run(self, args: NominatimArgs) -> int:
+        if args.batch:
+            return self._run_batch(args)
+
+        if args.lat is None or args.lon is None:
+            raise UsageError("Missing coordinates. Use --lat and --lon or --batch.")
+
         if args.format == 'debug':
             loglib.set_log_output('text')
 
@@ -228,6 +424,50 @@ class APIReverse:
         return 42
 
 
+    def _run_batch(self, args: NominatimArgs) -> int:
+        if args.format in ('xml', 'debug'):
+            raise UsageError(f"Format '{args.format}' is not supported for batch processing.")
+
+        api = napi.NominatimAPI(args.project_dir)
+        locales = args.get_locales(api.config.DEFAULT_LANGUAGE)
+        options = {'extratags': args.extratags,
+                   'namedetails': args.namedetails,
+                   'addressdetails': args.addressdetails}
+
+        rows: Deque[Dict[str, Any]] = deque()
+
+        def _coords() -> Iterator[napi.Point]:
+            for row in read_batch_input(args.batch or '-'):
+                rows.append(row)
+                yield _row_to_point(row)
+
+        writer = BatchWriter(args.batch_output, BATCH_REVERSE_COLUMNS)
+        progress = ThroughputLogger('points')
+
+        for result in api.reverse_batch(
+                          _coords(), args.threads,
+                          max_rank=zoom_to_rank(args.zoom or 18),
+                          layers=args.get_layers(napi.DataLayer.ADDRESS | napi.DataLayer.POI),
+                          address_details=True, # needed for display name
+                          geometry_output=args.get_geometry_output(),
+                          geometry_simplification=args.polygon_threshold):
+            row = rows.popleft()
+            if result is not None:
+                result.localize(locales)
+            if args.batch_output == 'csv':
+                writer.write(_reverse_result_to_csv(row, result))
+            else:
+                writer.write({'input': row,
+                              'result': None if result is None else json.loads(
+                                  api_output.format_result(napi.ReverseResults([result]),
+                                                           args.format, options))})
+            progress.add()
+
+        progress.done_message()
+
+        return 0
+
+
 
 class APILookup:
     """\
@@ -93,6 +93,8 @@ class NominatimArgs:
     no_boundaries: bool
     minrank: int
     maxrank: int
+    metrics_file: Optional[str]
+    metrics_interval: float
 
     # Arguments to 'export'
     output_type: str
@@ -160,12 +162,16 @@ class NominatimArgs:
     viewbox: Optional[str]
     bounded: bool
     dedupe: bool
+    output_file: Optional[str]
+    checkpoint: Optional[str]
 
     # Arguments to 'reverse'
-    lat: float
-    lon: float
+    lat: Optional[float]
+    lon: Optional[float]
     zoom: Optional[int]
     layers: Optional[Sequence[str]]
+    batch: Optional[str]
+    batch_output: str
 
     # Arguments to 'lookup'
     ids: Sequence[str]
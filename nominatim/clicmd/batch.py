@@ -0,0 +1,156 @@
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Helper functions for streaming batch input and output of the API commands.
+"""
+from typing import Iterator, Dict, Any, Sequence, Optional, TextIO, Tuple
+import csv
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+from nominatim.errors import UsageError
+
+LOG = logging.getLogger()
+
+JSONL_SUFFIXES = ('.json', '.jsonl', '.ndjson')
+
+def read_batch_input(filename: str) -> Iterator[Dict[str, Any]]:
+    """ Read the rows of a batch input file one by one. Files ending in
+        '.json', '.jsonl' or '.ndjson' are read as JSON lines, anything
+        else as CSV with a header line. '-' reads CSV from stdin.
+    """
+    if filename == '-':
+        yield from csv.DictReader(sys.stdin)
+        return
+
+    path = Path(filename)
+    if not path.is_file():
+        LOG.fatal("Batch input file '%s' does not exist.", filename)
+        raise UsageError('Cannot access file.')
+
+    with path.open(encoding='utf-8', newline='') as fd:
+        if path.suffix.lower() in JSONL_SUFFIXES:
+            for lineno, line in enumerate(fd, 1):
+                if line.strip():
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError as exp:
+                        raise UsageError(f"Invalid JSON in line {lineno} "
+                                         f"of '{filename}'.") from exp
+                    if not isinstance(row, dict):
+                        raise UsageError(f"Line {lineno} of '{filename}' "
+                                         "is not a JSON object.")
+                    yield row
+        else:
+            yield from csv.DictReader(fd)
+
+
+class BatchWriter:
+    """ Writes output rows one by one as CSV or JSON lines. Each row is
+        flushed immediately, so that the output can be consumed while the
+        batch is still running.
+    """
+
+    def __init__(self, outformat: str, columns: Sequence[str],
+                 fd: Optional[TextIO] = None, write_header: bool = True) -> None:
+        self.fd = fd or sys.stdout
+        self.csv: Optional['csv.DictWriter[str]'] = None
+        if outformat == 'csv':
+            self.csv = csv.DictWriter(self.fd, columns, extrasaction='ignore')
+            if write_header:
+                self.csv.writeheader()
+        elif outformat != 'jsonl':
+            raise UsageError(f"Unknown batch output format '{outformat}'.")
+
+
+    def write(self, row: Dict[str, Any]) -> None:
+        """ Write a single row of output.
+        """
+        if self.csv is not None:
+            self.csv.writerow({k: '' if v is None else v for k, v in row.items()})
+        else:
+            self.fd.write(json.dumps(row, ensure_ascii=False))
+            self.fd.write('\n')
+        self.fd.flush()
+
+
+class BatchCheckpoint:
+    """ Keeps track of how far a batch job has got, so that it can be
+        resumed after an interruption. The checkpoint records the number
+        of input rows done and the size of the output file at that point.
+        Output written after the last checkpoint is discarded when
+        resuming.
+    """
+
+    def __init__(self, filename: str, infile: str) -> None:
+        self.path = Path(filename)
+        self.infile = infile
+
+
+    def load(self) -> Tuple[int, int]:
+        """ Return the number of input rows and the output file offset
+            of the last checkpoint or (0, 0) if there is no checkpoint yet.
+        """
+        if not self.path.exists():
+            return 0, 0
+
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            rows, offset = int(data['rows']), int(data['offset'])
+        except (ValueError, KeyError, TypeError) as exp:
+            raise UsageError(f"Invalid checkpoint file '{self.path}'.") from exp
+
+        if data.get('input') != self.infile:
+            raise UsageError(f"Checkpoint file '{self.path}' belongs to "
+                             f"input file '{data.get('input')}'.")
+
+        return rows, offset
+
+
+    def save(self, rows: int, offset: int) -> None:
+        """ Atomically save a new checkpoint.
+        """
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        tmp.write_text(json.dumps({'input': self.infile, 'rows': rows, 'offset': offset}),
+                       encoding='utf-8')
+        tmp.replace(self.path)
+
+
+class ThroughputLogger:
+    """ Counts processed items and regularly logs the processing speed.
+    """
+
+    def __init__(self, unit: str, log_interval: int = 10000) -> None:
+        self.unit = unit
+        self.log_interval = log_interval
+        self.done = 0
+        self.start_time = time.monotonic()
+
+
+    def rate(self) -> float:
+        """ Return the number of items processed per second so far.
+        """
+        elapsed = time.monotonic() - self.start_time
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+
+    def add(self, num: int = 1) -> None:
+        """ Mark the given number of items as processed.
+        """
+        self.done += num
+        if self.done % self.log_interval < num:
+            LOG.info("Done %d %s @ %.1f %s/s", self.done, self.unit, self.rate(), self.unit)
+
+
+    def done_message(self) -> None:
+        """ Log the final statistics.
+        """
+        LOG.warning("Processed %d %s in %.1f s @ %.1f %s/s", self.done, self.unit,
+                    time.monotonic() - self.start_time, self.rate(), self.unit)
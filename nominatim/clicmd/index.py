@@ -7,19 +7,37 @@
 """
 Implementation of the 'index' subcommand.
 """
+from typing import Iterator, Optional, TextIO
 import argparse
+import contextlib
+import json
+import logging
+import sys
 
 import psutil
 
 from nominatim.db import status
 from nominatim.db.connection import connect
 from nominatim.clicmd.args import NominatimArgs
+from nominatim.errors import UsageError
 
 # Do not repeat documentation of subcommand classes.
 # pylint: disable=C0111
 # Using non-top-level imports to avoid eventually unused imports.
 # pylint: disable=E0012,C0415
 
+LOG = logging.getLogger()
+
+@contextlib.contextmanager
+def _open_metrics_file(filename: Optional[str]) -> Iterator[Optional[TextIO]]:
+    if filename is None:
+        yield None
+    elif filename == '-':
+        yield sys.stdout
+    else:
+        with open(filename, 'w', encoding='utf-8') as fd:
+            yield fd
+
 
 class UpdateIndex:
     """\
@@ -41,24 +59,49 @@ class UpdateIndex:
                            help='Minimum/starting rank')
         group.add_argument('--maxrank', '-R', type=int, metavar='RANK', default=30,
                            help='Maximum/finishing rank')
+        group = parser.add_argument_group('Metrics arguments')
+        group.add_argument('--metrics-file', metavar='FILE',
+                           help="""Write a report with timings and throughput of
+                                   the indexing steps as JSON to the given file
+                                   ('-' for stdout). Without this option, the
+                                   report is logged in verbose mode.""")
+        group.add_argument('--metrics-interval', type=float, metavar='SECONDS', default=0,
+                           help="""Also write a snapshot of the metrics to the
+                                   metrics file in the given interval. Every
+                                   snapshot and the final report is written
+                                   as a single line.""")
 
 
     def run(self, args: NominatimArgs) -> int:
-        from ..indexer.indexer import Indexer
+        from ..indexer.indexer import Indexer, IndexerSettings
+        from ..indexer.metrics import IndexerMetrics
         from ..tokenizer import factory as tokenizer_factory
 
+        if args.metrics_interval > 0 and not args.metrics_file:
+            raise UsageError("Metrics snapshots need a metrics file (--metrics-file).")
+
         tokenizer = tokenizer_factory.get_tokenizer_for_db(args.config)
 
-        indexer = Indexer(args.config.get_libpq_dsn(), tokenizer,
-                          args.threads or psutil.cpu_count() or 1)
+        with _open_metrics_file(args.metrics_file) as metrics_fd:
+            metrics = IndexerMetrics(metrics_fd, args.metrics_interval)
+            indexer = Indexer(args.config.get_libpq_dsn(), tokenizer,
+                              args.threads or psutil.cpu_count() or 1,
+                              IndexerSettings.from_config(args.config),
+                              metrics=metrics)
+
+            if not args.no_boundaries:
+                indexer.index_boundaries(args.minrank, args.maxrank)
+            if not args.boundaries_only:
+                indexer.index_by_rank(args.minrank, args.maxrank)
 
-        if not args.no_boundaries:
-            indexer.index_boundaries(args.minrank, args.maxrank)
-        if not args.boundaries_only:
-            indexer.index_by_rank(args.minrank, args.maxrank)
+            if metrics_fd is None:
+                LOG.info("Indexing metrics: %s", json.dumps(metrics.report()))
+            else:
+                metrics.write(metrics_fd)
 
         if not args.no_boundaries and not args.boundaries_only \
            and args.minrank == 0 and args.maxrank == 30:
+            indexer.clear_checkpoints()
             with connect(args.config.get_libpq_dsn()) as conn:
                 status.set_indexed(conn, True)
 
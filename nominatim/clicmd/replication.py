@@ -126,7 +126,7 @@ class UpdateReplication:
     def _update(self, args: NominatimArgs) -> None:
         # pylint: disable=too-many-locals
         from ..tools import replication
-        from ..indexer.indexer import Indexer
+        from ..indexer.indexer import Indexer, IndexerSettings
         from ..tokenizer import factory as tokenizer_factory
 
         update_interval = self._compute_update_interval(args)
@@ -145,7 +145,8 @@ class UpdateReplication:
             recheck_interval = args.config.get_int('REPLICATION_RECHECK_INTERVAL')
 
         tokenizer = tokenizer_factory.get_tokenizer_for_db(args.config)
-        indexer = Indexer(args.config.get_libpq_dsn(), tokenizer, args.threads or 1)
+        indexer = Indexer(args.config.get_libpq_dsn(), tokenizer, args.threads or 1,
+                          IndexerSettings.from_config(args.config))
 
         dsn = args.config.get_libpq_dsn()
 
@@ -67,10 +67,10 @@ class SetupAll:
                            help='Do not perform analyse operations during index (expert only)')
 
 
-    def run(self, args: NominatimArgs) -> int: # pylint: disable=too-many-statements
+    def run(self, args: NominatimArgs) -> int: # pylint: disable=too-many-statements,too-many-locals
         from ..data import country_info
         from ..tools import database_import, refresh, postcodes, freeze
-        from ..indexer.indexer import Indexer
+        from ..indexer.indexer import Indexer, IndexerSettings
 
         num_threads = args.threads or psutil.cpu_count() or 1
 
@@ -130,7 +130,8 @@ class SetupAll:
 
         if args.continue_at is None or args.continue_at in ('load-data', 'indexing'):
             LOG.warning('Indexing places')
-            indexer = Indexer(args.config.get_libpq_dsn(), tokenizer, num_threads)
+            indexer = Indexer(args.config.get_libpq_dsn(), tokenizer, num_threads,
+                              IndexerSettings.from_config(args.config))
             indexer.index_full(analyse=not args.index_noanalyse)
 
         LOG.warning('Post-process tables')
@@ -77,7 +77,8 @@ def execute_file(dsn: str, fname: Path,
 # List of characters that need to be quoted for the copy command.
 _SQL_TRANSLATION = {ord('\\'): '\\\\',
                     ord('\t'): '\\t',
-                    ord('\n'): '\\n'}
+                    ord('\n'): '\\n',
+                    ord('\r'): '\\r'}
 
 
 class CopyBuffer:
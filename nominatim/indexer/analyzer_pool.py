@@ -0,0 +1,111 @@
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Pool of worker processes that compute the token information for places.
+"""
+from typing import Optional, Any, List, Dict, NamedTuple, Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+import gc
+import multiprocessing
+import multiprocessing.util
+import time
+
+from nominatim.tokenizer.base import AbstractTokenizer, AbstractAnalyzer
+from nominatim.indexer.runners import analyze_places
+from nominatim.indexer.metrics import statistics_delta
+from nominatim.typing import DictCursorResults
+
+class AnalysisResult(NamedTuple):
+    """ Token information computed by a worker process for a batch of
+        places together with the time it took and the change of the
+        statistics of the worker's analyzer.
+    """
+    token_info: List[Dict[str, Any]]
+    duration: float
+    statistics: Dict[str, float]
+
+
+# Name analyzer of the worker process.
+_ANALYZER: Optional[AbstractAnalyzer] = None
+
+def _init_worker(make_analyzer: Callable[[], AbstractAnalyzer]) -> None:
+    global _ANALYZER # pylint: disable=global-statement
+    _ANALYZER = make_analyzer()
+    multiprocessing.util.Finalize(None, _ANALYZER.close, exitpriority=10)
+
+
+def _analyze(places: List[Dict[str, Any]]) -> AnalysisResult:
+    assert _ANALYZER is not None
+    before = _ANALYZER.get_statistics()
+    tstart = time.perf_counter()
+    token_info = analyze_places(_ANALYZER, places)
+    duration = time.perf_counter() - tstart
+
+    return AnalysisResult(token_info, duration,
+                          statistics_delta(before, _ANALYZER.get_statistics()))
+
+
+def _noop(_: Any) -> None:
+    pass
+
+
+class AnalyzerPool:
+    """ Runs the name analysis of the tokenizer in separate processes.
+        Each process has its own name analyzer with its own caches.
+
+        The processes are forked right away when the pool is created.
+        Create the pool before opening any database connections, so
+        that the worker processes do not inherit them.
+
+        The static data of the analyzers is loaded once before forking
+        and shared by all processes (see
+        `AbstractTokenizer.shared_analyzer_factory()`).
+
+        The workers may create the same new words at the same time. The
+        SQL functions of the tokenizers serialize the creation of words
+        with an advisory lock, so that no duplicates are written.
+    """
+
+    def __init__(self, tokenizer: AbstractTokenizer, num_processes: int) -> None:
+        self.num_processes = num_processes
+        make_analyzer = tokenizer.shared_analyzer_factory()
+
+        # Move all objects loaded so far out of the reach of the garbage
+        # collector, so that the workers do not touch, and thereby copy,
+        # the memory pages inherited from this process.
+        gc.freeze()
+        try:
+            self.executor = ProcessPoolExecutor(num_processes,
+                                                mp_context=multiprocessing.get_context('fork'),
+                                                initializer=_init_worker,
+                                                initargs=(make_analyzer, ))
+            # Make sure all processes are started now.
+            list(self.executor.map(_noop, range(num_processes)))
+        finally:
+            gc.unfreeze()
+
+
+    def submit(self, places: DictCursorResults) -> 'Future[AnalysisResult]':
+        """ Schedule the analysis of the given places. The result of the
+            future contains the list of token information in the order
+            of the places.
+        """
+        return self.executor.submit(_analyze, [dict(p) for p in places])
+
+
+    def close(self) -> None:
+        """ Shut down all worker processes.
+        """
+        self.executor.shutdown(wait=True)
+
+
+    def __enter__(self) -> 'AnalyzerPool':
+        return self
+
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        self.close()
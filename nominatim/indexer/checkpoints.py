@@ -0,0 +1,127 @@
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Persistent progress information for resuming interrupted indexing runs.
+"""
+from typing import Any, NamedTuple, Optional
+import threading
+import time
+
+from nominatim.db.connection import connect, Connection
+
+
+class RunnerState(NamedTuple):
+    """ Saved progress of a single indexing runner.
+    """
+    total: int
+    done: int
+    finished: bool
+
+
+class IndexingCheckpoints:
+    """ Saves the progress of the indexing runners in the table
+        'indexer_checkpoints', which is created when needed.
+
+        The state is only advisory. Which places still need indexing is
+        always decided by their indexed_status.
+    """
+    TABLE = 'indexer_checkpoints'
+
+    def __init__(self, dsn: str) -> None:
+        self.conn: Optional[Connection] = connect(dsn).connection
+        self.conn.autocommit = True
+        self.lock = threading.Lock()
+
+        with self.conn.cursor() as cur:
+            cur.execute(f"""CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                              runner TEXT PRIMARY KEY,
+                              total BIGINT NOT NULL,
+                              done BIGINT NOT NULL,
+                              finished BOOLEAN NOT NULL,
+                              updated TIMESTAMP WITH TIME ZONE NOT NULL)""")
+
+
+    def close(self) -> None:
+        """ Close the database connection.
+        """
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+    def get(self, runner: str) -> Optional[RunnerState]:
+        """ Return the saved state of the given runner or None if there is
+            no saved state.
+        """
+        assert self.conn is not None
+        with self.lock, self.conn.cursor() as cur:
+            cur.execute(f"SELECT total, done, finished FROM {self.TABLE} WHERE runner = %s",
+                        (runner, ))
+            row = cur.fetchone()
+
+        return None if row is None else RunnerState(*row)
+
+
+    def save(self, runner: str, total: int, done: int, finished: bool = False) -> None:
+        """ Save the state of the given runner.
+        """
+        assert self.conn is not None
+        with self.lock, self.conn.cursor() as cur:
+            cur.execute(f"""INSERT INTO {self.TABLE} VALUES (%s, %s, %s, %s, now())
+                            ON CONFLICT (runner) DO UPDATE
+                              SET total = EXCLUDED.total, done = EXCLUDED.done,
+                                  finished = EXCLUDED.finished, updated = now()""",
+                        (runner, total, done, finished))
+
+
+    def clear(self) -> None:
+        """ Remove all saved states. To be called when a complete indexing
+            run has finished.
+        """
+        assert self.conn is not None
+        with self.lock, self.conn.cursor() as cur:
+            cur.execute(f"DELETE FROM {self.TABLE}")
+
+
+    def __enter__(self) -> 'IndexingCheckpoints':
+        return self
+
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        self.close()
+
+
+class RunnerCheckpoint:
+    """ Saves the progress of a single runner at regular intervals.
+        `done_before` is the number of places done by an earlier,
+        interrupted run.
+    """
+    SAVE_INTERVAL = 10.0
+
+    def __init__(self, store: IndexingCheckpoints, runner: str,
+                 total: int, done_before: int = 0) -> None:
+        self.store = store
+        self.runner = runner
+        self.total = total
+        self.done_before = done_before
+        self.next_save = time.monotonic() + self.SAVE_INTERVAL
+        store.save(runner, total, done_before)
+
+
+    def __call__(self, done: int) -> None:
+        """ Report the number of places done in this run.
+        """
+        now = time.monotonic()
+        if now >= self.next_save:
+            self.store.save(self.runner, self.total, self.done_before + done)
+            self.next_save = now + self.SAVE_INTERVAL
+
+
+    def finish(self, done: int) -> None:
+        """ Mark the runner as completely done.
+        """
+        self.store.save(self.runner, self.total, self.done_before + done, finished=True)
@@ -0,0 +1,143 @@
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Bulk writing of indexing results through staging tables.
+"""
+from typing import Optional, Dict, Any, Sequence
+import logging
+
+from nominatim.db.async_connection import WorkerPool
+from nominatim.db.connection import connect, Connection, Cursor
+from nominatim.db.utils import CopyBuffer
+from nominatim.indexer.progress import ProgressLogger
+from nominatim.indexer.metrics import RunnerMetrics
+from nominatim.indexer.runners import AbstractPlacexRunner
+from nominatim.typing import DictCursorResults
+
+LOG = logging.getLogger()
+
+STAGING_TABLE_PREFIX = 'tmp_placex_staging_'
+
+class CopyWriter: # pylint: disable=too-many-instance-attributes
+    """ Writes the indexing results for placex through unlogged staging
+        tables instead of sending one UPDATE statement per batch.
+
+        The results are collected in memory. Once `chunk_size` places
+        are available, they are copied with COPY into the staging table
+        of the next free worker connection, which then applies all of
+        them to placex with a single UPDATE. Each worker connection has
+        its own staging table, so that copying never interferes with an
+        UPDATE still running on another connection.
+
+        Asynchronous connections cannot run COPY, so the copying is done
+        over a separate synchronous connection. The staging tables are
+        named after the backend process of that connection. Tables of
+        backends that no longer exist are left over from runs that were
+        killed, they are removed when the next writer starts.
+
+        When `metrics` is given, the number of rows per worker connection
+        is recorded there.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, dsn: str, pool: WorkerPool, runner: AbstractPlacexRunner,
+                 chunk_size: int, *, progress: ProgressLogger,
+                 metrics: Optional[RunnerMetrics] = None) -> None:
+        self.pool = pool
+        self.runner = runner
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.metrics = metrics
+        self.buffer = CopyBuffer()
+        self.num_rows = 0
+
+        self.conn: Optional[Connection] = connect(dsn).connection
+        self.conn.autocommit = True
+
+        self.tables: Dict[int, str] = {}
+        with self.conn.cursor() as cur:
+            _drop_leftover_tables(cur)
+            backend_pid = cur.scalar('SELECT pg_backend_pid()')
+            for i, worker in enumerate(pool.threads):
+                table = f'{STAGING_TABLE_PREFIX}{backend_pid}_{i}'
+                cur.drop_table(table)
+                cur.execute(runner.sql_create_staging_table(table))
+                self.tables[id(worker)] = table
+
+
+    def add(self, places: DictCursorResults,
+            token_info: Optional[Sequence[Dict[str, Any]]] = None) -> None:
+        """ Add the results for the given places. They are written out
+            as soon as a full chunk has been collected.
+        """
+        self.runner.add_to_copy_buffer(self.buffer, places, token_info)
+        self.num_rows += len(places)
+
+        if self.num_rows >= self.chunk_size:
+            self.flush()
+
+
+    def flush(self) -> None:
+        """ Copy all collected results into a staging table and start
+            the update of placex on the worker connection owning it.
+        """
+        if self.num_rows == 0:
+            return
+
+        assert self.conn is not None
+        worker = self.pool.next_free_worker()
+        table = self.tables[id(worker)]
+
+        with self.conn.cursor() as cur:
+            self.buffer.copy_out(cur, table, columns=AbstractPlacexRunner.STAGING_COLUMNS)
+        worker.perform(self.runner.sql_index_staged(table))
+
+        if self.metrics is not None:
+            self.metrics.add_worker_rows(worker, self.num_rows)
+        self.progress.add(self.num_rows)
+        self.buffer.buffer.close()
+        self.buffer = CopyBuffer()
+        self.num_rows = 0
+
+
+    def close(self) -> None:
+        """ Wait for all pending updates and remove the staging tables.
+            Results that have not been flushed yet are discarded.
+        """
+        if self.conn is None:
+            return
+
+        try:
+            self.pool.finish_all()
+        finally:
+            with self.conn.cursor() as cur:
+                for table in self.tables.values():
+                    cur.drop_table(table)
+            self.conn.close()
+            self.conn = None
+            self.buffer.buffer.close()
+
+
+    def __enter__(self) -> 'CopyWriter':
+        return self
+
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        self.close()
+
+
+def _drop_leftover_tables(cur: Cursor) -> None:
+    """ Remove the staging tables whose backend process has gone.
+    """
+    cur.execute(f"""SELECT tablename FROM pg_tables
+                    WHERE schemaname = current_schema()
+                          AND tablename ~ '^{STAGING_TABLE_PREFIX}[0-9]+_'
+                          AND split_part(tablename, '_', 4)::int
+                                NOT IN (SELECT pid FROM pg_stat_activity)""")
+    for table in [row[0] for row in cur]:
+        LOG.info("Removing staging table '%s' of an earlier run.", table)
+        cur.drop_table(table)
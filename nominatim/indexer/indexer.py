@@ -7,30 +7,70 @@
 """
 Main work horse for indexing (computing addresses) the database.
 """
-from typing import Optional, Any, cast
+from typing import Optional, Any, Callable, Dict, List, NamedTuple, Tuple, Deque, \
+                   Iterator, cast
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import json
 import logging
+import threading
 import time
 
 import psycopg2.extras
+from psycopg2 import sql as pysql
 
+from nominatim.config import Configuration
 from nominatim.tokenizer.base import AbstractTokenizer
 from nominatim.indexer.progress import ProgressLogger
 from nominatim.indexer import runners
+from nominatim.indexer.analyzer_pool import AnalyzerPool, AnalysisResult
+from nominatim.indexer.checkpoints import IndexingCheckpoints, RunnerCheckpoint
+from nominatim.indexer.copy_writer import CopyWriter
+from nominatim.indexer.metrics import IndexerMetrics, RunnerMetrics, statistics_delta
+from nominatim.indexer.sector_ranges import SectorRange, SectorRangeQueue, split_sectors
 from nominatim.db.async_connection import DBConnection, WorkerPool
 from nominatim.db.connection import connect, Connection, Cursor
-from nominatim.typing import DictCursorResults
+from nominatim.typing import DictCursorResults, Query
 
 LOG = logging.getLogger()
 
+def _as_composable(query: Query) -> pysql.Composable:
+    if isinstance(query, bytes):
+        return pysql.SQL(query.decode('utf-8'))
+    if isinstance(query, str):
+        return pysql.SQL(query)
+    return query
 
-class PlaceFetcher:
-    """ Asynchronous connection that fetches place details for processing.
+
+class PlaceFetcher: # pylint: disable=too-many-instance-attributes
+    """ Asynchronous connections that fetch place details for processing.
+
+        Up to `depth` batches are requested ahead of time, each on its own
+        connection. The number of places per batch starts at `batch_size`.
+        It is doubled, up to `max_batch_size`, while the indexer spends
+        more time waiting for place details than for free worker
+        connections, and halved again when the fetcher is well ahead.
+
+        The fetcher may be reused for several cursors, see `restart()`.
     """
-    def __init__(self, dsn: str, setup_conn: Connection) -> None:
+    ADAPT_INTERVAL = 10
+
+    def __init__(self, dsn: str, setup_conn: Connection, depth: int = 1,
+                 batch_size: int = 100, max_batch_size: Optional[int] = None) -> None:
         self.wait_time = 0.0
-        self.current_ids: Optional[DictCursorResults] = None
-        self.conn: Optional[DBConnection] = DBConnection(dsn,
-                                               cursor_factory=psycopg2.extras.DictCursor)
+        self.min_batch_size = batch_size
+        self.max_batch_size = max(batch_size, max_batch_size or batch_size)
+        self.batch_size = batch_size
+        self.pending: Deque[Tuple[DBConnection, DictCursorResults]] = deque()
+        self.ids_done = False
+        self.ids_read = 0
+        self.sector_range: Optional[SectorRange] = None
+
+        self._batches_since_adapt = 0
+        self._last_wait_time = 0.0
+        self._last_pool_wait_time = 0.0
 
         with setup_conn.cursor() as cur:
             # need to fetch those manually because register_hstore cannot
@@ -38,69 +78,211 @@ class PlaceFetcher:
             hstore_oid = cur.scalar("SELECT 'hstore'::regtype::oid")
             hstore_array_oid = cur.scalar("SELECT 'hstore[]'::regtype::oid")
 
-        psycopg2.extras.register_hstore(self.conn.conn, oid=hstore_oid,
-                                        array_oid=hstore_array_oid)
+        self.conns: List[DBConnection] = []
+        for _ in range(max(1, depth)):
+            conn = DBConnection(dsn, cursor_factory=psycopg2.extras.DictCursor)
+            psycopg2.extras.register_hstore(conn.conn, oid=hstore_oid,
+                                            array_oid=hstore_array_oid)
+            self.conns.append(conn)
+        self.free_conns = list(self.conns)
+
 
     def close(self) -> None:
-        """ Close the underlying asynchronous connection.
+        """ Close the underlying asynchronous connections.
+        """
+        for conn in self.conns:
+            conn.close()
+        self.conns = []
+        self.free_conns = []
+        self.pending.clear()
+
+
+    def restart(self, sector_range: Optional[SectorRange] = None) -> None:
+        """ Prepare for reading from a new cursor. When `sector_range`
+            is given, then the cursor must return the place IDs together
+            with their geometry sector and only the places still within
+            the range are processed.
         """
-        if self.conn:
-            self.conn.close()
-            self.conn = None
+        assert not self.pending
+        self.ids_done = False
+        self.ids_read = 0
+        self.sector_range = sector_range
 
 
     def fetch_next_batch(self, cur: Cursor, runner: runners.Runner) -> bool:
-        """ Send a request for the next batch of places.
-            If details for the places are required, they will be fetched
-            asynchronously.
+        """ Send requests for the next batches of places until the
+            prefetch queue is full. If details for the places are
+            required, they will be fetched asynchronously.
 
             Returns true if there is still data available.
         """
-        ids = cast(Optional[DictCursorResults], cur.fetchmany(100))
+        while self.free_conns and not self.ids_done:
+            ids = cast(Optional[DictCursorResults], cur.fetchmany(self.batch_size))
 
-        if not ids:
-            self.current_ids = None
-            return False
+            if ids and self.sector_range is not None:
+                ids, self.ids_done = self.sector_range.take(ids)
 
-        assert self.conn is not None
-        self.current_ids = runner.get_place_details(self.conn, ids)
+            if not ids:
+                self.ids_done = True
+                break
+
+            self.ids_read += len(ids)
+            conn = self.free_conns.pop()
+            self.pending.append((conn, runner.get_place_details(conn, ids)))
+
+        return bool(self.pending)
 
-        return True
 
     def get_batch(self) -> DictCursorResults:
         """ Get the next batch of data, previously requested with
             `fetch_next_batch`.
         """
-        assert self.conn is not None
-        assert self.conn.cursor is not None
+        if not self.pending:
+            return []
+
+        conn, places = self.pending.popleft()
 
-        if self.current_ids is not None and not self.current_ids:
+        if not places:
+            assert conn.cursor is not None
             tstart = time.time()
-            self.conn.wait()
+            conn.wait()
             self.wait_time += time.time() - tstart
-            self.current_ids = cast(Optional[DictCursorResults],
-                                    self.conn.cursor.fetchall())
+            places = cast(DictCursorResults, conn.cursor.fetchall())
+
+        self.free_conns.append(conn)
+
+        return places
+
+
+    def adapt_batch_size(self, pool_wait_time: float) -> None:
+        """ Adjust the batch size to the time spent waiting for place
+            details compared to the time spent waiting for the workers
+            given in `pool_wait_time` (both totals since the start).
+        """
+        self._batches_since_adapt += 1
+        if self._batches_since_adapt < self.ADAPT_INTERVAL:
+            return
+
+        fetch_wait = self.wait_time - self._last_wait_time
+        pool_wait = pool_wait_time - self._last_pool_wait_time
+
+        if fetch_wait > pool_wait:
+            self.batch_size = min(self.max_batch_size, 2 * self.batch_size)
+        elif fetch_wait < 0.1 * pool_wait:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+
+        self._batches_since_adapt = 0
+        self._last_wait_time = self.wait_time
+        self._last_pool_wait_time = pool_wait_time
 
-        return self.current_ids if self.current_ids is not None else []
 
     def __enter__(self) -> 'PlaceFetcher':
         return self
 
 
     def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
-        assert self.conn is not None
-        self.conn.wait()
+        for conn in self.conns:
+            conn.wait()
         self.close()
 
 
+class IndexerSettings(NamedTuple):
+    """ Tuning options for the indexer.
+
+        When `analysis_processes` is larger than 0, then the token
+        information is computed in that many worker processes.
+
+        When `copy_chunk_size` is larger than 0, then the results for
+        the placex ranks are written in chunks of that size through
+        staging tables (see CopyWriter) instead of one UPDATE per batch.
+
+        `prefetch_depth` and `max_fetch_batch_size` configure the
+        PlaceFetcher.
+
+        When `sector_ranges` is larger than 1, then rank 30 is split into
+        ranges of geometry sectors, which are indexed in parallel by that
+        many producers, each with its own cursor and its share of the
+        database connections.
+
+        When `boundary_producers` is larger than 1, then the boundaries
+        of different partitions are indexed in parallel by that many
+        producers. Each producer processes the ranks of a partition in
+        order, so that boundaries are only indexed after the larger
+        boundaries of the same partition which they may depend on.
+
+        When `checkpoints` is set, then the progress of each rank or table
+        is saved in the database, so that an interrupted run can be resumed
+        without counting the remaining places again and steps that were
+        already finished are skipped.
+
+        When `estimate_counts` is set, then the number of places of each
+        rank or table is estimated from the query plan instead of being
+        counted before indexing starts. The estimate is refined while
+        the places are read.
+    """
+    analysis_processes: int = 0
+    copy_chunk_size: int = 0
+    prefetch_depth: int = 1
+    max_fetch_batch_size: int = 1000
+    sector_ranges: int = 0
+    boundary_producers: int = 0
+    checkpoints: bool = False
+    estimate_counts: bool = False
+
+    @classmethod
+    def from_config(cls, config: Configuration) -> 'IndexerSettings':
+        """ Read the settings from the NOMINATIM_INDEXER_* configuration.
+        """
+        return cls(analysis_processes=config.get_int('INDEXER_ANALYSIS_PROCESSES'),
+                   copy_chunk_size=config.get_int('INDEXER_COPY_CHUNK_SIZE'),
+                   prefetch_depth=config.get_int('INDEXER_PREFETCH_DEPTH'),
+                   max_fetch_batch_size=config.get_int('INDEXER_MAX_FETCH_BATCH_SIZE'),
+                   sector_ranges=config.get_int('INDEXER_SECTOR_RANGES'),
+                   boundary_producers=config.get_int('INDEXER_BOUNDARY_PRODUCERS'),
+                   checkpoints=config.get_bool('INDEXER_CHECKPOINTS'),
+                   estimate_counts=config.get_bool('INDEXER_ESTIMATE_COUNTS'))
+
+
+class _Step(NamedTuple):
+    """ State of an indexing step (rank or table), which is shared by
+        all producers of the step. `num_threads` is the number of worker
+        connections of each producer.
+    """
+    batch: int
+    num_threads: int
+    copy_chunk_size: int
+    analyzers: Optional[AnalyzerPool]
+    progress: ProgressLogger
+    metrics: RunnerMetrics
+
+
+class _Producer(NamedTuple):
+    """ Connections of a single producer, which reads places from a cursor
+        and hands them to the worker connections.
+    """
+    runner: runners.Runner
+    step: _Step
+    fetcher: PlaceFetcher
+    pool: WorkerPool
+    writer: Optional[CopyWriter]
+
+
 class Indexer:
     """ Main indexing routine.
+
+        The indexing may be tuned with `settings`, see IndexerSettings.
+        Timings and throughput of all steps are collected in `metrics`.
     """
+    RANGES_PER_PRODUCER = 4
 
-    def __init__(self, dsn: str, tokenizer: AbstractTokenizer, num_threads: int):
+    def __init__(self, dsn: str, tokenizer: AbstractTokenizer, num_threads: int,
+                 settings: IndexerSettings = IndexerSettings(),
+                 metrics: Optional[IndexerMetrics] = None):
         self.dsn = dsn
         self.tokenizer = tokenizer
         self.num_threads = num_threads
+        self.settings = settings
+        self.metrics = metrics or IndexerMetrics()
 
 
     def has_pending(self) -> bool:
@@ -120,28 +302,31 @@ class Indexer:
             database will be analysed at the appropriate places to
             ensure that database statistics are updated.
         """
-        with connect(self.dsn) as conn:
-            conn.autocommit = True
-
-            def _analyze() -> None:
-                if analyse:
+        def _analyze() -> None:
+            # The connection must not stay open while indexing, so that
+            # the analyzer pool is not forked with an open connection.
+            if analyse:
+                with connect(self.dsn) as conn:
+                    conn.autocommit = True
                     with conn.cursor() as cur:
                         cur.execute('ANALYZE')
 
-            if self.index_by_rank(0, 4) > 0:
-                _analyze()
+        if self.index_by_rank(0, 4) > 0:
+            _analyze()
+
+        if self.index_boundaries(0, 30) > 100:
+            _analyze()
 
-            if self.index_boundaries(0, 30) > 100:
-                _analyze()
+        if self.index_by_rank(5, 25) > 100:
+            _analyze()
 
-            if self.index_by_rank(5, 25) > 100:
-                _analyze()
+        if self.index_by_rank(26, 30) > 1000:
+            _analyze()
 
-            if self.index_by_rank(26, 30) > 1000:
-                _analyze()
+        if self.index_postcodes() > 100:
+            _analyze()
 
-            if self.index_postcodes() > 100:
-                _analyze()
+        self.clear_checkpoints()
 
 
     def index_boundaries(self, minrank: int, maxrank: int) -> int:
@@ -151,9 +336,22 @@ class Indexer:
         LOG.warning("Starting indexing boundaries using %s threads",
                     self.num_threads)
 
-        with self.tokenizer.name_analyzer() as analyzer:
-            for rank in range(max(minrank, 4), min(maxrank, 26)):
-                total += self._index(runners.BoundaryRunner(rank, analyzer))
+        # The analyzer pool must be set up before the analyzer opens
+        # its database connection.
+        ranks = range(max(minrank, 4), min(maxrank, 26))
+        with self._analyzer_pool() as analyzers, self.tokenizer.name_analyzer() as analyzer:
+            if self.settings.boundary_producers > 1 and ranks:
+                total += self._index_boundary_partitions(ranks, analyzers)
+
+            for rank in ranks:
+                runner = runners.BoundaryRunner(rank, analyzer)
+                if self.settings.boundary_producers > 1:
+                    # Only boundaries without a partition should be left.
+                    with connect(self.dsn) as conn:
+                        with conn.cursor() as cur:
+                            if not self._has_pending(runner, cur):
+                                continue
+                total += self._index(runner, analyzers=analyzers)
 
         return total
 
@@ -169,13 +367,21 @@ class Indexer:
         LOG.warning("Starting indexing rank (%i to %i) using %i threads",
                     minrank, maxrank, self.num_threads)
 
-        with self.tokenizer.name_analyzer() as analyzer:
+        with self._analyzer_pool() as analyzers, self.tokenizer.name_analyzer() as analyzer:
             for rank in range(max(1, minrank), maxrank + 1):
-                total += self._index(runners.RankRunner(rank, analyzer), 20 if rank == 30 else 1)
+                if rank == 30 and self.settings.sector_ranges > 1:
+                    total += self._index_sector_ranges(runners.RankRunner(rank, analyzer),
+                                                       20, analyzers)
+                else:
+                    total += self._index(runners.RankRunner(rank, analyzer),
+                                         20 if rank == 30 else 1, analyzers=analyzers,
+                                         copy_chunk_size=self.settings.copy_chunk_size)
 
             if maxrank == 30:
-                total += self._index(runners.RankRunner(0, analyzer))
-                total += self._index(runners.InterpolationRunner(analyzer), 20)
+                total += self._index(runners.RankRunner(0, analyzer), analyzers=analyzers,
+                                     copy_chunk_size=self.settings.copy_chunk_size)
+                total += self._index(runners.InterpolationRunner(analyzer), 20,
+                                     analyzers=analyzers)
 
         return total
 
@@ -188,6 +394,16 @@ class Indexer:
         return self._index(runners.PostcodeRunner(), 20)
 
 
+    def clear_checkpoints(self) -> None:
+        """ Remove the saved progress of all steps. Must be called when
+            the complete database has been indexed, so that the next
+            run starts from scratch.
+        """
+        with self._checkpoint_store() as store:
+            if store is not None:
+                store.clear()
+
+
     def update_status_table(self) -> None:
         """ Update the status in the status table to 'indexed'.
         """
@@ -197,46 +413,421 @@ class Indexer:
 
             conn.commit()
 
-    def _index(self, runner: runners.Runner, batch: int = 1) -> int:
+    @contextlib.contextmanager
+    def _analyzer_pool(self) -> Iterator[Optional[AnalyzerPool]]:
+        """ Set up the worker processes for computing the token information,
+            if requested.
+        """
+        if self.settings.analysis_processes <= 0:
+            yield None
+        else:
+            LOG.info("Computing token information in %d processes.",
+                     self.settings.analysis_processes)
+            with AnalyzerPool(self.tokenizer, self.settings.analysis_processes) as pool:
+                yield pool
+
+
+    @contextlib.contextmanager
+    def _checkpoint_store(self) -> Iterator[Optional[IndexingCheckpoints]]:
+        """ Open the table with the saved progress, if requested.
+        """
+        if not self.settings.checkpoints:
+            yield None
+        else:
+            with IndexingCheckpoints(self.dsn) as store:
+                yield store
+
+
+    def _start_checkpoint(self, runner: runners.Runner, cur: Cursor,
+                          store: Optional[IndexingCheckpoints],
+                          total: Optional[int] = None) -> Tuple[int, Optional[RunnerCheckpoint]]:
+        """ Determine the number of places to index for the runner and
+            set up saving of its progress. When the runner was interrupted
+            in an earlier run, the number is taken from the saved progress.
+            When it has been finished, then the places are only counted
+            again if there are any left. `total` is the number of places,
+            when already known.
+
+            Returns the number of places and the checkpoint to report the
+            progress to.
+        """
+        name = runner.name()
+        state = None if store is None else store.get(name)
+
+        if state is not None and total is None:
+            if state.finished:
+                if not self._has_pending(runner, cur):
+                    LOG.warning("Skipping %s (finished in an earlier run)", name)
+                    return 0, None
+            elif state.total > state.done:
+                LOG.warning("Resuming %s after %d of %d places",
+                            name, state.done, state.total)
+                assert store is not None
+                return state.total - state.done, \
+                       RunnerCheckpoint(store, name, state.total, state.done)
+
+        if total is None:
+            total = self._count_places(runner, cur)
+
+        if store is None:
+            return total, None
+
+        done_before = 0 if state is None or state.finished else state.done
+        return total, RunnerCheckpoint(store, name, done_before + total, done_before)
+
+
+    def _count_places(self, runner: runners.Runner, cur: Cursor) -> int:
+        """ Return the number of places the runner needs to index.
+            In estimate mode, the number is taken from the query plan
+            instead of counting the places.
+        """
+        if not self.settings.estimate_counts:
+            return cast(int, cur.scalar(runner.sql_count_objects()))
+
+        cur.execute(pysql.SQL("EXPLAIN (FORMAT JSON) {}")
+                          .format(_as_composable(runner.sql_get_objects())))
+        plan = cast(Any, cur.fetchone())[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+    @staticmethod
+    def _has_pending(runner: runners.Runner, cur: Cursor) -> bool:
+        """ Check if there is at least one place left that the runner
+            needs to index.
+        """
+        return bool(cur.scalar(pysql.SQL("SELECT EXISTS({})")
+                                     .format(_as_composable(runner.sql_get_objects()))))
+
+
+    @contextlib.contextmanager
+    def _producer(self, conn: Connection, runner: runners.Runner,
+                  step: _Step) -> Iterator[_Producer]:
+        """ Set up the place fetcher, the worker connections and, if
+            requested, the writer for the COPY write path for a producer
+            that reads places from cursors of `conn`.
+        """
+        with PlaceFetcher(self.dsn, conn, self.settings.prefetch_depth,
+                          max_batch_size=self.settings.max_fetch_batch_size) as fetcher, \
+             WorkerPool(self.dsn, step.num_threads) as pool:
+            if step.copy_chunk_size <= 0:
+                yield _Producer(runner, step, fetcher, pool, None)
+            else:
+                assert isinstance(runner, runners.AbstractPlacexRunner)
+                with CopyWriter(self.dsn, pool, runner, step.copy_chunk_size,
+                                progress=step.progress, metrics=step.metrics) as writer:
+                    yield _Producer(runner, step, fetcher, pool, writer)
+
+            LOG.info("Wait time: fetcher: %.2fs,  pool: %.2fs "
+                     "(final fetch batch size: %d)",
+                     fetcher.wait_time, pool.wait_time, fetcher.batch_size)
+            step.metrics.add_wait_times(fetcher.wait_time, pool.wait_time)
+
+
+    @staticmethod
+    def _finish_step(step: _Step, checkpoint: Optional[RunnerCheckpoint] = None) -> int:
+        """ Report the end of the step. Returns the number of places done.
+        """
+        done = step.progress.done()
+        step.metrics.finish()
+        if checkpoint is not None:
+            checkpoint.finish(done)
+
+        return done
+
+
+    @staticmethod
+    def _run_producers(num_producers: int, producer: Callable[..., None], *args: Any) -> None:
+        """ Run `producer` with the given arguments in `num_producers`
+            threads in parallel and wait for all of them to finish.
+        """
+        with ThreadPoolExecutor(max_workers=num_producers) as executor:
+            futures = [executor.submit(producer, *args) for _ in range(num_producers)]
+            for future in futures:
+                future.result()
+
+
+    def _index(self, runner: runners.Runner, batch: int = 1,
+               analyzers: Optional[AnalyzerPool] = None, copy_chunk_size: int = 0) -> int:
         """ Index a single rank or table. `runner` describes the SQL to use
             for indexing. `batch` describes the number of objects that
-            should be processed with a single SQL statement
+            should be processed with a single SQL statement.
+
+            When `analyzers` is given, then the token information for
+            the places is computed by the worker processes of the pool
+            while the next batches are fetched and written.
+
+            When `copy_chunk_size` is set, then the results are written
+            through staging tables in chunks of the given size and
+            `batch` is ignored. Only works with placex runners.
         """
-        LOG.warning("Starting %s (using batch size %s)", runner.name(), batch)
+        if copy_chunk_size > 0:
+            LOG.warning("Starting %s (using COPY with chunk size %s)",
+                        runner.name(), copy_chunk_size)
+        else:
+            LOG.warning("Starting %s (using batch size %s)", runner.name(), batch)
 
-        with connect(self.dsn) as conn:
+        with connect(self.dsn) as conn, self._checkpoint_store() as store:
             psycopg2.extras.register_hstore(conn)
             with conn.cursor() as cur:
-                total_tuples = cur.scalar(runner.sql_count_objects())
+                total_tuples, checkpoint = self._start_checkpoint(runner, cur, store)
                 LOG.debug("Total number of rows: %i", total_tuples)
 
             conn.commit()
 
-            progress = ProgressLogger(runner.name(), total_tuples)
+            step = _Step(batch, self.num_threads, copy_chunk_size, analyzers,
+                         ProgressLogger(runner.name(), total_tuples, checkpoint=checkpoint,
+                                        estimated=self.settings.estimate_counts),
+                         self.metrics.start_runner(runner.name()))
 
             if total_tuples > 0:
-                with conn.cursor(name='places') as cur:
-                    cur.execute(runner.sql_get_objects())
+                with self._producer(conn, runner, step) as producer:
+                    with conn.cursor(name='places') as cur:
+                        cur.execute(runner.sql_get_objects())
+                        self._process_cursor(producer, cur)
 
-                    with PlaceFetcher(self.dsn, conn) as fetcher:
-                        with WorkerPool(self.dsn, self.num_threads) as pool:
-                            has_more = fetcher.fetch_next_batch(cur, runner)
-                            while has_more:
-                                places = fetcher.get_batch()
+                conn.commit()
 
-                                # asynchronously get the next batch
-                                has_more = fetcher.fetch_next_batch(cur, runner)
+            return self._finish_step(step, checkpoint)
 
-                                # And insert the current batch
-                                for idx in range(0, len(places), batch):
-                                    part = places[idx:idx + batch]
-                                    LOG.debug("Processing places: %s", str(part))
-                                    runner.index_places(pool.next_free_worker(), part)
-                                    progress.add(len(part))
 
-                            LOG.info("Wait time: fetcher: %.2fs,  pool: %.2fs",
-                                     fetcher.wait_time, pool.wait_time)
+    def _index_sector_ranges(self, runner: runners.RankRunner, batch: int,
+                             analyzers: Optional[AnalyzerPool]) -> int:
+        """ Index a rank of placex split into ranges of geometry sectors.
+            See _index() for the parameters. The runner is only used
+            for the preparation, the producers use their own runners.
+        """
+        num_producers = self.settings.sector_ranges
+        LOG.warning("Starting %s (using %d sector range producers)",
+                    runner.name(), num_producers)
 
-                conn.commit()
+        with connect(self.dsn) as conn, self._checkpoint_store() as store:
+            with conn.cursor() as cur:
+                cur.execute(runner.sql_count_sectors())
+                sector_counts = [(row[0], row[1]) for row in cur]
+                total, checkpoint = self._start_checkpoint(runner, cur, store,
+                                                           sum(c[1] for c in sector_counts))
+            conn.commit()
+
+            ranges = split_sectors(sector_counts if total > 0 else [],
+                                   num_producers * self.RANGES_PER_PRODUCER)
+            LOG.info("Split %s into %d sector ranges.", runner.name(), len(ranges))
+
+            step = _Step(batch, max(1, self.num_threads // num_producers),
+                         self.settings.copy_chunk_size, analyzers,
+                         ProgressLogger(runner.name(), total, checkpoint=checkpoint),
+                         self.metrics.start_runner(runner.name()))
+            self._run_producers(num_producers, self._index_sector_producer,
+                                runner.rank, SectorRangeQueue(ranges), step)
+
+            done = self._finish_step(step, checkpoint)
+
+        # Places without a sector or added while indexing are left over.
+        with connect(self.dsn) as conn:
+            with conn.cursor() as cur:
+                has_leftovers = self._has_pending(runner, cur)
+
+        if has_leftovers:
+            done += self._index(runner, batch, analyzers=analyzers,
+                                copy_chunk_size=self.settings.copy_chunk_size)
+
+        return done
+
+
+    def _count_partitions(self, ranks: range) -> Tuple[Deque[Tuple[int, List[int]]], int]:
+        """ Find the partitions with boundaries of the given ranks.
+            Returns the partitions together with the ranks to index,
+            largest partition first, and the total number of boundaries.
+        """
+        with connect(self.dsn) as conn:
+            with conn.cursor() as cur:
+                cur.execute(runners.BoundaryRunner.sql_count_partitions(ranks[0], ranks[-1]))
+                partitions: Dict[int, List[int]] = {}
+                counts: Dict[int, int] = {}
+                for partition, rank, count in cur:
+                    partitions.setdefault(partition, []).append(rank)
+                    counts[partition] = counts.get(partition, 0) + count
+            conn.commit()
+
+        # Start with the largest partitions to balance the load.
+        todo = deque((partition, sorted(partitions[partition]))
+                     for partition in sorted(counts, key=counts.__getitem__, reverse=True))
+
+        return todo, sum(counts.values())
 
-        return progress.done()
+
+    def _index_boundary_partitions(self, ranks: range,
+                                   analyzers: Optional[AnalyzerPool]) -> int:
+        """ Index the boundaries of the given ranks with the partitions
+            distributed over several producers.
+        """
+        todo, total = self._count_partitions(ranks)
+        if not todo:
+            return 0
+
+        num_producers = min(self.settings.boundary_producers, len(todo))
+        name = f"boundaries rank {ranks[0]} to {ranks[-1]}"
+        LOG.warning("Starting %s (%d partitions using %d producers)",
+                    name, len(todo), num_producers)
+
+        step = _Step(1, max(1, self.num_threads // num_producers), 0, analyzers,
+                     ProgressLogger(name, total), self.metrics.start_runner(name))
+        self._run_producers(num_producers, self._index_partition_producer,
+                            todo, threading.Event(), step)
+
+        return self._finish_step(step)
+
+
+    def _index_partition_producer(self, todo: Deque[Tuple[int, List[int]]],
+                                  cancelled: threading.Event, step: _Step) -> None:
+        """ Index the boundaries of partitions from `todo` until there are
+            none left. Each entry consists of the partition and the ranks
+            with boundaries to index. Runs in its own thread with its own
+            analyzer, cursor and worker connections.
+        """
+        try:
+            with self.tokenizer.name_analyzer() as analyzer, connect(self.dsn) as conn:
+                psycopg2.extras.register_hstore(conn)
+                # The runner is replaced for each partition and rank.
+                with self._producer(conn, runners.BoundaryRunner(0, analyzer),
+                                    step) as producer:
+                    while not cancelled.is_set():
+                        try:
+                            partition, ranks = todo.popleft()
+                        except IndexError:
+                            break
+
+                        for rank in ranks:
+                            runner = runners.BoundaryRunner(rank, analyzer, partition)
+                            LOG.debug("Indexing %s", runner.name())
+                            producer.fetcher.restart()
+                            with conn.cursor(name='places') as cur:
+                                cur.execute(runner.sql_get_objects())
+                                self._process_cursor(producer._replace(runner=runner), cur)
+                            conn.commit()
+                            # The next rank may depend on the results.
+                            producer.pool.finish_all()
+        except BaseException:
+            cancelled.set()
+            raise
+
+
+    def _index_sector_producer(self, rank: int, queue: SectorRangeQueue, step: _Step) -> None:
+        """ Index sector ranges from the queue until there are none left.
+            Runs in its own thread with its own analyzer, cursor and
+            worker connections.
+        """
+        try:
+            with self.tokenizer.name_analyzer() as analyzer, connect(self.dsn) as conn:
+                runner = runners.RankRunner(rank, analyzer)
+                psycopg2.extras.register_hstore(conn)
+                with self._producer(conn, runner, step) as producer:
+                    while True:
+                        srange = queue.next_range()
+                        if srange is None:
+                            break
+                        LOG.debug("Indexing %s sectors %d to %d",
+                                  runner.name(), srange.first, srange.last)
+                        try:
+                            producer.fetcher.restart(srange)
+                            with conn.cursor(name='places') as cur:
+                                cur.execute(runner.sql_get_objects_in_range(srange.first,
+                                                                            srange.last))
+                                self._process_cursor(producer, cur)
+                            conn.commit()
+                        finally:
+                            queue.done(srange)
+        except BaseException:
+            queue.cancel()
+            raise
+
+
+    def _process_cursor(self, producer: _Producer, cur: Cursor) -> None:
+        """ Index all places returned by the given cursor.
+        """
+        runner, step, fetcher = producer.runner, producer.step, producer.fetcher
+        pending: Deque[Tuple[DictCursorResults, 'Future[AnalysisResult]']] = deque()
+        has_more = fetcher.fetch_next_batch(cur, runner)
+        while has_more:
+            places = fetcher.get_batch()
+            fetcher.adapt_batch_size(producer.pool.wait_time)
+
+            # asynchronously get the next batch
+            has_more = fetcher.fetch_next_batch(cur, runner)
+            if step.progress.estimated:
+                step.progress.refine_total(fetcher.ids_read, fetcher.ids_done)
+
+            if step.analyzers is None:
+                # And insert the current batch
+                token_info, analysis_time = self._analyze_places(runner, places, step.metrics)
+                self._write_places(producer, places, token_info, analysis_time)
+            else:
+                # Keep enough batches in the queue to
+                # keep all analyzer processes busy.
+                pending.append((places, step.analyzers.submit(places)))
+                while pending and (len(pending) > 2 * step.analyzers.num_processes
+                                   or pending[0][1].done()):
+                    self._write_analyzed_places(producer, pending.popleft())
+
+            self.metrics.tick()
+
+        while pending:
+            self._write_analyzed_places(producer, pending.popleft())
+
+        if producer.writer is not None:
+            producer.writer.flush()
+
+
+    def _analyze_places(self, runner: runners.Runner, places: DictCursorResults,
+                        metrics: RunnerMetrics) -> Tuple[Optional[List[Dict[str, Any]]], float]:
+        """ Compute the token information for the places with the analyzer
+            of the runner. Returns the token information, if the runner
+            needs any, and the time it took.
+        """
+        if runner.analyzer is None:
+            return None, 0.0
+
+        before = runner.analyzer.get_statistics()
+        tstart = time.perf_counter()
+        token_info = runners.analyze_places(runner.analyzer, places)
+        duration = time.perf_counter() - tstart
+        metrics.add_analysis(duration,
+                             statistics_delta(before, runner.analyzer.get_statistics()))
+
+        return token_info, duration
+
+
+    def _write_analyzed_places(self, producer: _Producer,
+                               analyzed: Tuple[DictCursorResults, 'Future[AnalysisResult]']
+                              ) -> None:
+        places, future = analyzed
+        result = future.result()
+        producer.step.metrics.add_analysis(result.duration, result.statistics)
+        self._write_places(producer, places, result.token_info, result.duration)
+
+
+    def _write_places(self, producer: _Producer, places: DictCursorResults,
+                      token_info: Optional[List[Dict[str, Any]]],
+                      analysis_time: float) -> None:
+        pool, metrics = producer.pool, producer.step.metrics
+        tstart = time.perf_counter()
+        pool_wait = pool.wait_time
+
+        if producer.writer is not None:
+            producer.writer.add(places, token_info)
+        else:
+            batch = producer.step.batch
+            for idx in range(0, len(places), batch):
+                part = places[idx:idx + batch]
+                LOG.debug("Processing places: %s", str(part))
+                worker = pool.next_free_worker()
+                producer.runner.index_places(
+                    worker, part, None if token_info is None else token_info[idx:idx + batch])
+                metrics.add_worker_rows(worker, len(part))
+                producer.step.progress.add(len(part))
+
+        write_time = max(0.0, time.perf_counter() - tstart - (pool.wait_time - pool_wait))
+        metrics.add_write(write_time)
+        metrics.add_batch([place[0] for place in places], analysis_time + write_time)
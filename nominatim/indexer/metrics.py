@@ -0,0 +1,204 @@
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Collection of timing and throughput metrics while indexing.
+"""
+from typing import Any, Dict, List, Mapping, Optional, TextIO, Tuple
+import heapq
+import json
+import threading
+import time
+
+def statistics_delta(before: Mapping[str, float],
+                     after: Mapping[str, float]) -> Dict[str, float]:
+    """ Return the difference between two results of
+        `AbstractAnalyzer.get_statistics()`.
+    """
+    return {k: v - before.get(k, 0) for k, v in after.items() if v != before.get(k, 0)}
+
+
+class RunnerMetrics: # pylint: disable=too-many-instance-attributes
+    """ Metrics of a single indexing step (rank or table).
+
+        All methods may be called from different threads.
+    """
+    NUM_SLOWEST_BATCHES = 10
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.start_time = time.monotonic()
+        self.end_time: Optional[float] = None
+        self.places = 0
+        self.batches = 0
+        self.analysis_time = 0.0
+        self.write_time = 0.0
+        self.fetch_wait = 0.0
+        self.pool_wait = 0.0
+        self.analyzer_statistics: Dict[str, float] = {}
+        self.worker_rows: Dict[int, int] = {}
+        self.slowest: List[Tuple[float, int, int, int]] = []
+        self.lock = threading.Lock()
+
+
+    def add_analysis(self, duration: float, statistics: Mapping[str, float]) -> None:
+        """ Add the time spent on computing the token information for
+            a batch and the change of the analyzer statistics.
+        """
+        with self.lock:
+            self.analysis_time += duration
+            for key, value in statistics.items():
+                self.analyzer_statistics[key] = self.analyzer_statistics.get(key, 0) + value
+
+
+    def add_batch(self, place_ids: List[int], duration: float) -> None:
+        """ Record a processed batch with the given place IDs. `duration`
+            is the time spent on the batch in Python.
+        """
+        if not place_ids:
+            return
+
+        item = (duration, min(place_ids), max(place_ids), len(place_ids))
+        with self.lock:
+            self.places += len(place_ids)
+            self.batches += 1
+            if len(self.slowest) < self.NUM_SLOWEST_BATCHES:
+                heapq.heappush(self.slowest, item)
+            elif duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, item)
+
+
+    def add_write(self, duration: float) -> None:
+        """ Add the time spent on preparing the database updates.
+        """
+        with self.lock:
+            self.write_time += duration
+
+
+    def add_worker_rows(self, worker: Any, num: int) -> None:
+        """ Add the number of rows sent to the given worker connection.
+        """
+        with self.lock:
+            self.worker_rows[id(worker)] = self.worker_rows.get(id(worker), 0) + num
+
+
+    def add_wait_times(self, fetch_wait: float, pool_wait: float) -> None:
+        """ Add the time spent waiting for place details and for free
+            worker connections.
+        """
+        with self.lock:
+            self.fetch_wait += fetch_wait
+            self.pool_wait += pool_wait
+
+
+    def finish(self) -> None:
+        """ Mark the step as done.
+        """
+        self.end_time = time.monotonic()
+
+
+    def to_dict(self) -> Dict[str, Any]:
+        """ Return the metrics as a JSON-serializable dictionary.
+        """
+        with self.lock:
+            elapsed = (self.end_time or time.monotonic()) - self.start_time
+            stats = dict(self.analyzer_statistics)
+            for key in list(stats):
+                if key.endswith('_hits'):
+                    misses = stats.get(key[:-5] + '_misses', 0)
+                    if stats[key] + misses > 0:
+                        stats[key[:-5] + '_hit_rate'] = round(stats[key] / (stats[key] + misses), 4)
+
+            return {
+                'name': self.name,
+                'finished': self.end_time is not None,
+                'elapsed': round(elapsed, 3),
+                'places': self.places,
+                'batches': self.batches,
+                'places_per_second': round(self.places / elapsed, 1) if elapsed > 0 else 0.0,
+                'analysis_time': round(self.analysis_time, 3),
+                'write_time': round(self.write_time, 3),
+                'fetch_wait': round(self.fetch_wait, 3),
+                'pool_wait': round(self.pool_wait, 3),
+                'analyzer': {k: round(v, 4) for k, v in sorted(stats.items())},
+                'worker_rows_per_second': sorted((round(rows / elapsed, 1) if elapsed > 0
+                                                  else 0.0
+                                                  for rows in self.worker_rows.values()),
+                                                 reverse=True),
+                'slowest_batches': [{'time': round(b[0], 4), 'first_place_id': b[1],
+                                     'last_place_id': b[2], 'places': b[3]}
+                                    for b in sorted(self.slowest, reverse=True)]
+            }
+
+
+class IndexerMetrics:
+    """ Collects the metrics of all indexing steps of an indexer.
+
+        When `stream` is given, then a snapshot of the metrics is written
+        to it as a single line of JSON every `interval` seconds.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, interval: float = 0) -> None:
+        self.start_time = time.monotonic()
+        self.runners: List[RunnerMetrics] = []
+        self.stream = stream
+        self.interval = interval
+        self.next_snapshot = self.start_time + interval
+        self.lock = threading.Lock()
+
+
+    def start_runner(self, name: str) -> RunnerMetrics:
+        """ Start collecting metrics for a new indexing step.
+        """
+        metrics = RunnerMetrics(name)
+        with self.lock:
+            self.runners.append(metrics)
+        return metrics
+
+
+    def tick(self) -> None:
+        """ Write a snapshot to the stream, when the interval has passed.
+        """
+        if self.stream is None or self.interval <= 0:
+            return
+
+        now = time.monotonic()
+        if now < self.next_snapshot:
+            return
+
+        with self.lock:
+            if now < self.next_snapshot:
+                return
+            self.next_snapshot = now + self.interval
+
+        self.write(self.stream, 'snapshot')
+
+
+    def report(self) -> Dict[str, Any]:
+        """ Return the metrics of all steps so far as a JSON-serializable
+            dictionary.
+        """
+        with self.lock:
+            runners = list(self.runners)
+
+        steps = [r.to_dict() for r in runners]
+        return {
+            'elapsed': round(time.monotonic() - self.start_time, 3),
+            'places': sum(s['places'] for s in steps),
+            'steps': steps
+        }
+
+
+    def write(self, fd: TextIO, kind: str = 'report') -> None:
+        """ Write the metrics as a single line of JSON to the given file.
+        """
+        data = self.report()
+        data['type'] = kind
+        line = json.dumps(data)
+        with self.lock:
+            fd.write(line)
+            fd.write('\n')
+            fd.flush()
@@ -7,35 +7,70 @@
 """
 Helpers for progress logging.
 """
+from typing import Callable, Optional
 import logging
+import threading
 from datetime import datetime
 
 LOG = logging.getLogger()
 
 INITIAL_PROGRESS = 10
 
-class ProgressLogger:
+class ProgressLogger: # pylint: disable=too-many-instance-attributes
     """ Tracks and prints progress for the indexing process.
         `name` is the name of the indexing step being tracked.
         `total` sets up the total number of items that need processing.
         `log_interval` denotes the interval in seconds at which progress
         should be reported.
+
+        Progress may be reported from different threads.
+
+        When `checkpoint` is given, it is called with the number of
+        places done after each update.
+
+        When `estimated` is set, then `total` is only an estimate, which
+        should be refined with `refine_total()` while processing.
     """
 
-    def __init__(self, name: str, total: int, log_interval: int = 1) -> None:
+    def __init__(self, name: str, total: int, log_interval: int = 1,
+                 checkpoint: Optional[Callable[[int], None]] = None,
+                 estimated: bool = False) -> None:
         self.name = name
         self.total_places = total
+        self.estimated = estimated
         self.done_places = 0
         self.rank_start_time = datetime.now()
         self.log_interval = log_interval
         self.next_info = INITIAL_PROGRESS if LOG.isEnabledFor(logging.WARNING) else total + 1
+        self.checkpoint = checkpoint
+        self.lock = threading.Lock()
 
     def add(self, num: int = 1) -> None:
         """ Mark `num` places as processed. Print a log message if the
             logging is at least info and the log interval has passed.
         """
+        with self.lock:
+            self._add(num)
+
+    def refine_total(self, seen: int, complete: bool) -> None:
+        """ Adjust an estimated total. `seen` is the number of places
+            found so far and `complete` tells if these are all of them.
+            When more places than estimated are seen, the estimate is
+            raised to 10% above the places seen.
+        """
+        with self.lock:
+            if complete:
+                self.total_places = seen
+                self.estimated = False
+            elif seen > self.total_places:
+                self.total_places = seen + seen // 10
+
+    def _add(self, num: int) -> None:
         self.done_places += num
 
+        if self.checkpoint is not None:
+            self.checkpoint(self.done_places)
+
         if self.done_places < self.next_info:
             return
 
@@ -8,8 +8,9 @@
 Mix-ins that provide the actual commands for the indexer for various indexing
 tasks.
 """
-from typing import Any, List
+from typing import Any, List, Dict, Iterable, Iterator, Mapping, Optional, Sequence
 import functools
+import json
 
 from psycopg2 import sql as pysql
 import psycopg2.extras
@@ -17,24 +18,52 @@ import psycopg2.extras
 from nominatim.data.place_info import PlaceInfo
 from nominatim.tokenizer.base import AbstractAnalyzer
 from nominatim.db.async_connection import DBConnection
-from nominatim.typing import Query, DictCursorResult, DictCursorResults, Protocol
+from nominatim.db.utils import CopyBuffer
+from nominatim.typing import Query, DictCursorResults, Protocol
 
 # pylint: disable=C0111
 
 def _mk_valuelist(template: str, num: int) -> pysql.Composed:
     return pysql.SQL(',').join([pysql.SQL(template)] * num)
 
-def _analyze_place(place: DictCursorResult, analyzer: AbstractAnalyzer) -> psycopg2.extras.Json:
-    return psycopg2.extras.Json(analyzer.process_place(PlaceInfo(place)))
+def _hstore_quote(value: str) -> str:
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def _hstore_text(data: Optional[Mapping[str, Optional[str]]]) -> Optional[str]:
+    """ Return the text representation of an hstore with the given content.
+    """
+    if data is None:
+        return None
+
+    return ','.join(f"{_hstore_quote(k)}=>{'NULL' if v is None else _hstore_quote(v)}"
+                    for k, v in data.items())
+
+def analyze_places(analyzer: AbstractAnalyzer,
+                   places: Iterable[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """ Compute the token information for the given places.
+    """
+    return analyzer.process_places([PlaceInfo(place) for place in places])
+
+
+def _get_token_info(analyzer: AbstractAnalyzer, places: DictCursorResults,
+                    token_info: Optional[Sequence[Dict[str, Any]]]
+                   ) -> Iterator[psycopg2.extras.Json]:
+    if token_info is None:
+        token_info = analyze_places(analyzer, places)
+
+    return (psycopg2.extras.Json(info) for info in token_info)
 
 
 class Runner(Protocol):
+    @property
+    def analyzer(self) -> Optional[AbstractAnalyzer]: ...
     def name(self) -> str: ...
     def sql_count_objects(self) -> Query: ...
     def sql_get_objects(self) -> Query: ...
     def get_place_details(self, worker: DBConnection,
                           ids: DictCursorResults) -> DictCursorResults: ...
-    def index_places(self, worker: DBConnection, places: DictCursorResults) -> None: ...
+    def index_places(self, worker: DBConnection, places: DictCursorResults,
+                     token_info: Optional[Sequence[Dict[str, Any]]] = None) -> None: ...
 
 
 class AbstractPlacexRunner:
@@ -68,16 +97,54 @@ class AbstractPlacexRunner:
         return []
 
 
-    def index_places(self, worker: DBConnection, places: DictCursorResults) -> None:
+    def index_places(self, worker: DBConnection, places: DictCursorResults,
+                     token_info: Optional[Sequence[Dict[str, Any]]] = None) -> None:
         values: List[Any] = []
-        for place in places:
+        for place, info in zip(places, _get_token_info(self.analyzer, places, token_info)):
             for field in ('place_id', 'name', 'address', 'linked_place_id'):
                 values.append(place[field])
-            values.append(_analyze_place(place, self.analyzer))
+            values.append(info)
 
         worker.perform(self._index_sql(len(places)), values)
 
 
+    # Alternative write path through a staging table filled with COPY.
+
+    STAGING_COLUMNS = ('place_id', 'name', 'address', 'linked_place_id', 'token_info')
+
+    @staticmethod
+    def sql_create_staging_table(table: str) -> pysql.Composed:
+        return pysql.SQL("""CREATE UNLOGGED TABLE {} (place_id BIGINT,
+                                                      name hstore,
+                                                      address hstore,
+                                                      linked_place_id BIGINT,
+                                                      token_info jsonb)
+                         """).format(pysql.Identifier(table))
+
+
+    @staticmethod
+    def sql_index_staged(table: str) -> pysql.Composed:
+        return pysql.SQL(
+            """ UPDATE placex
+                SET indexed_status = 0, address = v.address, token_info = v.token_info,
+                    name = v.name, linked_place_id = v.linked_place_id
+                FROM {table} as v
+                WHERE placex.place_id = v.place_id;
+                TRUNCATE {table}
+            """).format(table=pysql.Identifier(table))
+
+
+    def add_to_copy_buffer(self, buffer: CopyBuffer, places: DictCursorResults,
+                           token_info: Optional[Sequence[Dict[str, Any]]] = None) -> None:
+        if token_info is None:
+            token_info = analyze_places(self.analyzer, places)
+
+        for place, info in zip(places, token_info):
+            buffer.add(place['place_id'], _hstore_text(place['name']),
+                       _hstore_text(place['address']), place['linked_place_id'],
+                       json.dumps(info))
+
+
 class RankRunner(AbstractPlacexRunner):
     """ Returns SQL commands for indexing one rank within the placex table.
     """
@@ -97,27 +164,67 @@ class RankRunner(AbstractPlacexRunner):
             """).format(pysql.Literal(self.rank))
 
 
+    def sql_count_sectors(self) -> pysql.Composed:
+        return pysql.SQL("""SELECT geometry_sector, count(*) FROM placex
+                            WHERE rank_address = {} and indexed_status > 0
+                                  and geometry_sector is not null
+                            GROUP BY geometry_sector ORDER BY geometry_sector
+                         """).format(pysql.Literal(self.rank))
+
+    def sql_get_objects_in_range(self, first: int, last: int) -> pysql.Composed:
+        return pysql.SQL(
+            """SELECT place_id, geometry_sector FROM placex
+               WHERE indexed_status > 0 and rank_address = {}
+                     and geometry_sector between {} and {}
+               ORDER BY geometry_sector
+            """).format(pysql.Literal(self.rank), pysql.Literal(first), pysql.Literal(last))
+
+
 class BoundaryRunner(AbstractPlacexRunner):
     """ Returns SQL commands for indexing the administrative boundaries
         of a certain rank.
     """
 
+    def __init__(self, rank: int, analyzer: AbstractAnalyzer,
+                 partition: Optional[int] = None) -> None:
+        super().__init__(rank, analyzer)
+        self.partition = partition
+
     def name(self) -> str:
-        return f"boundaries rank {self.rank}"
+        if self.partition is None:
+            return f"boundaries rank {self.rank}"
+        return f"boundaries rank {self.rank} partition {self.partition}"
+
+    def _partition_filter(self) -> pysql.Composable:
+        if self.partition is None:
+            return pysql.SQL('')
+        return pysql.SQL('AND partition = {}').format(pysql.Literal(self.partition))
 
     def sql_count_objects(self) -> pysql.Composed:
         return pysql.SQL("""SELECT count(*) FROM placex
                             WHERE indexed_status > 0
                               AND rank_search = {}
                               AND class = 'boundary' and type = 'administrative'
-                         """).format(pysql.Literal(self.rank))
+                              {}
+                         """).format(pysql.Literal(self.rank), self._partition_filter())
 
     def sql_get_objects(self) -> pysql.Composed:
         return self.SELECT_SQL + pysql.SQL(
             """WHERE indexed_status > 0 and rank_search = {}
                      and class = 'boundary' and type = 'administrative'
+                     {}
                ORDER BY partition, admin_level
-            """).format(pysql.Literal(self.rank))
+            """).format(pysql.Literal(self.rank), self._partition_filter())
+
+    @staticmethod
+    def sql_count_partitions(minrank: int, maxrank: int) -> pysql.Composed:
+        return pysql.SQL("""SELECT partition, rank_search, count(*) FROM placex
+                            WHERE indexed_status > 0
+                              AND rank_search between {} and {}
+                              AND class = 'boundary' and type = 'administrative'
+                              AND partition is not null
+                            GROUP BY partition, rank_search
+                         """).format(pysql.Literal(minrank), pysql.Literal(maxrank))
 
 
 class InterpolationRunner:
@@ -159,11 +266,12 @@ class InterpolationRunner:
                          """).format(_mk_valuelist("(%s, %s::hstore, %s::jsonb)", num_places))
 
 
-    def index_places(self, worker: DBConnection, places: DictCursorResults) -> None:
+    def index_places(self, worker: DBConnection, places: DictCursorResults,
+                     token_info: Optional[Sequence[Dict[str, Any]]] = None) -> None:
         values: List[Any] = []
-        for place in places:
+        for place, info in zip(places, _get_token_info(self.analyzer, places, token_info)):
             values.extend((place[x] for x in ('place_id', 'address')))
-            values.append(_analyze_place(place, self.analyzer))
+            values.append(info)
 
         worker.perform(self._index_sql(len(places)), values)
 
@@ -172,6 +280,7 @@ class InterpolationRunner:
 class PostcodeRunner(Runner):
     """ Provides the SQL commands for indexing the location_postcode table.
     """
+    analyzer = None
 
     def name(self) -> str:
         return "postcodes (location_postcode)"
@@ -190,7 +299,8 @@ class PostcodeRunner(Runner):
     def get_place_details(self, worker: DBConnection, ids: DictCursorResults) -> DictCursorResults:
         return ids
 
-    def index_places(self, worker: DBConnection, places: DictCursorResults) -> None:
+    def index_places(self, worker: DBConnection, places: DictCursorResults,
+                     token_info: Optional[Sequence[Dict[str, Any]]] = None) -> None:
         worker.perform(pysql.SQL("""UPDATE location_postcode SET indexed_status = 0
                                     WHERE place_id IN ({})""")
                        .format(pysql.SQL(',').join((pysql.Literal(i[0]) for i in places))))
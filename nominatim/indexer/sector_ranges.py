@@ -0,0 +1,147 @@
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Splitting of a rank into ranges of geometry sectors that can be
+indexed in parallel.
+"""
+from typing import Deque, Iterable, List, Optional, Tuple
+from collections import deque
+import threading
+
+from nominatim.typing import DictCursorResults
+
+class SectorRange:
+    """ Range of geometry sectors from `first` to `last` (inclusive) that
+        is processed by a single producer in order of the sectors.
+
+        The producer reports back the places it has taken from its cursor.
+        This allows another producer to steal the part of the range that
+        has not been reached yet. The end of the range is lowered then
+        and places beyond the new end are dropped when they are taken.
+    """
+
+    def __init__(self, first: int, last: int) -> None:
+        self.first = first
+        self.last = last
+        self.position = first - 1
+        self.lock = threading.Lock()
+
+
+    def remaining(self) -> int:
+        """ Return the number of sectors that have not been reached yet.
+        """
+        return self.last - self.position
+
+
+    def take(self, rows: DictCursorResults) -> Tuple[DictCursorResults, bool]:
+        """ Filter the rows read from the cursor of the range. The second
+            column of the rows must contain the geometry sector.
+            Returns the rows still belonging to the range and a flag,
+            if the end of the range has been reached.
+        """
+        with self.lock:
+            if rows and rows[-1][1] > self.last:
+                rows = [r for r in rows if r[1] <= self.last]
+                if rows:
+                    self.position = rows[-1][1]
+                return rows, True
+
+            if rows:
+                self.position = rows[-1][1]
+            return rows, False
+
+
+    def split(self) -> Optional['SectorRange']:
+        """ Cut off the second half of the sectors that have not been
+            reached yet and return it as a new range. Returns None when
+            the range is too small to be split.
+        """
+        with self.lock:
+            if self.last - self.position < 2:
+                return None
+
+            middle = (self.position + self.last) // 2
+            stolen = SectorRange(middle + 1, self.last)
+            self.last = middle
+
+            return stolen
+
+
+class SectorRangeQueue:
+    """ Hands out sector ranges to the producers. When all ranges have
+        been handed out, the remaining part of the largest range still
+        in process is split off and handed out instead.
+    """
+
+    def __init__(self, ranges: Iterable[SectorRange]) -> None:
+        self.todo: Deque[SectorRange] = deque(ranges)
+        self.active: List[SectorRange] = []
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+
+    def next_range(self) -> Optional[SectorRange]:
+        """ Get the next range to process or None if there is no more work.
+        """
+        with self.lock:
+            if self.cancelled:
+                return None
+
+            srange: Optional[SectorRange] = None
+            if self.todo:
+                srange = self.todo.popleft()
+            else:
+                for victim in sorted(self.active, key=SectorRange.remaining, reverse=True):
+                    srange = victim.split()
+                    if srange is not None:
+                        break
+
+            if srange is not None:
+                self.active.append(srange)
+
+            return srange
+
+
+    def done(self, srange: SectorRange) -> None:
+        """ Mark the given range as completely processed.
+        """
+        with self.lock:
+            self.active.remove(srange)
+
+
+    def cancel(self) -> None:
+        """ Stop handing out ranges.
+        """
+        with self.lock:
+            self.cancelled = True
+
+
+def split_sectors(sector_counts: Iterable[Tuple[int, int]], num: int) -> List[SectorRange]:
+    """ Split the sectors into `num` ranges with roughly the same
+        number of places. `sector_counts` must contain pairs of
+        (sector, number of places) ordered by sector.
+    """
+    counts = list(sector_counts)
+    if not counts:
+        return []
+
+    total = sum(c[1] for c in counts)
+    target = total / max(1, num)
+
+    ranges: List[SectorRange] = []
+    first = counts[0][0]
+    done = 0
+    for sector, count in counts:
+        done += count
+        if done >= target * (len(ranges) + 1) and len(ranges) < num - 1:
+            ranges.append(SectorRange(first, sector))
+            first = sector + 1
+
+    if first <= counts[-1][0]:
+        ranges.append(SectorRange(first, counts[-1][0]))
+
+    return ranges
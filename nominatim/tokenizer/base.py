@@ -9,7 +9,7 @@ Abstract class definitions for tokenizers. These base classes are here
 mainly for documentation purposes.
 """
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Dict, Any, Optional, Iterable
+from typing import List, Tuple, Dict, Any, Optional, Iterable, Sequence, Callable
 from pathlib import Path
 
 from nominatim.config import Configuration
@@ -121,6 +121,34 @@ class AbstractAnalyzer(ABC):
         """
 
 
+    def process_places(self, places: Sequence[PlaceInfo]) -> List[Any]:
+        """ Extract tokens for a list of places. Analyzers may
+            overwrite this function to process the places more efficiently
+            than one by one.
+
+            Arguments:
+                places: Place information retrieved from the database.
+
+            Returns:
+                A list with the result of `process_place()` for each place
+                in the same order as the input.
+        """
+        return [self.process_place(place) for place in places]
+
+
+    def get_statistics(self) -> Dict[str, float]:
+        """ Return counters about the work done by the analyzer so far.
+            They are only used for reporting. Analyzers may overwrite
+            this function to report internal timings or cache usage.
+
+            Returns:
+                A dictionary of counters that only ever increase.
+                For pairs of counters `<name>_hits` and `<name>_misses`,
+                the indexer reports the hit rate.
+        """
+        return {}
+
+
 
 class AbstractTokenizer(ABC):
     """ The tokenizer instance is the central instance of the tokenizer in
@@ -233,6 +261,20 @@ class AbstractTokenizer(ABC):
         """
 
 
+    def shared_analyzer_factory(self) -> Callable[[], AbstractAnalyzer]:
+        """ Return a function that creates name analyzers like
+            `name_analyzer()`. Static data of the analyzers, like compiled
+            rules, is loaded once when this function is called. Processes
+            forked afterwards inherit it instead of loading it again.
+
+            The analyzers share this data, so that they must not be used
+            in different threads of the same process.
+
+            The default implementation shares nothing.
+        """
+        return self.name_analyzer
+
+
 class TokenizerModule(Protocol):
     """ Interface that must be exported by modules that implement their
         own tokenizer.
@@ -8,6 +8,7 @@
 Helper class to create ICU rules from a configuration file.
 """
 from typing import Mapping, Any, Dict, Optional
+import hashlib
 import io
 import json
 import logging
@@ -79,7 +80,11 @@ class ICURuleLoader:
             self.analysis_rules = json.loads(rules)
         else:
             self.analysis_rules = []
-        self._setup_analysis()
+
+        # Usually the rules in the database are the same as in the
+        # configuration, so that the analysis does not need to be redone.
+        if self.get_rules_hash() != self._analysis_hash:
+            self._setup_analysis()
 
 
     def save_config_to_db(self, conn: Connection) -> None:
@@ -94,7 +99,8 @@ class ICURuleLoader:
     def make_sanitizer(self) -> PlaceSanitizer:
         """ Create a place sanitizer from the configured rules.
         """
-        return PlaceSanitizer(self.sanitizer_rules, self.config)
+        return PlaceSanitizer(self.sanitizer_rules, self.config,
+                              statistics=self.config.get_bool('TOKENIZER_SANITIZER_STATISTICS'))
 
 
     def make_token_analysis(self) -> ICUTokenAnalysis:
@@ -129,6 +135,19 @@ class ICURuleLoader:
         return self.transliteration_rules
 
 
+    def get_rules_hash(self) -> str:
+        """ Return a hash over the normalization, transliteration and
+            token analysis rules.
+        """
+        rules = hashlib.sha256()
+        for part in (self.normalization_rules, self.transliteration_rules,
+                     json.dumps(self.analysis_rules, sort_keys=True)):
+            rules.update(part.encode('utf-8'))
+            rules.update(b'\0')
+
+        return rules.hexdigest()
+
+
     def _setup_analysis(self) -> None:
         """ Process the rules used for creating the various token analyzers.
         """
@@ -154,6 +173,8 @@ class ICURuleLoader:
             self.analysis[name] = TokenAnalyzerRule(section, norm, trans,
                                                     self.config)
 
+        self._analysis_hash = self.get_rules_hash()
+
 
     @staticmethod
     def _cfg_to_icu_rules(rules: Mapping[str, Any], section: str) -> str:
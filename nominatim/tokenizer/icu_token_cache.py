@@ -0,0 +1,346 @@
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Cache for the token information of the ICU name analyzer.
+"""
+from typing import Dict, List, Set, Tuple, Optional, Any, NamedTuple, Container, cast
+import dataclasses
+import gzip
+import itertools
+import json
+import logging
+import os
+from pathlib import Path
+
+from psycopg2.extras import Json
+
+from nominatim.db.connection import Cursor
+
+LOG = logging.getLogger()
+
+
+class TokenCacheSettings(NamedTuple):
+    """ Settings for the token cache of the name analyzers: the maximum
+        number of entries per kind of token (unlimited when 0), the number
+        of frequent tokens to preload from the word table and the file
+        for the snapshot of the cache.
+    """
+    size: int = 0
+    preload: int = 0
+    snapshot: Optional[Path] = None
+
+
+@dataclasses.dataclass
+class MissingTokens:
+    """ Tokens that are not in the cache yet, collected for a batch of
+        places, so that they can be fetched with one query per kind.
+    """
+    # Token ID of the name -> lookup variants
+    names: Dict[str, List[str]] = dataclasses.field(default_factory=dict)
+    partials: Set[str] = dataclasses.field(default_factory=set)
+    fulls: Set[str] = dataclasses.field(default_factory=set)
+    housenumbers: Set[str] = dataclasses.field(default_factory=set)
+    # Canonical housenumber -> lookup variants
+    analyzed_housenumbers: Dict[str, List[str]] = dataclasses.field(default_factory=dict)
+    # Postcode word -> lookup variants
+    postcodes: Dict[str, List[str]] = dataclasses.field(default_factory=dict)
+
+
+class TokenCache:
+    """ Cache for token information to avoid repeated database queries.
+
+        This cache is not thread-safe and needs to be instantiated per
+        analyzer.
+
+        When 'max_size' is larger than 0, each kind of token keeps at most
+        that many entries. When trimming, the older half of the entries
+        is dropped.
+
+        Lookups made with `check()` are counted in 'statistics'.
+    """
+    SNAPSHOT_VERSION = 1
+
+    def __init__(self, max_size: int = 0) -> None:
+        self.max_size = max_size
+        self.names: Dict[str, Tuple[int, List[int]]] = {}
+        self.partials: Dict[str, int] = {}
+        self.fulls: Dict[str, List[int]] = {}
+        self.postcodes: Set[str] = set()
+        self.housenumbers: Dict[str, Tuple[Optional[int], Optional[str]]] = {}
+        self.statistics: Dict[str, float] = {}
+
+
+    def __len__(self) -> int:
+        return len(self.names) + len(self.partials) + len(self.fulls) \
+               + len(self.postcodes) + len(self.housenumbers)
+
+
+    def check(self, kind: str, token: str, pending: Container[str]) -> bool:
+        """ Return True when the token is in the cache or in 'pending'
+            and count the lookup as hit or miss. 'kind' is one of 'name',
+            'partial', 'street', 'housenumber' or 'postcode'.
+        """
+        caches: Dict[str, Container[str]] = {'name': self.names, 'partial': self.partials,
+                                             'street': self.fulls,
+                                             'housenumber': self.housenumbers,
+                                             'postcode': self.postcodes}
+        hit = token in caches[kind] or token in pending
+        key = f"{kind}_cache_{'hits' if hit else 'misses'}"
+        self.statistics[key] = self.statistics.get(key, 0) + 1
+
+        return hit
+
+
+    def trim(self) -> None:
+        """ Shrink all kinds of tokens that have grown beyond the size limit.
+        """
+        if self.max_size <= 0:
+            return
+
+        keep = self.max_size // 2
+        if len(self.names) > self.max_size:
+            self.names = _keep_newest(self.names, keep)
+        if len(self.partials) > self.max_size:
+            self.partials = _keep_newest(self.partials, keep)
+        if len(self.fulls) > self.max_size:
+            self.fulls = _keep_newest(self.fulls, keep)
+        if len(self.housenumbers) > self.max_size:
+            self.housenumbers = _keep_newest(self.housenumbers, keep)
+        if len(self.postcodes) > self.max_size:
+            # Sets have no order, so drop arbitrary entries.
+            self.postcodes = set(itertools.islice(self.postcodes, keep))
+
+
+    def setup(self, cursor: Cursor, settings: TokenCacheSettings,
+              analyzed_housenumbers: bool) -> None:
+        """ Fill the cache from the snapshot file and with the most
+            frequent tokens from the word table as requested in the settings.
+        """
+        if settings.snapshot is not None and settings.snapshot.exists():
+            self.load(settings.snapshot, get_snapshot_fingerprint(cursor))
+        if settings.preload > 0:
+            num = settings.preload if self.max_size <= 0 else min(settings.preload, self.max_size)
+            LOG.info("Preloading token cache with %d tokens per kind.", num)
+            self.preload(cursor, num, analyzed_housenumbers)
+
+
+    def preload(self, cursor: Cursor, num: int, analyzed_housenumbers: bool) -> None:
+        """ Fill the cache with up to 'num' tokens of each kind from the
+            word table. Names and partial words are chosen by their
+            frequency. Housenumbers have no frequency information, the
+            shortest ones are loaded instead. Postcodes are loaded in no
+            particular order.
+        """
+        cursor.execute("""WITH top AS (
+                            SELECT word, min(word_id) as full_token,
+                                   array_agg(word_token) as lookups
+                            FROM word WHERE type = 'W' and word is not null
+                            GROUP BY word
+                            ORDER BY max((info->>'count')::int) DESC NULLS LAST
+                            LIMIT %s)
+                          SELECT word, full_token,
+                                 ARRAY(SELECT min(p.word_id) FROM word p
+                                       WHERE p.type = 'w'
+                                             and p.word_token IN (
+                                               SELECT trim(t)
+                                               FROM unnest(top.lookups) as l,
+                                                    unnest(string_to_array(l, ' ')) as t)
+                                       GROUP BY p.word_token)
+                          FROM top""", (num, ))
+        for token_id, full, part in cursor:
+            self.names[token_id] = (full, part)
+
+        cursor.execute("""SELECT word_token, min(word_id) FROM word
+                          WHERE type = 'w' GROUP BY word_token
+                          ORDER BY max((info->>'count')::int) DESC NULLS LAST
+                          LIMIT %s""", (num, ))
+        for partial, token in cursor:
+            self.partials[partial] = token
+
+        cursor.execute("""SELECT word_token, array_agg(word_id) FROM word
+                          WHERE type = 'W' GROUP BY word_token
+                          ORDER BY max((info->>'count')::int) DESC NULLS LAST
+                          LIMIT %s""", (num, ))
+        for norm_name, word_ids in cursor:
+            self.fulls[norm_name] = word_ids
+
+        if analyzed_housenumbers:
+            cursor.execute("""SELECT word, min(word_id), min(info->>'lookup') FROM word
+                              WHERE type = 'H' and word is not null GROUP BY word
+                              ORDER BY char_length(word), word LIMIT %s""", (num, ))
+            for word_id, hid, lookup in cursor:
+                self.housenumbers[word_id] = (hid, lookup)
+        else:
+            cursor.execute("""SELECT word_token, min(word_id) FROM word
+                              WHERE type = 'H' GROUP BY word_token
+                              ORDER BY char_length(word_token), word_token
+                              LIMIT %s""", (num, ))
+            for norm_name, hid in cursor:
+                self.housenumbers[norm_name] = (hid, norm_name)
+
+        cursor.execute("SELECT DISTINCT word FROM word WHERE type = 'P' LIMIT %s", (num, ))
+        self.postcodes.update(row[0] for row in cursor)
+
+
+    def fetch_missing(self, cursor: Cursor, missing: MissingTokens) -> None:
+        """ Look up or create the missing tokens in the database and add
+            them to the cache. Uses a single query per kind of token.
+        """
+        if missing.names:
+            self._fetch_names(cursor, missing.names)
+        if missing.partials:
+            self._fetch_partials(cursor, missing.partials)
+        if missing.fulls:
+            self._fetch_fulls(cursor, missing.fulls)
+        if missing.housenumbers:
+            self._fetch_housenumbers(cursor, missing.housenumbers)
+        if missing.analyzed_housenumbers:
+            self._fetch_analyzed_housenumbers(cursor, missing.analyzed_housenumbers)
+        if missing.postcodes:
+            self._fetch_postcodes(cursor, missing.postcodes)
+
+
+    def _fetch_names(self, cursor: Cursor, names: Dict[str, List[str]]) -> None:
+        cursor.execute("""SELECT v.key, f.full_token, f.partial_tokens
+                          FROM jsonb_each(%s::jsonb) as v,
+                               LATERAL getorcreate_full_word(
+                                 v.key, ARRAY(SELECT jsonb_array_elements_text(v.value))) as f
+                       """, (Json(names), ))
+        for token_id, full, part in cursor:
+            self.names[token_id] = (full, part)
+
+
+    def _fetch_partials(self, cursor: Cursor, partials: Set[str]) -> None:
+        cursor.execute("""SELECT word, getorcreate_partial_word(word)
+                          FROM unnest(%s) word""",
+                       (list(partials), ))
+        for partial, token in cursor:
+            self.partials[partial] = token
+
+
+    def _fetch_fulls(self, cursor: Cursor, fulls: Set[str]) -> None:
+        cursor.execute("""SELECT word_token, array_agg(word_id) FROM word
+                          WHERE word_token = ANY(%s) and type = 'W'
+                          GROUP BY word_token""",
+                       (list(fulls), ))
+        for norm_name, word_ids in cursor:
+            self.fulls[norm_name] = word_ids
+        for norm_name in fulls:
+            # Remember streets that do not exist.
+            self.fulls.setdefault(norm_name, [])
+
+
+    def _fetch_housenumbers(self, cursor: Cursor, housenumbers: Set[str]) -> None:
+        cursor.execute("SELECT hnr, getorcreate_hnr_id(hnr) FROM unnest(%s) hnr",
+                       (list(housenumbers), ))
+        for norm_name, hid in cursor:
+            self.housenumbers[norm_name] = (hid, norm_name)
+
+
+    def _fetch_analyzed_housenumbers(self, cursor: Cursor,
+                                     housenumbers: Dict[str, List[str]]) -> None:
+        cursor.execute("""SELECT v.key, create_analyzed_hnr_id(
+                                 v.key, ARRAY(SELECT jsonb_array_elements_text(v.value)))
+                          FROM jsonb_each(%s::jsonb) as v
+                       """, (Json(housenumbers), ))
+        for word_id, hid in cursor:
+            self.housenumbers[word_id] = (hid, housenumbers[word_id][0])
+
+
+    def _fetch_postcodes(self, cursor: Cursor, postcodes: Dict[str, List[str]]) -> None:
+        cursor.execute("""SELECT create_postcode_word(
+                                 v.key, ARRAY(SELECT jsonb_array_elements_text(v.value)))
+                          FROM jsonb_each(%s::jsonb) as v
+                       """, (Json(postcodes), ))
+        self.postcodes.update(postcodes)
+
+
+    def save(self, path: Path, fingerprint: Tuple[int, int]) -> None:
+        """ Write the content of the cache to a compressed snapshot file.
+            The file is replaced atomically, so that concurrent analyzers
+            never see a half-written snapshot. Streets that were not found
+            are not saved because they may be added to the database later.
+        """
+        data = {'version': self.SNAPSHOT_VERSION,
+                'database': fingerprint[0], 'max_word_id': fingerprint[1],
+                'names': self.names, 'partials': self.partials,
+                'fulls': {k: v for k, v in self.fulls.items() if v},
+                'postcodes': list(self.postcodes), 'housenumbers': self.housenumbers}
+
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        try:
+            with gzip.open(tmp, 'wt', encoding='utf-8') as fd:
+                json.dump(data, fd, separators=(',', ':'))
+            tmp.replace(path)
+        except OSError as exp:
+            LOG.warning("Cannot save token cache snapshot '%s': %s", path, exp)
+            return
+
+        LOG.info("Saved %d tokens to token cache snapshot '%s'.", len(self), path)
+
+
+    def load(self, path: Path, fingerprint: Tuple[int, int]) -> bool:
+        """ Add the tokens from a snapshot file to the cache. Snapshots
+            from a different database or with tokens that are newer than
+            the current word ID sequence are ignored.
+            Returns True when the snapshot was loaded.
+        """
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as fd:
+                data = json.load(fd)
+
+            if data['version'] != self.SNAPSHOT_VERSION \
+               or data['database'] != fingerprint[0] \
+               or data['max_word_id'] > fingerprint[1]:
+                LOG.warning("Token cache snapshot '%s' is outdated. Ignored.", path)
+                return False
+
+            names = {k: (v[0], v[1]) for k, v in data['names'].items()}
+            housenumbers = {k: (v[0], v[1]) for k, v in data['housenumbers'].items()}
+            self.names.update(names)
+            self.partials.update(data['partials'])
+            self.fulls.update((k, v) for k, v in data['fulls'].items() if v)
+            self.postcodes.update(data['postcodes'])
+            self.housenumbers.update(housenumbers)
+        except (OSError, EOFError, ValueError, KeyError, TypeError, IndexError) as exp:
+            LOG.warning("Cannot read token cache snapshot '%s': %s", path, exp)
+            return False
+
+        self.trim()
+        LOG.info("Loaded %d tokens from token cache snapshot '%s'.", len(self), path)
+
+        return True
+
+
+def get_snapshot_fingerprint(cursor: Cursor) -> Tuple[int, int]:
+    """ Return the OID of the database and the current value of the
+        word ID sequence. Snapshots of the token cache are only valid
+        for the same database and as long as the sequence has not been
+        reset.
+    """
+    cursor.execute("""SELECT (SELECT oid FROM pg_database
+                              WHERE datname = current_database()),
+                             (SELECT last_value FROM seq_word)""")
+    dboid, last_word_id = cast(Tuple[int, int], cursor.fetchone())
+
+    return int(dboid), int(last_word_id)
+
+
+def remove_snapshot(path: Path) -> None:
+    """ Delete a token cache snapshot, which has become invalid.
+    """
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _keep_newest(cache: Dict[str, Any], num: int) -> Dict[str, Any]:
+    """ Return a copy of the dictionary with only the 'num' most recently
+        inserted entries.
+    """
+    return dict(itertools.islice(cache.items(), len(cache) - num, None))
@@ -9,10 +9,11 @@ Tokenizer implementing normalisation as used before Nominatim 4 but using
 libICU instead of the PostgreSQL module.
 """
 from typing import Optional, Sequence, List, Tuple, Mapping, Any, cast, \
-                   Dict, Set, Iterable
+                   Dict, Set, Iterable, Callable
 import itertools
 import json
 import logging
+import time
 from pathlib import Path
 from textwrap import dedent
 
@@ -25,6 +26,9 @@ from nominatim.tokenizer.icu_rule_loader import ICURuleLoader
 from nominatim.tokenizer.place_sanitizer import PlaceSanitizer
 from nominatim.data.place_name import PlaceName
 from nominatim.tokenizer.icu_token_analysis import ICUTokenAnalysis
+from nominatim.tokenizer.icu_token_cache import TokenCache, TokenCacheSettings, \
+                                               MissingTokens, get_snapshot_fingerprint, \
+                                               remove_snapshot
 from nominatim.tokenizer.base import AbstractAnalyzer, AbstractTokenizer
 
 DBCFG_TERM_NORMALIZATION = "tokenizer_term_normalization"
@@ -47,6 +51,7 @@ class ICUTokenizer(AbstractTokenizer):
         self.dsn = dsn
         self.data_dir = data_dir
         self.loader: Optional[ICURuleLoader] = None
+        self.cache_settings = TokenCacheSettings()
 
 
     def init_new_db(self, config: Configuration, init_db: bool = True) -> None:
@@ -56,6 +61,7 @@ class ICUTokenizer(AbstractTokenizer):
             sure the tokenizer remains stable even over updates.
         """
         self.loader = ICURuleLoader(config)
+        self._load_cache_settings(config)
 
         self._install_php(config.lib_dir.php, overwrite=True)
         self._save_config()
@@ -69,6 +75,7 @@ class ICUTokenizer(AbstractTokenizer):
         """ Initialise the tokenizer from the project directory.
         """
         self.loader = ICURuleLoader(config)
+        self._load_cache_settings(config)
 
         with connect(self.dsn) as conn:
             self.loader.load_config_from_db(conn)
@@ -76,6 +83,14 @@ class ICUTokenizer(AbstractTokenizer):
         self._install_php(config.lib_dir.php, overwrite=False)
 
 
+    def _load_cache_settings(self, config: Configuration) -> None:
+        """ Read the settings for the token cache of the name analyzers.
+        """
+        self.cache_settings = TokenCacheSettings(config.get_int('TOKENIZER_CACHE_SIZE'),
+                                                 config.get_int('TOKENIZER_CACHE_PRELOAD'),
+                                                 config.get_path('TOKENIZER_CACHE_FILE'))
+
+
     def finalize_import(self, config: Configuration) -> None:
         """ Do any required postprocessing to make the tokenizer data ready
             for use.
@@ -160,6 +175,9 @@ class ICUTokenizer(AbstractTokenizer):
         """
         LOG.warning("Cleaning up housenumber tokens.")
         self._cleanup_housenumbers()
+        if self.cache_settings.snapshot is not None:
+            # The snapshot may contain the deleted tokens.
+            remove_snapshot(self.cache_settings.snapshot)
         LOG.warning("Tokenizer house-keeping done.")
 
 
@@ -179,8 +197,25 @@ class ICUTokenizer(AbstractTokenizer):
             Analyzers are not thread-safe. You need to instantiate one per thread.
         """
         assert self.loader is not None
-        return ICUNameAnalyzer(self.dsn, self.loader.make_sanitizer(),
-                               self.loader.make_token_analysis())
+        return self._make_name_analyzer(self.loader.make_sanitizer(),
+                                        self.loader.make_token_analysis())
+
+
+    def shared_analyzer_factory(self) -> Callable[[], 'ICUNameAnalyzer']:
+        """ Return a function that creates name analyzers, which all use
+            the same sanitizer and token analysis. Compiling the ICU rules
+            is then only done once, instead of once per analyzer.
+        """
+        assert self.loader is not None
+        sanitizer = self.loader.make_sanitizer()
+        token_analysis = self.loader.make_token_analysis()
+
+        return lambda: self._make_name_analyzer(sanitizer, token_analysis)
+
+
+    def _make_name_analyzer(self, sanitizer: PlaceSanitizer,
+                            token_analysis: ICUTokenAnalysis) -> 'ICUNameAnalyzer':
+        return ICUNameAnalyzer(self.dsn, sanitizer, token_analysis, self.cache_settings)
 
 
     def _install_php(self, phpdir: Path, overwrite: bool = True) -> None:
@@ -222,22 +257,35 @@ class ICUNameAnalyzer(AbstractAnalyzer):
 
         Each instance opens a connection to the database to request the
         normalization.
+
+        The token cache of the analyzer is set up according to
+        'cache_settings'. It may be pre-filled with the most frequent
+        tokens from the word table and with the snapshot file, which is
+        updated again when the analyzer is closed.
     """
 
-    def __init__(self, dsn: str, sanitizer: PlaceSanitizer,
-                 token_analysis: ICUTokenAnalysis) -> None:
+    def __init__(self, dsn: str, sanitizer: PlaceSanitizer, token_analysis: ICUTokenAnalysis,
+                 cache_settings: TokenCacheSettings = TokenCacheSettings()) -> None:
         self.conn: Optional[Connection] = connect(dsn).connection
         self.conn.autocommit = True
         self.sanitizer = sanitizer
         self.token_analysis = token_analysis
+        self.cache_file = cache_settings.snapshot
+
+        self._cache = TokenCache(cache_settings.size)
+        self._sanitizer_time = 0.0
 
-        self._cache = _TokenCache()
+        with self.conn.cursor() as cur:
+            self._cache.setup(cur, cache_settings, '@housenumber' in token_analysis.analysis)
 
 
     def close(self) -> None:
         """ Free all resources used by the analyzer.
         """
         if self.conn:
+            if self.cache_file is not None:
+                with self.conn.cursor() as cur:
+                    self._cache.save(self.cache_file, get_snapshot_fingerprint(cur))
             self.conn.close()
             self.conn = None
 
@@ -335,6 +383,10 @@ class ICUNameAnalyzer(AbstractAnalyzer):
 
         # Now update the word table.
         self._delete_unused_postcode_words(word_entries - needed_entries)
+        # Deleted postcodes must not survive in the cache or its snapshot.
+        self._cache.postcodes.clear()
+        if self.cache_file is not None:
+            remove_snapshot(self.cache_file)
         self._add_missing_postcode_words(needed_entries - word_entries)
 
     def _delete_unused_postcode_words(self, tokens: Iterable[str]) -> None:
@@ -517,10 +569,48 @@ class ICUNameAnalyzer(AbstractAnalyzer):
             Returns a JSON-serializable structure that will be handed into
             the database via the token_info field.
         """
-        token_info = _TokenInfo()
-
         names, address = self.sanitizer.process_names(place)
 
+        self._cache.trim()
+
+        return self._process_sanitized_place(place, names, address)
+
+
+    def process_places(self, places: Sequence[PlaceInfo]) -> List[Mapping[str, Any]]:
+        """ Determine tokenizer information for a list of places.
+
+            All tokens that are missing from the cache are first looked up
+            or created in the database with a single query per kind of token.
+            Then the token information is computed from the cache.
+        """
+        tstart = time.perf_counter()
+        sanitized = [self.sanitizer.process_names(place) for place in places]
+        self._sanitizer_time += time.perf_counter() - tstart
+
+        self._cache.trim()
+        self._prefetch_tokens(sanitized)
+
+        return [self._process_sanitized_place(place, names, address)
+                for place, (names, address) in zip(places, sanitized)]
+
+
+    def get_statistics(self) -> Dict[str, float]:
+        """ Return the time spent in the sanitizers and the number of
+            hits and misses of the token cache per kind of token.
+            Only places processed with `process_places()` are counted.
+            Per-step counters of the sanitizer are included, when enabled.
+        """
+        stats = {'sanitizer_time': self._sanitizer_time}
+        stats.update(self._cache.statistics)
+        stats.update(self.sanitizer.get_statistics())
+
+        return stats
+
+
+    def _process_sanitized_place(self, place: PlaceInfo, names: Sequence[PlaceName],
+                                 address: Sequence[PlaceName]) -> Mapping[str, Any]:
+        token_info = _TokenInfo()
+
         if names:
             token_info.set_names(*self._compute_name_tokens(names))
 
@@ -534,6 +624,81 @@ class ICUNameAnalyzer(AbstractAnalyzer):
         return token_info.to_dict()
 
 
+    def _prefetch_tokens(self,
+                         places: Sequence[Tuple[List[PlaceName], List[PlaceName]]]) -> None:
+        """ Make sure that the token cache contains all tokens needed for
+            the given sanitized names and addresses.
+        """
+        assert self.conn is not None
+        missing = MissingTokens()
+
+        for place_names, address in places:
+            for name in place_names:
+                self._collect_name(name, missing)
+            for item in address:
+                if item.kind == 'postcode':
+                    self._collect_postcode(item, missing)
+                elif item.kind == 'housenumber':
+                    self._collect_housenumber(item, missing)
+                elif item.kind == 'street':
+                    self._collect_street(item, missing)
+                elif not item.suffix and \
+                     (item.kind == 'place' or (not item.kind.startswith('_') and
+                                               item.kind not in ('country', 'full',
+                                                                 'inclusion'))):
+                    self._collect_partials(item, missing)
+
+        with self.conn.cursor() as cur:
+            self._cache.fetch_missing(cur, missing)
+
+
+    def _collect_name(self, name: PlaceName, missing: MissingTokens) -> None:
+        analyzer_id = name.get_attr('analyzer')
+        analyzer = self.token_analysis.get_analyzer(analyzer_id)
+        word_id = analyzer.get_canonical_id(name)
+        token_id = word_id if analyzer_id is None else f'{word_id}@{analyzer_id}'
+        if not self._cache.check('name', token_id, missing.names):
+            variants = analyzer.compute_variants(word_id)
+            if variants:
+                missing.names[token_id] = variants
+
+
+    def _collect_postcode(self, item: PlaceName, missing: MissingTokens) -> None:
+        postcode_name, postcode = self._get_postcode_word(item)
+        if not self._cache.check('postcode', postcode, missing.postcodes):
+            variants = self._get_postcode_variants(item, postcode_name)
+            if variants:
+                missing.postcodes[postcode] = list(variants)
+
+
+    def _collect_housenumber(self, item: PlaceName, missing: MissingTokens) -> None:
+        analyzer = self.token_analysis.analysis.get('@housenumber')
+        if analyzer is None:
+            norm_name = self._search_normalized(item.name)
+            if norm_name and not self._cache.check('housenumber', norm_name,
+                                                   missing.housenumbers):
+                missing.housenumbers.add(norm_name)
+        else:
+            word_id = analyzer.get_canonical_id(item)
+            if word_id and not self._cache.check('housenumber', word_id,
+                                                 missing.analyzed_housenumbers):
+                variants = analyzer.compute_variants(word_id)
+                if variants:
+                    missing.analyzed_housenumbers[word_id] = variants
+
+
+    def _collect_street(self, item: PlaceName, missing: MissingTokens) -> None:
+        norm_name = self._search_normalized(item.name)
+        if not self._cache.check('street', norm_name, missing.fulls):
+            missing.fulls.add(norm_name)
+
+
+    def _collect_partials(self, item: PlaceName, missing: MissingTokens) -> None:
+        for partial in self._search_normalized(item.name).split():
+            if not self._cache.check('partial', partial, missing.partials):
+                missing.partials.add(partial)
+
+
     def _process_place_address(self, token_info: '_TokenInfo',
                                address: Sequence[PlaceName]) -> None:
         for item in address:
@@ -678,33 +843,51 @@ class ICUNameAnalyzer(AbstractAnalyzer):
         return full_tokens, partial_tokens
 
 
-    def _add_postcode(self, item: PlaceName) -> Optional[str]:
-        """ Make sure the normalized postcode is present in the word table.
+    def _get_postcode_word(self, item: PlaceName) -> Tuple[str, str]:
+        """ Return the canonical name of the postcode and the word under
+            which it is saved in the word table.
         """
-        assert self.conn is not None
         analyzer = self.token_analysis.analysis.get('@postcode')
 
         if analyzer is None:
-            postcode_name = item.name.strip().upper()
-            variant_base = None
-        else:
-            postcode_name = analyzer.get_canonical_id(item)
-            variant_base = item.get_attr("variant")
+            return item.name.strip().upper(), item.name.strip().upper()
 
+        postcode_name = analyzer.get_canonical_id(item)
+        variant_base = item.get_attr("variant")
         if variant_base:
-            postcode = f'{postcode_name}@{variant_base}'
-        else:
-            postcode = postcode_name
+            return postcode_name, f'{postcode_name}@{variant_base}'
+
+        return postcode_name, postcode_name
+
+
+    def _get_postcode_variants(self, item: PlaceName, postcode_name: str) -> Set[str]:
+        """ Return the lookup variants for the postcode. The set is empty
+            when the postcode normalizes to nothing.
+        """
+        term = self._search_normalized(postcode_name)
+        if not term:
+            return set()
+
+        variants = {term}
+        analyzer = self.token_analysis.analysis.get('@postcode')
+        variant_base = item.get_attr("variant")
+        if analyzer is not None and variant_base:
+            variants.update(analyzer.compute_variants(variant_base))
+
+        return variants
+
+
+    def _add_postcode(self, item: PlaceName) -> Optional[str]:
+        """ Make sure the normalized postcode is present in the word table.
+        """
+        assert self.conn is not None
+        postcode_name, postcode = self._get_postcode_word(item)
 
         if postcode not in self._cache.postcodes:
-            term = self._search_normalized(postcode_name)
-            if not term:
+            variants = self._get_postcode_variants(item, postcode_name)
+            if not variants:
                 return None
 
-            variants = {term}
-            if analyzer is not None and variant_base:
-                variants.update(analyzer.compute_variants(variant_base))
-
             with self.conn.cursor() as cur:
                 cur.execute("SELECT create_postcode_word(%s, %s)",
                             (postcode, list(variants)))
@@ -797,17 +980,3 @@ class _TokenInfo:
         """ Set the postcode to the given one.
         """
         self.postcode = postcode
-
-
-class _TokenCache:
-    """ Cache for token information to avoid repeated database queries.
-
-        This cache is not thread-safe and needs to be instantiated per
-        analyzer.
-    """
-    def __init__(self) -> None:
-        self.names: Dict[str, Tuple[int, List[int]]] = {}
-        self.partials: Dict[str, int] = {}
-        self.fulls: Dict[str, List[int]] = {}
-        self.postcodes: Set[str] = set()
-        self.housenumbers: Dict[str, Tuple[Optional[int], Optional[str]]] = {}
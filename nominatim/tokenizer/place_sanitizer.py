@@ -8,24 +8,44 @@
 Handler for cleaning name and address tags in place information before it
 is handed to the token analysis.
 """
-from typing import Optional, List, Mapping, Sequence, Callable, Any, Tuple
+from typing import Optional, List, Mapping, Sequence, Callable, Any, Tuple, Dict
+import time
 
 from nominatim.errors import UsageError
 from nominatim.config import Configuration
 from nominatim.tokenizer.sanitizers.config import SanitizerConfig
-from nominatim.tokenizer.sanitizers.base import SanitizerHandler, ProcessInfo
+from nominatim.tokenizer.sanitizers.base import SanitizerHandler, ProcessInfo, StepFilter
 from nominatim.data.place_name import PlaceName
 from nominatim.data.place_info import PlaceInfo
 
 
+class _SanitizerStep:
+    """ A single compiled step of the sanitizer pipeline.
+    """
+
+    def __init__(self, name: str, handler: Callable[[ProcessInfo], None]) -> None:
+        self.name = name
+        self.handler = handler
+        self.step_filter: Optional[StepFilter] = getattr(handler, 'step_filter', None)
+        self.calls = 0
+        self.skipped = 0
+        self.time = 0.0
+
+
 class PlaceSanitizer:
     """ Controller class which applies sanitizer functions on the place
         names and address before they are used by the token analysers.
+
+        Steps whose handler declares a `step_filter` are skipped for
+        places they cannot change. When `statistics` is set, the number
+        of calls, skips and the time spent are counted per step.
     """
 
     def __init__(self, rules: Optional[Sequence[Mapping[str, Any]]],
-                 config: Configuration) -> None:
+                 config: Configuration, statistics: bool = False) -> None:
         self.handlers: List[Callable[[ProcessInfo], None]] = []
+        self.steps: List[_SanitizerStep] = []
+        self.statistics = statistics
 
         if rules:
             for func in rules:
@@ -39,6 +59,11 @@ class PlaceSanitizer:
 
                 self.handlers.append(module.create(SanitizerConfig(func)))
 
+                name = func['step'].replace('-', '_')
+                if any(step.name == name for step in self.steps):
+                    name = f'{name}_{len(self.steps)}'
+                self.steps.append(_SanitizerStep(name, self.handlers[-1]))
+
 
     def process_names(self, place: PlaceInfo) -> Tuple[List[PlaceName], List[PlaceName]]:
         """ Extract a sanitized list of names and address parts from the
@@ -47,7 +72,36 @@ class PlaceSanitizer:
         """
         obj = ProcessInfo(place)
 
-        for func in self.handlers:
-            func(obj)
+        if self.statistics:
+            self._run_with_statistics(obj)
+        else:
+            for step in self.steps:
+                if step.step_filter is None or step.step_filter.matches(obj):
+                    step.handler(obj)
 
         return obj.names, obj.address
+
+
+    def _run_with_statistics(self, obj: ProcessInfo) -> None:
+        for step in self.steps:
+            if step.step_filter is not None and not step.step_filter.matches(obj):
+                step.skipped += 1
+            else:
+                tstart = time.perf_counter()
+                step.handler(obj)
+                step.time += time.perf_counter() - tstart
+                step.calls += 1
+
+
+    def get_statistics(self) -> Dict[str, float]:
+        """ Return the number of calls and skips and the time spent for
+            each step. Empty unless the sanitizer collects statistics.
+        """
+        stats: Dict[str, float] = {}
+        if self.statistics:
+            for step in self.steps:
+                stats[f'sanitizer_{step.name}_calls'] = step.calls
+                stats[f'sanitizer_{step.name}_skipped'] = step.skipped
+                stats[f'sanitizer_{step.name}_time'] = step.time
+
+        return stats
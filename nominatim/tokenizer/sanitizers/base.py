@@ -7,7 +7,9 @@
 """
 Common data types and protocols for sanitizers.
 """
-from typing import Optional, List, Mapping, Callable
+from typing import Optional, List, Mapping, Callable, FrozenSet, NamedTuple, Tuple, \
+                   TypeVar
+import functools
 
 from nominatim.tokenizer.sanitizers.config import SanitizerConfig
 from nominatim.data.place_info import PlaceInfo
@@ -15,6 +17,12 @@ from nominatim.data.place_name import PlaceName
 from nominatim.typing import Protocol, Final
 
 
+@functools.lru_cache(maxsize=1024)
+def _split_key(key: str) -> Tuple[str, Optional[str]]:
+    parts = key.split(':', 1)
+    return parts[0].strip(), parts[1].strip() if len(parts) > 1 else None
+
+
 class ProcessInfo:
     """ Container class for information handed into to handler functions.
         The 'names' and 'address' members are mutable. A handler must change
@@ -38,14 +46,52 @@ class ProcessInfo:
 
         if names:
             for key, value in names.items():
-                parts = key.split(':', 1)
-                out.append(PlaceName(value.strip(),
-                                     parts[0].strip(),
-                                     parts[1].strip() if len(parts) > 1 else None))
+                out.append(PlaceName(value.strip(), *_split_key(key)))
 
         return out
 
 
+class StepFilter(NamedTuple):
+    """ Describes which places a sanitizer step may change. Handlers
+        can declare this in a `step_filter` attribute (see
+        `with_step_filter()`), so that they are only called for
+        places where they can have an effect.
+    """
+    #: Only places with one of these country codes.
+    countries: Optional[FrozenSet[str]] = None
+    #: Only places that have at least one name.
+    needs_names: bool = False
+    #: Only places that have at least one address part.
+    needs_address: bool = False
+    #: Only places with an address part of one of these kinds.
+    address_kinds: Optional[FrozenSet[str]] = None
+
+    def matches(self, obj: ProcessInfo) -> bool:
+        """ Check if the step may change the given place in its current state.
+        """
+        countries = self.countries
+        if countries is not None:
+            if obj.place.country_code not in countries:
+                return False
+        if self.needs_names and not obj.names:
+            return False
+        if self.needs_address and not obj.address:
+            return False
+        if self.address_kinds is not None:
+            return any(item.kind in self.address_kinds for item in obj.address)
+
+        return True
+
+
+HandlerT = TypeVar('HandlerT', bound=Callable[[ProcessInfo], None])
+
+def with_step_filter(handler: HandlerT, step_filter: StepFilter) -> HandlerT:
+    """ Attach the filter to a handler function.
+    """
+    setattr(handler, 'step_filter', step_filter)
+    return handler
+
+
 class SanitizerHandler(Protocol):
     """ Protocol for sanitizer modules.
     """
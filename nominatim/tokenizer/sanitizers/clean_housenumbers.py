@@ -26,11 +26,12 @@ Arguments:
 """
 from typing import Callable, Iterator, List
 
-from nominatim.tokenizer.sanitizers.base import ProcessInfo
+from nominatim.tokenizer.sanitizers.base import ProcessInfo, StepFilter
 from nominatim.data.place_name import PlaceName
 from nominatim.tokenizer.sanitizers.config import SanitizerConfig
 
 class _HousenumberSanitizer:
+    step_filter = StepFilter(needs_address=True)
 
     def __init__(self, config: SanitizerConfig) -> None:
         self.filter_kind = config.get_filter('filter-kind', ['housenumber'])
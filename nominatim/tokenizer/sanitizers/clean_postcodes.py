@@ -23,10 +23,11 @@ Arguments:
 from typing import Callable, Optional, Tuple
 
 from nominatim.data.postcode_format import PostcodeFormatter
-from nominatim.tokenizer.sanitizers.base import ProcessInfo
+from nominatim.tokenizer.sanitizers.base import ProcessInfo, StepFilter
 from nominatim.tokenizer.sanitizers.config import SanitizerConfig
 
 class _PostcodeSanitizer:
+    step_filter = StepFilter(address_kinds=frozenset(('postcode', )))
 
     def __init__(self, config: SanitizerConfig) -> None:
         self.convert_to_address = config.get_bool('convert-to-address', True)
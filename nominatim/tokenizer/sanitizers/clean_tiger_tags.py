@@ -14,7 +14,8 @@ It makes the following changes:
 from typing import Callable
 import re
 
-from nominatim.tokenizer.sanitizers.base import ProcessInfo
+from nominatim.tokenizer.sanitizers.base import ProcessInfo, StepFilter, \
+                                                with_step_filter
 from nominatim.tokenizer.sanitizers.config import SanitizerConfig
 
 COUNTY_MATCH = re.compile('(.*), [A-Z][A-Z]')
@@ -43,4 +44,5 @@ def _clean_tiger_county(obj: ProcessInfo) -> None:
 def create(_: SanitizerConfig) -> Callable[[ProcessInfo], None]:
     """ Create a function that preprocesses tags from the TIGER import.
     """
-    return _clean_tiger_county
+    return with_step_filter(_clean_tiger_county,
+                            StepFilter(address_kinds=frozenset(('tiger', ))))
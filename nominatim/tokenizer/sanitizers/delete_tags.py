@@ -56,11 +56,11 @@ Arguments:
 """
 from typing import Callable, List, Tuple, Sequence
 
-from nominatim.tokenizer.sanitizers.base import ProcessInfo
+from nominatim.tokenizer.sanitizers.base import ProcessInfo, StepFilter
 from nominatim.data.place_name import PlaceName
 from nominatim.tokenizer.sanitizers.config import SanitizerConfig
 
-class _TagSanitizer:
+class _TagSanitizer: # pylint: disable=too-many-instance-attributes
 
     def __init__(self, config: SanitizerConfig) -> None:
         self.type = config.get('type', 'name')
@@ -74,6 +74,10 @@ class _TagSanitizer:
 
         self.has_country_code = config.get('country_code', None) is not None
 
+        self.step_filter = StepFilter(
+            countries=frozenset(self.country_codes) if self.has_country_code else None,
+            needs_names=self.type == 'name', needs_address=self.type != 'name')
+
 
     def __call__(self, obj: ProcessInfo) -> None:
         tags = obj.names if self.type == 'name' else obj.address
@@ -13,7 +13,8 @@ Arguments:
 """
 from typing import Callable
 
-from nominatim.tokenizer.sanitizers.base import ProcessInfo
+from nominatim.tokenizer.sanitizers.base import ProcessInfo, StepFilter, \
+                                                with_step_filter
 from nominatim.tokenizer.sanitizers.config import SanitizerConfig
 
 def create(config: SanitizerConfig) -> Callable[[ProcessInfo], None]:
@@ -36,4 +37,4 @@ def create(config: SanitizerConfig) -> Callable[[ProcessInfo], None]:
 
         obj.names = new_names
 
-    return _process
+    return with_step_filter(_process, StepFilter(needs_names=True))
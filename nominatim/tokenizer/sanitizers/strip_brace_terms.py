@@ -11,7 +11,8 @@ only the main name part with the bracket part removed.
 """
 from typing import Callable
 
-from nominatim.tokenizer.sanitizers.base import ProcessInfo
+from nominatim.tokenizer.sanitizers.base import ProcessInfo, StepFilter, \
+                                                with_step_filter
 from nominatim.tokenizer.sanitizers.config import SanitizerConfig
 
 
@@ -31,4 +32,4 @@ def create(_: SanitizerConfig) -> Callable[[ProcessInfo], None]:
 
             obj.names.extend(new_names)
 
-    return _process
+    return with_step_filter(_process, StepFilter(needs_names=True))
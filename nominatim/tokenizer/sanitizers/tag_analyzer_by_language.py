@@ -33,12 +33,13 @@ Arguments:
 from typing import Callable, Dict, Optional, List
 
 from nominatim.data import country_info
-from nominatim.tokenizer.sanitizers.base import ProcessInfo
+from nominatim.tokenizer.sanitizers.base import ProcessInfo, StepFilter
 from nominatim.tokenizer.sanitizers.config import SanitizerConfig
 
 class _AnalyzerByLanguage:
     """ Processor for tagging the language of names in a place.
     """
+    step_filter = StepFilter(needs_names=True)
 
     def __init__(self, config: SanitizerConfig) -> None:
         self.filter_kind = config.get_filter('filter-kind')
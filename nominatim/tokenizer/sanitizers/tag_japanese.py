@@ -13,42 +13,16 @@ and quarter and neighbourhood with place.
 
 from typing import Callable
 
-from nominatim.tokenizer.sanitizers.base import ProcessInfo
+from nominatim.tokenizer.sanitizers.base import ProcessInfo, StepFilter, \
+                                                with_step_filter
 from nominatim.tokenizer.sanitizers.config import SanitizerConfig
 from nominatim.data.place_name import PlaceName
+from nominatim.utils.japanese import normalize_numbers
 
 def create(config: SanitizerConfig) -> Callable[[ProcessInfo],None]:
     '''Set up the sanitizer
     '''
-    return tag_japanese
-
-def convert_kanji_sequence_to_number(sequence: str) -> str:
-    '''Converts Kanji numbers to Arabic numbers
-    '''
-    kanji_map = {
-      '零': '0',
-      '一': '1',
-      '二': '2',
-      '三': '3',
-      '四': '4',
-      '五': '5',
-      '六': '6',
-      '七': '7',
-      '八': '8',
-      '九': '9'
-    }
-    converted = ''
-    current_number = ''
-    for char in sequence:
-        if char in kanji_map:
-            current_number += kanji_map[char]
-        else:
-            converted += current_number
-            current_number = ''
-            converted += char
-    converted += current_number
-    return converted
-
+    return with_step_filter(tag_japanese, StepFilter(countries=frozenset(('jp', ))))
 
 def tag_japanese(obj: ProcessInfo) -> None:
     '''Recombine kind of address
@@ -62,10 +36,10 @@ def tag_japanese(obj: ProcessInfo) -> None:
 
     new_address = []
     for item in obj.names:
-        item.name = convert_kanji_sequence_to_number(item.name)
+        item.name = normalize_numbers(item.name)
 
     for item in obj.address:
-        item.name = convert_kanji_sequence_to_number(item.name)
+        item.name = normalize_numbers(item.name)
         if item.kind == 'housenumber':
             tmp_housenumber = item.name
         elif item.kind == 'block_number':
@@ -56,10 +56,27 @@ def create(normalizer: Any, transliterator: Any,
     return GenericTokenAnalysis(normalizer, transliterator, config)
 
 
+def _remember(cache: Dict[str, Any], key: str, value: Any, max_size: int) -> None:
+    """ Add the value to the cache. When the cache is full, the older
+        half of the entries is dropped first.
+    """
+    if len(cache) >= max_size:
+        for old in list(itertools.islice(cache, len(cache) - max_size // 2)):
+            del cache[old]
+    cache[key] = value
+
+
 class GenericTokenAnalysis:
     """ Collects the different transformation rules for normalisation of names
         and provides the functions to apply the transformations.
+
+        The variants computed for a name are memoized, because the same
+        names come up over and over again. The transliteration of each
+        single variant is cached as well, as many variants are shared
+        between names. Both caches are bounded.
     """
+    VARIANT_CACHE_SIZE = 50000
+    TRANSLITERATION_CACHE_SIZE = 200000
 
     def __init__(self, norm: Any, to_ascii: Any, config: Mapping[str, Any]) -> None:
         self.norm = norm
@@ -77,6 +94,9 @@ class GenericTokenAnalysis:
         # set up mutation rules
         self.mutations = [MutationVariantGenerator(*cfg) for cfg in config['mutations']]
 
+        self._variants: Dict[str, List[str]] = {}
+        self._transliterations: Dict[str, str] = {}
+
 
     def get_canonical_id(self, name: PlaceName) -> str:
         """ Return the normalized form of the name. This is the standard form
@@ -89,12 +109,19 @@ class GenericTokenAnalysis:
         """ Compute the spelling variants for the given normalized name
             and transliterate the result.
         """
+        cached = self._variants.get(norm_name)
+        if cached is not None:
+            return list(cached)
+
         variants = self._generate_word_variants(norm_name)
 
         for mutation in self.mutations:
             variants = mutation.generate(variants)
 
-        return [name for name in self._transliterate_unique_list(norm_name, variants) if name]
+        result = [name for name in self._transliterate_unique_list(norm_name, variants) if name]
+        _remember(self._variants, norm_name, result, self.VARIANT_CACHE_SIZE)
+
+        return list(result)
 
 
     def _transliterate_unique_list(self, norm_name: str,
@@ -106,7 +133,12 @@ class GenericTokenAnalysis:
         for variant in map(str.strip, iterable):
             if variant not in seen:
                 seen.add(variant)
-                yield self.to_ascii.transliterate(variant).strip()
+                ascii_name = self._transliterations.get(variant)
+                if ascii_name is None:
+                    ascii_name = cast(str, self.to_ascii.transliterate(variant)).strip()
+                    _remember(self._transliterations, variant, ascii_name,
+                              self.TRANSLITERATION_CACHE_SIZE)
+                yield ascii_name
 
 
     def _generate_word_variants(self, norm_name: str) -> Iterable[str]:
@@ -0,0 +1,86 @@
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Normalization of numbers in Japanese addresses.
+
+Used by the tag-japanese sanitizer when importing and by the
+query analyzer when searching, so that both see the same numbers.
+"""
+from typing import Dict, Match
+import re
+
+_DIGITS = '0123456789'
+
+# Kanji and full-width (zenkaku) digits are mapped to ASCII digits.
+_DIGIT_TABLE = str.maketrans({**dict(zip('〇一二三四五六七八九', _DIGITS)),
+                              '零': '0',
+                              **dict(zip('０１２３４５６７８９', _DIGITS))})
+
+_KANJI_VALUES = {'〇': 0, '零': 0, '一': 1, '二': 2, '三': 3, '四': 4,
+                 '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+_KANJI_UNITS = {'十': 10, '百': 100, '千': 1000}
+
+_NUMERAL_RE = re.compile('[〇零一二三四五六七八九十百千]+|[０-９]+')
+# Suffixes which show that a single multiplier is used as a number.
+_COUNTER_RE = re.compile('丁目|番|号|条|線|地割|[-－]|$')
+
+# Converted numerals. Addresses use few distinct ones, so the size
+# is only limited to protect against unusual input.
+_CONVERTED: Dict[str, str] = {}
+_MAX_CONVERTED = 10000
+
+
+def _kanji_numeral_to_number(numeral: str) -> str:
+    """ Compute the value of a numeral written with kanji digits and
+        the multipliers 十, 百 and 千, e.g. 二千二十三 -> 2023.
+        A multiplier without a digit in front counts once (十一 -> 11).
+        Digits without multiplier are read positionally (一二 -> 12).
+    """
+    total = 0
+    current = -1
+    for char in numeral:
+        unit = _KANJI_UNITS.get(char)
+        if unit is None:
+            current = _KANJI_VALUES[char] if current < 0 else current * 10 + _KANJI_VALUES[char]
+        else:
+            total += (1 if current < 0 else current) * unit
+            current = -1
+
+    return str(total if current < 0 else total + current)
+
+
+def _convert_numeral(numeral: str) -> str:
+    if '十' in numeral or '百' in numeral or '千' in numeral:
+        return _kanji_numeral_to_number(numeral)
+
+    return numeral.translate(_DIGIT_TABLE)
+
+
+def _replace_numeral(match: Match[str]) -> str:
+    numeral = match.group(0)
+
+    # A lone multiplier is mostly part of a name (千代田, 十日町).
+    if numeral in _KANJI_UNITS and _COUNTER_RE.match(match.string, match.end()) is None:
+        return numeral
+
+    converted = _CONVERTED.get(numeral)
+    if converted is None:
+        converted = _convert_numeral(numeral)
+        if len(_CONVERTED) < _MAX_CONVERTED:
+            _CONVERTED[numeral] = converted
+
+    return converted
+
+
+def normalize_numbers(text: str) -> str:
+    """ Replace kanji and full-width digits in the text with ASCII digits.
+        Kanji numerals with the multipliers 十, 百 and 千 are converted
+        to their value. A single 十, 百 or 千 is only taken as a number
+        when followed by an address counter like 丁目 or 番. All other
+        characters are left untouched.
+    """
+    return _NUMERAL_RE.sub(_replace_numeral, text)
@@ -0,0 +1,81 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Micro-benchmark for assigning address rows to results in
+complete_address_details(). Compares the index-based assignment with
+the former linear scan over the result list on synthetic result sets.
+No database is needed.
+"""
+import argparse
+import timeit
+from types import SimpleNamespace
+
+import nominatim.api as napi
+from nominatim.api import results as nres
+
+ADDRESS_LINES_PER_RESULT = 10
+
+
+def _make_results(num):
+    return [napi.SearchResult(napi.SourceTable.PLACEX, ('place', 'house'),
+                              napi.Point(0, 0), place_id=i)
+            for i in range(1, num + 1)]
+
+
+def _make_rows(results):
+    rows = []
+    for result in sorted(results, key=lambda r: r.place_id):
+        for rank in range(ADDRESS_LINES_PER_RESULT, 0, -1):
+            rows.append(SimpleNamespace(**{'result_place_id': result.place_id,
+                                           'result_housenumber': -1,
+                                           'place_id': result.place_id * 100 + rank,
+                                           'osm_type': 'R', 'osm_id': rank,
+                                           'name': {'name': f'Place {rank}'},
+                                           'class': 'boundary',
+                                           'type': 'administrative',
+                                           'place_type': None,
+                                           'admin_level': rank,
+                                           'fromarea': True, 'isaddress': True,
+                                           'rank_address': rank * 2,
+                                           'distance': 0.0}))
+    return rows
+
+
+def _linear_scan(results, rows):
+    """ Assignment as done before the place_id index was introduced.
+    """
+    current_result = None
+    for row in rows:
+        if current_result is None or row.result_place_id != current_result.place_id:
+            for result in results:
+                if result.place_id == row.result_place_id:
+                    current_result = result
+                    break
+            current_result.address_rows = nres.AddressLines()
+        current_result.address_rows.append(nres._result_row_to_address_row(row))
+
+
+def _indexed(results, rows):
+    nres._add_address_rows(nres._get_housenumber_details(results), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=200,
+                        help='Number of runs per measurement')
+    args = parser.parse_args()
+
+    for num in (50, 500):
+        results = _make_results(num)
+        rows = _make_rows(results)
+        for name, func in (('linear scan', _linear_scan), ('indexed', _indexed)):
+            total = timeit.timeit(lambda f=func: f(results, rows), number=args.repeat)
+            print(f"{num:4d} results, {name:>11}: {total / args.repeat * 1000:8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
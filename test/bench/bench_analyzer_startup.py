@@ -0,0 +1,78 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Benchmark for the startup of name analyzers and of the pool of analysis
+processes of the indexer.
+
+Compares creating each analyzer from scratch with creating analyzers
+that share the compiled rules. For the process pool, the private memory
+of each worker is reported as well (Linux only). Needs an imported
+database. Run from the project directory with:
+
+    python3 <nominatim source>/test/bench/bench_analyzer_startup.py --processes 4
+"""
+import argparse
+import time
+from pathlib import Path
+
+from nominatim.config import Configuration
+from nominatim.indexer.analyzer_pool import AnalyzerPool
+from nominatim.tokenizer import factory as tokenizer_factory
+
+
+def _private_memory(pid: int) -> int:
+    """ Return the private memory of the process in kB.
+    """
+    total = 0
+    with open(f'/proc/{pid}/smaps_rollup', encoding='utf-8') as fd:
+        for line in fd:
+            if line.startswith(('Private_Clean:', 'Private_Dirty:')):
+                total += int(line.split()[1])
+    return total
+
+
+def _time_analyzers(make_analyzer, num: int) -> float:
+    start = time.perf_counter()
+    for _ in range(num):
+        make_analyzer().close()
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--project-dir', type=Path, default=Path('.'),
+                        help='Nominatim project directory (default: current directory)')
+    parser.add_argument('--processes', type=int, default=4,
+                        help='Number of analyzers and worker processes to start')
+    args = parser.parse_args()
+
+    config = Configuration(args.project_dir)
+
+    start = time.perf_counter()
+    tokenizer = tokenizer_factory.get_tokenizer_for_db(config)
+    print(f"{'load tokenizer':>24}: {time.perf_counter() - start:7.3f} s")
+
+    elapsed = _time_analyzers(tokenizer.name_analyzer, args.processes)
+    print(f"{'separate analyzers':>24}: {elapsed:7.3f} s")
+
+    start = time.perf_counter()
+    make_analyzer = tokenizer.shared_analyzer_factory()
+    elapsed = time.perf_counter() - start + _time_analyzers(make_analyzer, args.processes)
+    print(f"{'shared analyzers':>24}: {elapsed:7.3f} s")
+
+    start = time.perf_counter()
+    with AnalyzerPool(tokenizer, args.processes) as pool:
+        print(f"{'start process pool':>24}: {time.perf_counter() - start:7.3f} s")
+        # pylint: disable=protected-access
+        for pid in pool.executor._processes:
+            print(f"{'worker ' + str(pid):>24}: {_private_memory(pid) / 1024:7.1f} MB private")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Benchmark for writing the indexing results of ranks 26 to 30 with
+one UPDATE per batch and through COPY into staging tables.
+
+Needs an imported database. A sample of places is marked for reindexing
+and indexed again once for each mode, so that the content of the
+database is the same afterwards. Run from the project directory with:
+
+    python3 <nominatim source>/test/bench/bench_index_write.py --sample 20000
+"""
+import argparse
+import time
+from pathlib import Path
+
+from nominatim.config import Configuration
+from nominatim.db.connection import connect
+from nominatim.indexer.indexer import Indexer, IndexerSettings
+from nominatim.tokenizer import factory as tokenizer_factory
+
+
+def _get_sample(dsn: str, num: int) -> list:
+    with connect(dsn) as conn:
+        with conn.cursor() as cur:
+            cur.execute("""SELECT place_id FROM placex
+                           WHERE rank_address between 26 and 30 and indexed_status = 0
+                           LIMIT %s""", (num, ))
+            return [r[0] for r in cur]
+
+
+def _mark_for_reindexing(dsn: str, place_ids: list) -> None:
+    with connect(dsn) as conn:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE placex SET indexed_status = 2 WHERE place_id = any(%s)",
+                        (place_ids, ))
+        conn.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--project-dir', type=Path, default=Path('.'),
+                        help='Nominatim project directory (default: current directory)')
+    parser.add_argument('--sample', type=int, default=20000,
+                        help='Number of places to reindex per mode')
+    parser.add_argument('--threads', type=int, default=4,
+                        help='Number of database connections for indexing')
+    parser.add_argument('--chunk-size', type=int, action='append',
+                        help='Chunk size for the COPY mode (may be repeated, default: 1000)')
+    args = parser.parse_args()
+
+    config = Configuration(args.project_dir)
+    dsn = config.get_libpq_dsn()
+    tokenizer = tokenizer_factory.get_tokenizer_for_db(config)
+
+    place_ids = _get_sample(dsn, args.sample)
+    if not place_ids:
+        print("No indexed places with rank 26 to 30 found.")
+        return
+
+    modes = [('VALUES', 0)] + [(f'COPY ({size})', size) for size in args.chunk_size or [1000]]
+    for name, chunk_size in modes:
+        _mark_for_reindexing(dsn, place_ids)
+        indexer = Indexer(dsn, tokenizer, args.threads,
+                          IndexerSettings(copy_chunk_size=chunk_size))
+        start = time.perf_counter()
+        indexer.index_by_rank(26, 30)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>12}: {len(place_ids)} places in {elapsed:7.2f} s, "
+              f"{len(place_ids) / elapsed:9.1f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Benchmark for the normalization of numbers in Japanese addresses.
+
+Compares the table-driven normalizer with the former character-by-character
+conversion of kanji digits. The names and address parts are taken from the
+Japanese places in the placex table of an imported database. Alternatively,
+a file with one address per line can be given or a synthetic sample can be
+generated. Run from the project directory with:
+
+    python3 <nominatim source>/test/bench/bench_japanese_numbers.py --sample 200000
+    python3 <nominatim source>/test/bench/bench_japanese_numbers.py --generate 500000
+"""
+import argparse
+import random
+import time
+from pathlib import Path
+
+from nominatim.utils.japanese import normalize_numbers
+
+
+def _get_addresses(dsn: str, num: int) -> list:
+    from nominatim.db.connection import connect # pylint: disable=import-outside-toplevel
+
+    with connect(dsn) as conn:
+        with conn.cursor() as cur:
+            cur.execute("""SELECT v FROM placex,
+                             LATERAL (SELECT svals(name) UNION ALL SELECT svals(address)) a(v)
+                           WHERE country_code = 'jp' LIMIT %s""", (num, ))
+            return [r[0] for r in cur]
+
+
+def _generate_addresses(num: int) -> list:
+    rnd = random.Random(42)
+    kanji = '〇一二三四五六七八九'
+    zenkaku = '０１２３４５６７８９'
+    places = ['東京都千代田区丸の内', '大阪府大阪市北区梅田', '北海道札幌市中央区北',
+              '京都府京都市下京区四条通', '新潟県十日町市本町']
+
+    def _kanji_number() -> str:
+        num = rnd.randint(1, 2999)
+        out = ''
+        for value, unit in ((1000, '千'), (100, '百'), (10, '十')):
+            digit, num = divmod(num, value)
+            if digit:
+                out += ('' if digit == 1 else kanji[digit]) + unit
+        return out + (kanji[num] if num else '')
+
+    addresses = []
+    for _ in range(num):
+        base = rnd.choice(places)
+        kind = rnd.randrange(3)
+        if kind == 0:
+            addresses.append(f'{base}{_kanji_number()}丁目{rnd.randint(1, 40)}-{rnd.randint(1, 20)}')
+        elif kind == 1:
+            addresses.append(base + ''.join(rnd.choice(zenkaku) for _ in range(2)) + '－'
+                             + ''.join(rnd.choice(zenkaku) for _ in range(2)))
+        else:
+            addresses.append(base + rnd.choice(kanji[1:]) + '条' + rnd.choice(kanji[1:]) + '丁目')
+
+    return addresses
+
+
+def _convert_char_by_char(sequence: str) -> str:
+    """ The former implementation, which only handles single kanji digits.
+    """
+    kanji_map = {'零': '0', '一': '1', '二': '2', '三': '3', '四': '4',
+                 '五': '5', '六': '6', '七': '7', '八': '8', '九': '9'}
+    converted = ''
+    current_number = ''
+    for char in sequence:
+        if char in kanji_map:
+            current_number += kanji_map[char]
+        else:
+            converted += current_number
+            current_number = ''
+            converted += char
+    converted += current_number
+    return converted
+
+
+def _run(func, addresses: list) -> float:
+    start = time.perf_counter()
+    for address in addresses:
+        func(address)
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--project-dir', type=Path, default=Path('.'),
+                        help='Nominatim project directory (default: current directory)')
+    parser.add_argument('--sample', type=int, default=200000,
+                        help='Number of names and address parts to take from the database')
+    parser.add_argument('--addresses', type=Path,
+                        help='File with one address per line to use instead of the database')
+    parser.add_argument('--generate', type=int, metavar='NUM',
+                        help='Use NUM synthetic addresses instead of the database')
+    args = parser.parse_args()
+
+    if args.generate:
+        addresses = _generate_addresses(args.generate)
+    elif args.addresses:
+        addresses = [l.strip() for l in args.addresses.read_text(encoding='utf-8').splitlines()
+                     if l.strip()]
+    else:
+        from nominatim.config import Configuration # pylint: disable=import-outside-toplevel
+        addresses = _get_addresses(Configuration(args.project_dir).get_libpq_dsn(),
+                                   args.sample)
+
+    if not addresses:
+        print("No addresses found.")
+        return
+
+    print(f"{len(addresses)} addresses, {sum(len(a) for a in addresses)} characters")
+    for title, func in (('char-by-char', _convert_char_by_char),
+                        ('table', normalize_numbers)):
+        elapsed = _run(func, addresses)
+        print(f"{title:>12}: {elapsed:7.2f} s, {len(addresses) / elapsed:10.1f} addresses/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Benchmark for query analysis latency with and without the
+cache for compiled query analyzer data.
+
+Needs an imported database. Run from the project directory with:
+
+    python3 <nominatim source>/test/bench/bench_query_analyzer.py 'Main St, Springfield'
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from pathlib import Path
+
+from nominatim.api import NominatimAPIAsync
+from nominatim.api.search import Phrase, PhraseType, make_query_analyzer
+
+
+async def _run(api: NominatimAPIAsync, query: str, repeat: int, cold: bool) -> list:
+    phrases = [Phrase(PhraseType.NONE, p.strip()) for p in query.split(',')]
+    timings = []
+
+    for _ in range(repeat):
+        if cold:
+            api.clear_cache()
+        async with api.begin() as conn:
+            start = time.perf_counter()
+            analyzer = await make_query_analyzer(conn)
+            await analyzer.analyze_query(phrases)
+            timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def _report(title: str, timings: list) -> None:
+    print(f"{title:>12}: mean {statistics.mean(timings) * 1000:7.2f} ms, "
+          f"median {statistics.median(timings) * 1000:7.2f} ms, "
+          f"max {max(timings) * 1000:7.2f} ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('query', help='Query string to analyse')
+    parser.add_argument('--project-dir', type=Path, default=Path('.'),
+                        help='Nominatim project directory (default: current directory)')
+    parser.add_argument('--repeat', type=int, default=200,
+                        help='Number of analyses to run per mode')
+    args = parser.parse_args()
+
+    api = NominatimAPIAsync(args.project_dir)
+    try:
+        # warm up the connection pool
+        await _run(api, args.query, 1, True)
+
+        _report('uncached', await _run(api, args.query, args.repeat, True))
+        _report('cached', await _run(api, args.query, args.repeat, False))
+    finally:
+        await api.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Benchmark for the variant generation of the generic token analysis
+with and without the memoization of variants and transliterations.
+
+The names are taken from the placex table of an imported database, in
+the order of the table, so that the repetition of names is realistic.
+Alternatively, a file with one name per line can be given. Run from the
+project directory with:
+
+    python3 <nominatim source>/test/bench/bench_variants.py --sample 100000
+"""
+import argparse
+import time
+from pathlib import Path
+
+from nominatim.config import Configuration
+from nominatim.data.place_name import PlaceName
+from nominatim.db.connection import connect
+from nominatim.tokenizer import factory as tokenizer_factory
+
+
+def _get_names(dsn: str, num: int) -> list:
+    with connect(dsn) as conn:
+        with conn.cursor() as cur:
+            cur.execute("""SELECT v FROM placex, svals(name) v
+                           WHERE name is not null LIMIT %s""", (num, ))
+            return [r[0] for r in cur]
+
+
+def _run(analyzer, names: list, memoize: bool) -> float:
+    analyzer._variants.clear()
+    analyzer._transliterations.clear()
+
+    start = time.perf_counter()
+    for name in names:
+        if not memoize:
+            analyzer._variants.clear()
+            analyzer._transliterations.clear()
+        analyzer.compute_variants(analyzer.get_canonical_id(PlaceName(name, 'name', None)))
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--project-dir', type=Path, default=Path('.'),
+                        help='Nominatim project directory (default: current directory)')
+    parser.add_argument('--sample', type=int, default=100000,
+                        help='Number of names to take from the database')
+    parser.add_argument('--names', type=Path,
+                        help='File with one name per line to use instead of the database')
+    parser.add_argument('--analyzer', default=None,
+                        help='Name of the token analysis to use (default: the default one)')
+    args = parser.parse_args()
+
+    config = Configuration(args.project_dir)
+    tokenizer = tokenizer_factory.get_tokenizer_for_db(config)
+    analyzer = tokenizer.loader.make_token_analysis().get_analyzer(args.analyzer)
+
+    if args.names:
+        names = [l.strip() for l in args.names.read_text(encoding='utf-8').splitlines()
+                 if l.strip()]
+    else:
+        names = _get_names(config.get_libpq_dsn(), args.sample)
+
+    if not names:
+        print("No names found.")
+        return
+
+    print(f"{len(names)} names, {len(set(names))} distinct")
+    for title, memoize in (('plain', False), ('memoized', True)):
+        elapsed = _run(analyzer, names, memoize)
+        print(f"{title:>12}: {elapsed:7.2f} s, {len(names) / elapsed:10.1f} names/s")
+
+
+if __name__ == '__main__':
+    main()
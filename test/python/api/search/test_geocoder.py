@@ -0,0 +1,105 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Tests for the execution of searches in the forward geocoder.
+"""
+import asyncio
+import contextlib
+
+import pytest
+
+import nominatim.api as napi
+from nominatim.api.types import SearchDetails
+from nominatim.api.search.geocoder import ForwardGeocoder
+
+class FakeSearch:
+
+    def __init__(self, penalty, place_ids, delay=0.0):
+        self.penalty = penalty
+        self.place_ids = place_ids
+        self.delay = delay
+        self.called = False
+
+    async def lookup(self, conn, params):
+        self.called = True
+        await asyncio.sleep(self.delay)
+        return napi.SearchResults(
+                   napi.SearchResult(napi.SourceTable.PLACEX, ('place', 'city'),
+                                     napi.Point(0, 0), place_id=pid, importance=0.5)
+                   for pid in self.place_ids)
+
+
+@contextlib.asynccontextmanager
+async def fake_connection():
+    yield None
+
+
+def make_searches():
+    return [FakeSearch(0.0, [1], delay=0.02),
+            FakeSearch(0.0, [2], delay=0.01),
+            FakeSearch(0.0, [3]),
+            FakeSearch(2.0, [4]),
+            FakeSearch(3.0, [5])]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('parallel', [1, 2, 10])
+async def test_execute_searches_parallel_same_result(parallel):
+    seq = ForwardGeocoder(None, SearchDetails())
+    par = ForwardGeocoder(None, SearchDetails(), parallel, fake_connection)
+
+    seq_results = await seq.execute_searches(None, make_searches())
+    par_results = await par.execute_searches(None, make_searches())
+
+    assert [r.place_id for r in par_results] == [r.place_id for r in seq_results]
+    assert [r.place_id for r in par_results] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_execute_searches_parallel_limited_lookahead():
+    searches = make_searches()
+    geocoder = ForwardGeocoder(None, SearchDetails(), 2, fake_connection)
+
+    await geocoder.execute_searches(None, searches)
+
+    assert [s.called for s in searches] == [True, True, True, True, False]
+
+
+@pytest.mark.asyncio
+async def test_execute_searches_parallel_without_spare_connection():
+    searches = make_searches()
+    geocoder = ForwardGeocoder(None, SearchDetails(), 10, lambda: None)
+
+    results = await geocoder.execute_searches(None, searches)
+
+    assert [r.place_id for r in results] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_execute_searches_parallel_limited_spare_connections():
+    in_use = []
+    max_in_use = []
+
+    @contextlib.asynccontextmanager
+    async def spare_connection():
+        in_use.append(True)
+        max_in_use.append(len(in_use))
+        try:
+            yield None
+        finally:
+            in_use.pop()
+
+    def take_connection():
+        return spare_connection() if not in_use else None
+
+    geocoder = ForwardGeocoder(None, SearchDetails(), 10, take_connection)
+
+    results = await geocoder.execute_searches(None, make_searches())
+
+    assert [r.place_id for r in results] == [1, 2, 3]
+    assert max(max_in_use) == 1
+    assert not in_use
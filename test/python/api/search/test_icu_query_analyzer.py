@@ -184,3 +184,30 @@ async def test_log_output(conn, logtype):
     await ana.analyze_query(make_phrase('foo'))
 
     assert get_and_disable()
+
+
+@pytest.mark.asyncio
+async def test_transliterators_are_cached(conn):
+    ana1 = await tok.create_query_analyzer(conn)
+    ana2 = await tok.create_query_analyzer(conn)
+
+    assert ana1.normalizer is ana2.normalizer
+    assert ana1.transliterator is ana2.transliterator
+
+
+@pytest.mark.asyncio
+async def test_japanese_address_split_into_phrases(conn):
+    ana = await tok.create_query_analyzer(conn)
+
+    query = await ana.analyze_query(make_phrase('東京都千代田区丸の内'))
+
+    assert [p.text for p in query.source] == ['東京都', '千代田区', '丸の内']
+
+
+@pytest.mark.asyncio
+async def test_japanese_address_without_prefecture(conn):
+    ana = await tok.create_query_analyzer(conn)
+
+    query = await ana.analyze_query(make_phrase('千代田区丸の内'))
+
+    assert [p.text for p in query.source] == ['千代田区丸の内']
@@ -0,0 +1,71 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Tests for splitting Japanese addresses in queries.
+"""
+import pytest
+
+import nominatim.api.search.icu_tokenizer_japanese as jp
+
+
+@pytest.mark.parametrize('text,parts',
+                         [('東京都千代田区丸の内１－２', ['東京都', '千代田区', '丸の内1－2']),
+                          ('北海道札幌市中央区北一条西二丁目',
+                           ['北海道', '札幌市', '中央区北1条西2丁目']),
+                          ('京都府京都市下京区', ['京都府', '京都市', '下京区']),
+                          ('東京都港区', ['東京都', '港区']),
+                          ('東京都 千代田区 丸の内', ['東京都', '千代田区', '丸の内']),
+                          ('神奈川県', ['神奈川県'])])
+def test_pattern_split_address(text, parts):
+    assert jp.make_splitter('pattern').split(text) == parts
+
+
+@pytest.mark.parametrize('text', ['', 'Hauptstr 5, Berlin', '東京駅', '千代田区丸の内'])
+def test_pattern_passthrough(text):
+    assert jp.make_splitter('pattern').split(text) == [text]
+
+
+@pytest.mark.parametrize('text,parts', [('丸の内二丁目', ['丸の内2丁目']),
+                                        ('渋谷区神南一丁目', ['渋谷区神南1丁目'])])
+def test_pattern_normalizes_numbers_without_split(text, parts):
+    assert jp.make_splitter('pattern').split(text) == parts
+
+
+@pytest.mark.parametrize('text', ['上海市第一百货', '北京市朝阳区三里屯', '四川省成都市一环路',
+                                  '四川成都市武侯区'])
+def test_pattern_passthrough_chinese(text):
+    assert jp.make_splitter('pattern').split(text) == [text]
+
+
+class _Tagger:
+
+    def __init__(self, words):
+        self.words = words
+
+    def parse(self, text):
+        return ' '.join(self.words) + '\n'
+
+
+@pytest.mark.parametrize('words,parts',
+                         [(['東京', '都', '千代田', '区', '丸の内', '1', '-', '2'],
+                           ['東京都', '千代田区', '丸の内 1 - 2']),
+                          (['東京都', '千代田区', '丸の内'], ['東京都', '千代田区', '丸の内']),
+                          (['丸の内', '1', '丁目'], ['丸の内 1 丁目'])])
+def test_mecab_split_address(words, parts):
+    assert jp.MecabSplitter(_Tagger(words)).split('東京都') == parts
+
+
+def test_mecab_passthrough():
+    assert jp.MecabSplitter(_Tagger(['x'])).split('Hauptstr') == ['Hauptstr']
+
+
+def test_splitter_is_created_once():
+    assert jp.make_splitter('pattern') is jp.make_splitter('pattern')
+
+
+def test_unknown_splitter_falls_back_to_pattern():
+    assert type(jp.make_splitter('foo')) is jp.JapaneseSplitter
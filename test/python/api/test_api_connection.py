@@ -91,3 +91,65 @@ async def test_get_db_property_existing(apiobj):
     async with apiobj.begin() as conn:
         with pytest.raises(ValueError):
             await conn.get_db_property('dfkgjd.rijg')
+
+
+@pytest.mark.asyncio
+async def test_get_cached_value(apiobj):
+    calls = []
+
+    async def _factory():
+        calls.append(1)
+        return 'value'
+
+    async with apiobj.begin() as conn:
+        assert await conn.get_cached_value('TEST', 'foo', _factory) == 'value'
+        assert await conn.get_cached_value('TEST', 'foo', _factory) == 'value'
+
+    async with apiobj.begin() as conn:
+        assert await conn.get_cached_value('TEST', 'foo', _factory) == 'value'
+
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_clear_cache(apiobj, table_factory):
+    table_factory('nominatim_properties',
+                  definition='property TEXT, value TEXT',
+                  content=(('dbv', '96723'), ))
+
+    async def _factory():
+        return await conn.get_property('dbv')
+
+    async with apiobj.begin() as conn:
+        assert await conn.get_cached_value('TEST', 'foo', _factory) == '96723'
+        await conn.execute(sa.text("UPDATE nominatim_properties SET value = '1'"))
+
+    apiobj.clear_cache()
+
+    async with apiobj.begin() as conn:
+        assert await conn.get_cached_value('TEST', 'foo', _factory) == '1'
+        assert await conn.get_db_property('server_version') > 0
+
+
+@pytest.mark.asyncio
+async def test_sql_cache_statistics(apiobj, table_factory):
+    table_factory('foo', definition='that TEXT', content=(('a', ),))
+    foo = sa.table('foo', sa.column('that'))
+
+    for _ in range(3):
+        async with apiobj.begin() as conn:
+            assert await conn.scalar(sa.select(foo.c.that).where(foo.c.that == 'a')) == 'a'
+
+    stats = apiobj.cache_statistics()['sql']
+    assert stats.hits >= 2
+    assert stats.misses >= 1
+
+
+@pytest.mark.parametrize('lookups,spare', [(1, 0), (3, 20)])
+def test_spare_connections_added_to_pool(lookups, spare):
+    api = NominatimAPIAsync(Path('/invalid'),
+                            {'NOMINATIM_API_PARALLEL_LOOKUPS': str(lookups)})
+    api._setup_spare_connections(10)
+
+    assert api._spare_connections == spare
+    assert api._parallel_lookups == lookups
@@ -100,3 +100,66 @@ def test_lookup_multiple_places(apiobj):
     assert len(result) == 2
 
     assert set(r.place_id for r in result) == {332, 4924}
+
+
+def test_lookup_keeps_input_order(apiobj):
+    apiobj.add_placex(place_id=332, osm_type='W', osm_id=4)
+    apiobj.add_placex(place_id=333, osm_type='N', osm_id=5)
+    apiobj.add_postcode(place_id=555, postcode='12345')
+    apiobj.add_osmline(place_id=4924, osm_id=9928)
+
+    result = apiobj.api.lookup((napi.PlaceID(555),
+                                napi.OsmID('W', 9928),
+                                napi.OsmID('N', 5),
+                                napi.PlaceID(1),
+                                napi.PlaceID(332)))
+
+    assert [r.place_id for r in result] == [555, 4924, 333, 332]
+    assert [r.source_table.name for r in result] == \
+               ['POSTCODE', 'OSMLINE', 'PLACEX', 'PLACEX']
+
+
+def test_lookup_duplicate_places(apiobj):
+    apiobj.add_placex(place_id=332, osm_type='W', osm_id=4)
+
+    result = apiobj.api.lookup((napi.PlaceID(332), napi.OsmID('W', 4)))
+
+    assert [r.place_id for r in result] == [332, 332]
+    assert result[0] is not result[1]
+
+
+@pytest.mark.parametrize('osm_class,place_id', [(None, 332), ('amenity', 332),
+                                                ('highway', 333)])
+def test_lookup_placex_by_class(apiobj, osm_class, place_id):
+    apiobj.add_placex(place_id=332, osm_type='W', osm_id=4, class_='amenity')
+    apiobj.add_placex(place_id=333, osm_type='W', osm_id=4, class_='highway')
+
+    result = apiobj.api.lookup([napi.OsmID('W', 4, osm_class)])
+
+    assert [r.place_id for r in result] == [place_id]
+
+
+@pytest.mark.parametrize('hnr,place_id', [('3', 4924), ('7', 4925)])
+def test_lookup_interpolation_by_housenumber(apiobj, hnr, place_id):
+    apiobj.add_osmline(place_id=4924, osm_id=9928, startnumber=1, endnumber=4)
+    apiobj.add_osmline(place_id=4925, osm_id=9928, startnumber=6, endnumber=10)
+
+    result = apiobj.api.lookup([napi.OsmID('W', 9928, hnr)])
+
+    assert [r.place_id for r in result] == [place_id]
+
+
+def test_lookup_multiple_places_with_linked_and_parented(apiobj):
+    apiobj.add_placex(place_id=332, osm_type='W', osm_id=4)
+    apiobj.add_placex(place_id=333, osm_type='W', osm_id=5)
+    apiobj.add_placex(place_id=1001, osm_type='N', osm_id=5, linked_place_id=332)
+    apiobj.add_placex(place_id=1002, osm_type='N', osm_id=6, parent_place_id=333)
+    apiobj.add_placex(place_id=1003, osm_type='N', osm_id=7, parent_place_id=333)
+
+    result = apiobj.api.lookup((napi.PlaceID(332), napi.PlaceID(333), napi.PlaceID(332)),
+                               linked_places=True, parented_places=True)
+
+    assert [r.place_id for r in result] == [332, 333, 332]
+    assert [[l.place_id for l in r.linked_rows] for r in result] == [[1001], [], [1001]]
+    assert [sorted(l.place_id for l in r.parented_rows) for r in result] \
+               == [[], [1002, 1003], []]
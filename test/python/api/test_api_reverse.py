@@ -15,6 +15,8 @@ import json
 import pytest
 
 import nominatim.api as napi
+import nominatim.api.logging as loglib
+from nominatim.api.result_cache import ResultCache, QuantizationGrid
 
 def test_reverse_rank_30(apiobj):
     apiobj.add_placex(place_id=223, class_='place', type='house',
@@ -341,3 +343,50 @@ def test_reverse_tiger_geometry(apiobj):
 
     assert json.loads(output) == {'coordinates': [10, 10.00001], 'type': 'Point'}
 
+
+
+def test_reverse_with_result_cache(apiobj):
+    apiobj.add_placex(place_id=223, class_='place', type='house',
+                      housenumber='1',
+                      centroid=(1.3, 0.7),
+                      geometry='POINT(1.3 0.7)')
+
+    api = apiobj.api._async_api
+    api._result_caches['reverse'] = ResultCache(100000, 100)
+    api._reverse_grid = QuantizationGrid.from_config(['0:0.01'])
+    loglib.get_and_disable()
+
+    assert apiobj.api.reverse((1.3, 0.7)).distance is not None
+    cached = apiobj.api.reverse((1.301, 0.701))
+    assert cached.place_id == 223
+    assert cached.distance is None
+    assert apiobj.api.reverse((5.0, 5.0)) is None
+    assert apiobj.api.reverse((5.001, 5.001)) is None
+    # geometry output is never cached
+    assert apiobj.api.reverse((1.3, 0.7), geometry_output=napi.GeometryFormat.TEXT)\
+                .place_id == 223
+
+    stats = apiobj.api.cache_statistics()['reverse']
+    assert stats.hits == 2
+    assert stats.misses == 2
+
+
+@pytest.mark.parametrize('concurrency', [None, 1, 2])
+def test_reverse_batch_keeps_input_order(apiobj, concurrency):
+    apiobj.add_placex(place_id=223, class_='place', type='house',
+                      housenumber='1',
+                      centroid=(1.3, 0.7),
+                      geometry='POINT(1.3 0.7)')
+    apiobj.add_placex(place_id=224, class_='place', type='house',
+                      housenumber='2',
+                      centroid=(3.3, 0.7),
+                      geometry='POINT(3.3 0.7)')
+
+    coords = iter([(3.3, 0.7), (1.3, 0.7), (200.0, 0.0), (3.3, 0.7)])
+    results = list(apiobj.api.reverse_batch(coords, concurrency))
+
+    assert [r.place_id if r else None for r in results] == [224, 223, None, 224]
+
+
+def test_reverse_batch_empty_input(apiobj):
+    assert list(apiobj.api.reverse_batch([])) == []
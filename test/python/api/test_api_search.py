@@ -18,6 +18,7 @@ import sqlalchemy as sa
 
 import nominatim.api as napi
 import nominatim.api.logging as loglib
+from nominatim.api.result_cache import ResultCache
 
 @pytest.fixture(autouse=True)
 def setup_icu_tokenizer(apiobj):
@@ -157,3 +158,66 @@ def test_category_with_search_phrase(apiobj, table_factory):
                                          near_query='TEST')
 
     assert [r.place_id for r in results] == [95]
+
+
+def test_search_with_result_cache(apiobj, table_factory):
+    table_factory('word',
+                  definition='word_id INT, word_token TEXT, type TEXT, word TEXT, info JSONB',
+                  content=[(55, 'test', 'W', 'test', None),
+                           (2, 'test', 'w', 'test', None)])
+
+    apiobj.add_placex(place_id=444, class_='place', type='village',
+                      centroid=(1.3, 0.7))
+    apiobj.add_search_name(444, names=[2, 55])
+
+    apiobj.api._async_api._result_caches['search'] = ResultCache(100000, 100)
+    loglib.get_and_disable()
+
+    assert [r.place_id for r in apiobj.api.search('TEST')] == [444]
+
+    apiobj.async_to_sync(apiobj.exec_async(sa.text('DELETE FROM placex')))
+
+    assert [r.place_id for r in apiobj.api.search(' test ')] == [444]
+    assert apiobj.api.search('TEST', countries='de') == []
+
+    stats = apiobj.api.cache_statistics()['search']
+    assert stats.hits == 1
+    assert stats.misses == 2
+
+    apiobj.api.clear_cache()
+
+    assert apiobj.api.search('TEST') == []
+
+
+def test_search_batch(apiobj, table_factory):
+    table_factory('word',
+                  definition='word_id INT, word_token TEXT, type TEXT, word TEXT, info JSONB',
+                  content=[(55, 'test', 'W', 'test', None),
+                           (2, 'test', 'w', 'test', None)])
+
+    apiobj.add_placex(place_id=444, class_='place', type='village',
+                      centroid=(1.3, 0.7))
+    apiobj.add_search_name(444, names=[2, 55])
+
+    results = list(apiobj.api.search_batch(['test', 'foo', '', 'TEST', {}],
+                                           concurrency=2))
+
+    assert [[r.place_id for r in res] for res in results] == [[444], [], [], [444], []]
+
+
+@pytest.mark.parametrize('dedupe_size,num_calls', [(10, 2), (1, 3)])
+def test_search_batch_dedupe(apiobj, monkeypatch, dedupe_size, num_calls):
+    calls = []
+
+    async def _search(query, **kwargs):
+        calls.append(query)
+        return napi.SearchResults()
+
+    monkeypatch.setattr(apiobj.api._async_api, 'search', _search)
+
+    results = list(apiobj.api.search_batch(['Berlin', 'Paris', ' berlin'],
+                                           dedupe_size=dedupe_size))
+
+    assert len(results) == 3
+    assert len(calls) == num_calls
+    assert (results[0] is results[2]) == (num_calls == 2)
@@ -0,0 +1,127 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Tests for the in-process result cache.
+"""
+import pytest
+
+from nominatim.errors import UsageError
+import nominatim.api as napi
+from nominatim.api.types import SearchDetails
+from nominatim.api.result_cache import ResultCache, QuantizationGrid, \
+                                       freeze_value, estimate_size
+
+
+def test_cache_get_missing():
+    cache = ResultCache(1000, 100)
+
+    assert cache.get('foo') is None
+    assert cache.stats.misses == 1
+    assert cache.stats.hits == 0
+
+
+def test_cache_get_returns_copy():
+    cache = ResultCache(1000, 100)
+    value = [{'a': 1}]
+
+    cache.put('foo', value)
+    value[0]['a'] = 2
+
+    result = cache.get('foo')
+    assert result == [{'a': 1}]
+    result.append(3)
+    assert cache.get('foo') == [{'a': 1}]
+    assert cache.stats.hits == 2
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ResultCache(30, 100, sizeof=lambda v: 10)
+
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.put('c', 3)
+    cache.get('a')
+    cache.put('d', 4)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.stats.evictions == 1
+    assert cache.stats.entries == 3
+    assert cache.stats.size == 30
+
+
+def test_cache_ignores_oversized_values():
+    cache = ResultCache(5, 100, sizeof=lambda v: 10)
+
+    cache.put('a', 1)
+
+    assert cache.get('a') is None
+    assert cache.stats.entries == 0
+
+
+def test_cache_entries_expire():
+    cache = ResultCache(1000, -1)
+
+    cache.put('a', 1)
+
+    assert cache.get('a') is None
+    assert cache.stats.entries == 0
+
+
+def test_cache_clear():
+    cache = ResultCache(1000, 100)
+    cache.put('a', 1)
+
+    cache.clear()
+
+    assert cache.get('a') is None
+    assert cache.stats.size == 0
+
+
+def test_freeze_search_details():
+    d1 = SearchDetails.from_kwargs({'viewbox': '0,0,1,1', 'countries': 'de,fr'})
+    d2 = SearchDetails.from_kwargs({'viewbox': '0,0,1,1', 'countries': 'de,fr'})
+    d3 = SearchDetails.from_kwargs({'viewbox': '0,0,1,2', 'countries': 'de,fr'})
+
+    assert hash(freeze_value(d1)) == hash(freeze_value(d2))
+    assert freeze_value(d1) == freeze_value(d2)
+    assert freeze_value(d1) != freeze_value(d3)
+
+
+def test_estimate_size_grows_with_content():
+    small = napi.SearchResult(napi.SourceTable.PLACEX, ('place', 'city'), napi.Point(0, 0))
+    large = napi.SearchResult(napi.SourceTable.PLACEX, ('place', 'city'), napi.Point(0, 0),
+                              names={f"name:{i}": f'{i}' * 100 for i in range(20)})
+
+    assert estimate_size(large) > estimate_size(small) + 2000
+
+
+@pytest.mark.parametrize('rank,cell', [(30, (10, 20)), (26, (10, 20)),
+                                       (25, (1, 2)), (17, (1, 2)), (16, None)])
+def test_quantization_grid_cell(rank, cell):
+    grid = QuantizationGrid.from_config(['17:0.1', '26:0.01'])
+
+    assert grid.cell((0.105, 0.205), rank) == cell
+
+
+@pytest.mark.parametrize('rank,cell', [(30, None), (26, None), (25, (1, 2))])
+def test_quantization_grid_no_cache(rank, cell):
+    grid = QuantizationGrid.from_config(['26:0', '0:0.1'])
+
+    assert grid.cell((0.105, 0.205), rank) == cell
+
+
+def test_quantization_grid_negative_coordinates():
+    grid = QuantizationGrid.from_config(['0:1'])
+
+    assert grid.cell((-0.5, 0.5), 30) == (-1, 0)
+
+
+@pytest.mark.parametrize('setting', [['foo'], ['30'], ['30:-1'], ['a:0.1']])
+def test_quantization_grid_bad_config(setting):
+    with pytest.raises(UsageError):
+        QuantizationGrid.from_config(setting)
@@ -81,3 +81,35 @@ def test_create_row_without_housenumber(func):
     assert res.housenumber is None
     assert res.extratags == {'startnumber': '1', 'endnumber': '11', 'step': '2'}
     assert res.category == ('place', 'houses')
+
+
+def _address_row(result_place_id, place_id, result_housenumber=-1):
+    return FakeRow(**{'result_place_id': result_place_id,
+                      'result_housenumber': result_housenumber,
+                      'place_id': place_id, 'osm_type': 'R', 'osm_id': place_id,
+                      'name': {'name': 'Foo'}, 'class': 'boundary',
+                      'type': 'administrative', 'place_type': None,
+                      'admin_level': 8, 'fromarea': True, 'isaddress': True,
+                      'rank_address': 16, 'distance': 0.0})
+
+
+def test_add_address_rows_with_duplicate_places():
+    results = [DetailedResult(SourceTable.PLACEX, ('place', 'house'), Point(0, 0),
+                              place_id=pid) for pid in (3, 1, 3)]
+
+    nresults._add_address_rows(nresults._get_housenumber_details(results),
+                               [_address_row(1, 10), _address_row(1, 11),
+                                _address_row(3, 12)])
+
+    assert [[a.place_id for a in r.address_rows] for r in results] == [[12], [10, 11], [12]]
+    assert results[0].address_rows[0] is not results[2].address_rows[0]
+
+
+def test_add_address_rows_by_housenumber():
+    results = [DetailedResult(SourceTable.OSMLINE, ('place', 'house'), Point(0, 0),
+                              place_id=3, housenumber=hnr) for hnr in ('4', '6')]
+
+    nresults._add_address_rows(nresults._get_housenumber_details(results),
+                               [_address_row(3, 10, 4), _address_row(3, 11, 6)])
+
+    assert [[a.place_id for a in r.address_rows] for r in results] == [[10], [11]]
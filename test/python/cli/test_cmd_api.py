@@ -119,6 +119,69 @@ class TestCliReverseCall:
         assert out['name'] == 'Nom'
 
 
+class TestCliReverseBatchCall:
+
+    @pytest.fixture(autouse=True)
+    def setup_reverse_batch_mock(self, monkeypatch):
+        result = napi.ReverseResult(napi.SourceTable.PLACEX, ('place', 'thing'),
+                                    napi.Point(1.0, -3.0),
+                                    place_id=332,
+                                    names={'name':'Name', 'name:fr': 'Nom'})
+
+        def _reverse_batch(_, coords, *args, **kwargs):
+            for coord in coords:
+                yield result if coord[0] == 1.0 else None
+
+        monkeypatch.setattr(napi.NominatimAPI, 'reverse_batch', _reverse_batch)
+
+
+    def test_reverse_batch_jsonl(self, cli_call, tmp_path, capsys):
+        infile = tmp_path / 'points.jsonl'
+        infile.write_text('{"id": 1, "lat": -3.0, "lon": 1.0}\n'
+                          '{"id": 2, "lat": 5.0, "lon": 5.0}\n')
+
+        result = cli_call('reverse', '--project-dir', str(tmp_path),
+                          '--batch', str(infile))
+
+        assert result == 0
+
+        out = [json.loads(l) for l in capsys.readouterr().out.splitlines()]
+        assert len(out) == 2
+        assert out[0]['input']['id'] == 1
+        assert out[0]['result']['place_id'] == 332
+        assert out[1]['input']['id'] == 2
+        assert out[1]['result'] is None
+
+
+    def test_reverse_batch_csv(self, cli_call, tmp_path, capsys):
+        infile = tmp_path / 'points.csv'
+        infile.write_text('id,lat,lon\na,-3.0,1.0\nb,5.0,5.0\nc,bad,1.0\n')
+
+        result = cli_call('reverse', '--project-dir', str(tmp_path),
+                          '--batch', str(infile), '--batch-output', 'csv', '--lang', 'fr')
+
+        assert result == 0
+
+        out = capsys.readouterr().out.splitlines()
+        assert out[0].startswith('id,lat,lon,place_id')
+        assert out[1].startswith('a,-3.0,1.0,332,')
+        assert ',Nom,' in out[1]
+        assert out[2] == 'b,5.0,5.0' + ',' * 9
+        assert out[3] == 'c,bad,1.0' + ',' * 9
+
+
+    def test_reverse_batch_xml_format(self, cli_call, tmp_path):
+        infile = tmp_path / 'points.csv'
+        infile.write_text('lat,lon\n-3.0,1.0\n')
+
+        assert cli_call('reverse', '--project-dir', str(tmp_path),
+                        '--batch', str(infile), '--format', 'xml') == 1
+
+
+    def test_reverse_missing_coordinates(self, cli_call, tmp_path):
+        assert cli_call('reverse', '--project-dir', str(tmp_path), '--lat', '34') == 1
+
+
 class TestCliLookupCall:
 
     @pytest.fixture(autouse=True)
@@ -168,3 +231,100 @@ def test_search(cli_call, tmp_path, capsys, monkeypatch, endpoint, params):
     assert 'address' not in out[0]
     assert 'extratags' not in out[0]
     assert 'namedetails' not in out[0]
+
+
+class TestCliSearchBatchCall:
+
+    @pytest.fixture(autouse=True)
+    def setup_search_batch_mock(self, monkeypatch):
+        self.queries = []
+
+        def _search_batch(_, queries, *args, **kwargs):
+            for query in queries:
+                self.queries.append(query)
+                if query:
+                    yield napi.SearchResults([
+                        napi.SearchResult(napi.SourceTable.PLACEX, ('place', 'thing'),
+                                          napi.Point(1.0, -3.0), place_id=len(self.queries),
+                                          names={'name':'Name', 'name:fr': 'Nom'})])
+                else:
+                    yield napi.SearchResults()
+
+        monkeypatch.setattr(napi.NominatimAPI, 'search_batch', _search_batch)
+
+
+    def test_search_batch_jsonl(self, cli_call, tmp_path, capsys):
+        infile = tmp_path / 'queries.jsonl'
+        infile.write_text('{"id": 1, "query": "Berlin"}\n'
+                          '{"id": 2, "city": "Paris", "country": "fr"}\n'
+                          '{"id": 3}\n')
+
+        result = cli_call('search', '--project-dir', str(tmp_path), '--batch', str(infile))
+
+        assert result == 0
+        assert self.queries == ['Berlin', {'city': 'Paris', 'country': 'fr'}, {}]
+
+        out = [json.loads(l) for l in capsys.readouterr().out.splitlines()]
+        assert [o['input']['id'] for o in out] == [1, 2, 3]
+        assert [len(o['results']) for o in out] == [1, 1, 0]
+        assert out[0]['results'][0]['name'] == 'Name'
+
+
+    def test_search_batch_csv_resume(self, cli_call, tmp_path):
+        infile = tmp_path / 'queries.csv'
+        infile.write_text('id,query\na,Berlin\nb,Paris\nc,Rome\n')
+        outfile = tmp_path / 'out.csv'
+        checkpoint = tmp_path / 'checkpoint.json'
+
+        params = ('search', '--project-dir', str(tmp_path), '--batch', str(infile),
+                  '--batch-output', 'csv', '--lang', 'fr',
+                  '--output-file', str(outfile), '--checkpoint', str(checkpoint))
+
+        assert cli_call(*params) == 0
+
+        lines = outfile.read_text().splitlines()
+        assert len(lines) == 4
+        assert lines[0].startswith('id,query,place_id')
+        assert lines[1].startswith('a,Berlin,1,')
+        assert ',Nom,' in lines[1]
+
+        # Pretend the job was interrupted after the first row.
+        state = json.loads(checkpoint.read_text())
+        assert state['rows'] == 3
+        offset = len(lines[0]) + len(lines[1]) + 4
+        checkpoint.write_text(json.dumps({'input': str(infile), 'rows': 1, 'offset': offset}))
+        self.queries.clear()
+
+        assert cli_call(*params) == 0
+
+        assert self.queries == ['Paris', 'Rome']
+        new_lines = outfile.read_text().splitlines()
+        assert len(new_lines) == 4
+        assert new_lines[:2] == lines[:2]
+        assert new_lines[2].startswith('b,Paris,1,')
+
+
+    def test_search_batch_resume_without_output_file(self, cli_call, tmp_path):
+        infile = tmp_path / 'queries.csv'
+        infile.write_text('id,query\na,Berlin\nb,Paris\n')
+        outfile = tmp_path / 'out.csv'
+        checkpoint = tmp_path / 'checkpoint.json'
+        checkpoint.write_text(json.dumps({'input': str(infile), 'rows': 1, 'offset': 30}))
+
+        assert cli_call('search', '--project-dir', str(tmp_path), '--batch', str(infile),
+                        '--batch-output', 'csv', '--output-file', str(outfile),
+                        '--checkpoint', str(checkpoint)) == 0
+
+        assert self.queries == ['Berlin', 'Paris']
+        lines = outfile.read_text().splitlines()
+        assert len(lines) == 3
+        assert lines[0].startswith('id,query,place_id')
+        assert json.loads(checkpoint.read_text())['rows'] == 2
+
+
+    def test_search_batch_checkpoint_needs_output_file(self, cli_call, tmp_path):
+        infile = tmp_path / 'queries.csv'
+        infile.write_text('query\nBerlin\n')
+
+        assert cli_call('search', '--project-dir', str(tmp_path), '--batch', str(infile),
+                        '--checkpoint', str(tmp_path / 'checkpoint.json')) == 1
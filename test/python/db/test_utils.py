@@ -112,6 +112,7 @@ class TestCopyBuffer:
         with db_utils.CopyBuffer() as buf:
             buf.add('foo\tbar')
             buf.add('sun\nson')
+            buf.add('moon\rson')
             buf.add('\\N')
 
             buf.copy_out(temp_db_cursor, self.TABLE_NAME,
@@ -119,6 +120,7 @@ class TestCopyBuffer:
 
         assert self.table_rows(temp_db_cursor) == {(None, 'foo\tbar'),
                                                    (None, 'sun\nson'),
+                                                   (None, 'moon\rson'),
                                                    (None, '\\N')}
 
 
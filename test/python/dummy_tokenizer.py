@@ -44,6 +44,10 @@ class DummyTokenizer:
         return DummyNameAnalyzer(self.analyser_cache)
 
 
+    def shared_analyzer_factory(self):
+        return self.name_analyzer
+
+
 class DummyNameAnalyzer:
 
     def __enter__(self):
@@ -79,3 +83,10 @@ class DummyNameAnalyzer:
     def process_place(place):
         assert isinstance(place, PlaceInfo)
         return {}
+
+    def process_places(self, places):
+        return [self.process_place(place) for place in places]
+
+    @staticmethod
+    def get_statistics():
+        return {}
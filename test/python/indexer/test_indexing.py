@@ -10,7 +10,7 @@ Tests for running the indexing.
 import itertools
 import pytest
 
-from nominatim.indexer import indexer
+from nominatim.indexer import indexer, checkpoints
 from nominatim.tokenizer import factory
 
 class IndexerTestDB:
@@ -104,14 +104,14 @@ class IndexerTestDB:
             return cur.fetchone()[0]
 
     def add_place(self, cls='place', typ='locality',
-                  rank_search=30, rank_address=30, sector=20):
+                  rank_search=30, rank_address=30, sector=20, partition=None):
         next_id = next(self.placex_id)
         with self.conn.cursor() as cur:
             cur.execute("""INSERT INTO placex
                               (place_id, class, type, rank_search, rank_address,
-                               indexed_status, geometry_sector)
-                              VALUES (%s, %s, %s, %s, %s, 1, %s)""",
-                        (next_id, cls, typ, rank_search, rank_address, sector))
+                               indexed_status, geometry_sector, partition)
+                              VALUES (%s, %s, %s, %s, %s, 1, %s, %s)""",
+                        (next_id, cls, typ, rank_search, rank_address, sector, partition))
         return next_id
 
     def add_admin(self, **kwargs):
@@ -251,6 +251,29 @@ def test_index_boundaries(test_db, threads, test_tokenizer):
                       WHERE indexed_status = 0 AND class != 'boundary'""") == 0
 
 
+@pytest.mark.parametrize("producers", [2, 5])
+def test_index_boundaries_by_partition(test_db, producers, test_tokenizer):
+    for partition in range(4):
+        for rank in range(4, 12):
+            for _ in range(partition + 1):
+                test_db.add_admin(rank_address=rank, rank_search=rank, partition=partition)
+    test_db.add_admin(rank_address=8, rank_search=8)
+    test_db.add_place(rank_address=8, rank_search=8, partition=1)
+
+    idx = indexer.Indexer('dbname=test_nominatim_python_unittest', test_tokenizer, 6,
+                          indexer.IndexerSettings(boundary_producers=producers))
+    assert idx.index_boundaries(0, 30) == 81
+
+    assert test_db.scalar("""SELECT count(*) FROM placex
+                             WHERE indexed_status > 0 AND class = 'boundary'""") == 0
+    assert test_db.placex_unindexed() == 1
+    # Within a partition, lower ranks must be done before higher ones.
+    assert test_db.scalar("""SELECT count(*) FROM placex p1, placex p2
+                             WHERE p1.partition = p2.partition
+                                   AND p1.rank_search < p2.rank_search
+                                   AND p1.indexed_date > p2.indexed_date""") == 0
+
+
 @pytest.mark.parametrize("threads", [1, 15])
 def test_index_postcodes(test_db, threads, test_tokenizer):
     for postcode in range(1000):
@@ -295,3 +318,221 @@ def test_index_reopen_connection(test_db, threads, monkeypatch, test_tokenizer):
     idx.index_by_rank(28, 30)
 
     assert test_db.placex_unindexed() == 0
+
+
+@pytest.mark.parametrize("processes", [1, 3])
+def test_index_with_analysis_processes(test_db, processes, test_tokenizer):
+    for rank in range(4, 10):
+        test_db.add_admin(rank_address=rank, rank_search=rank)
+    for _ in range(1000):
+        test_db.add_place(rank_address=30, rank_search=30)
+    test_db.add_osmline()
+
+    idx = indexer.Indexer('dbname=test_nominatim_python_unittest', test_tokenizer, 4,
+                          indexer.IndexerSettings(analysis_processes=processes))
+    idx.index_boundaries(0, 30)
+    idx.index_by_rank(0, 30)
+
+    assert test_db.placex_unindexed() == 0
+    assert test_db.osmline_unindexed() == 0
+    assert test_db.scalar("SELECT count(*) FROM placex WHERE token_info is null") == 0
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_index_with_copy_writer(test_db, threads, test_tokenizer):
+    for rank in range(26, 31):
+        for _ in range(50):
+            test_db.add_place(rank_address=rank, rank_search=rank)
+    place_id = test_db.add_place(rank_address=30, rank_search=30)
+    test_db.scalar(f"""UPDATE placex
+                       SET name = hstore(ARRAY['name', 'ref'], ARRAY['Au "Bon" \\ Coin', NULL])
+                       WHERE place_id = {place_id} RETURNING place_id""")
+
+    idx = indexer.Indexer('dbname=test_nominatim_python_unittest', test_tokenizer, threads,
+                          indexer.IndexerSettings(copy_chunk_size=30))
+    idx.index_by_rank(26, 30)
+
+    assert test_db.placex_unindexed() == 0
+    assert test_db.scalar("SELECT count(*) FROM placex WHERE token_info is null") == 0
+    assert test_db.scalar(f"SELECT name->'name' FROM placex WHERE place_id = {place_id}") \
+             == 'Au "Bon" \\ Coin'
+    assert test_db.scalar("""SELECT count(*) FROM pg_tables
+                             WHERE tablename LIKE 'tmp_placex_staging%'""") == 0
+
+
+def test_copy_writer_removes_leftover_tables(test_db, test_tokenizer):
+    for _ in range(10):
+        test_db.add_place(rank_address=30, rank_search=30)
+    with test_db.conn.cursor() as cur:
+        # Staging tables of a backend that does not exist anymore.
+        cur.execute("CREATE UNLOGGED TABLE tmp_placex_staging_999999999_0 (place_id BIGINT)")
+
+    idx = indexer.Indexer('dbname=test_nominatim_python_unittest', test_tokenizer, 2,
+                          indexer.IndexerSettings(copy_chunk_size=30))
+    idx.index_by_rank(30, 30)
+
+    assert test_db.placex_unindexed() == 0
+    assert test_db.scalar("""SELECT count(*) FROM pg_tables
+                             WHERE tablename LIKE 'tmp_placex_staging%'""") == 0
+
+
+@pytest.mark.parametrize("depth,max_batch", [(1, 100), (3, 100), (4, 400)])
+def test_index_with_prefetch(test_db, depth, max_batch, monkeypatch, test_tokenizer):
+    monkeypatch.setattr(indexer.PlaceFetcher, "ADAPT_INTERVAL", 1)
+    for rank in range(26, 31):
+        for _ in range(300):
+            test_db.add_place(rank_address=rank, rank_search=rank)
+    test_db.add_osmline()
+
+    idx = indexer.Indexer('dbname=test_nominatim_python_unittest', test_tokenizer, 2,
+                          indexer.IndexerSettings(prefetch_depth=depth,
+                                                  max_fetch_batch_size=max_batch))
+    idx.index_by_rank(26, 30)
+
+    assert test_db.placex_unindexed() == 0
+    assert test_db.osmline_unindexed() == 0
+
+
+def test_fetcher_adapt_batch_size(test_db):
+    with indexer.PlaceFetcher('dbname=test_nominatim_python_unittest', test_db.conn,
+                              max_batch_size=400) as fetcher:
+        for expected in (200, 400, 400):
+            for _ in range(fetcher.ADAPT_INTERVAL):
+                fetcher.wait_time += 1.0
+                fetcher.adapt_batch_size(0.0)
+            assert fetcher.batch_size == expected
+
+        for _ in range(fetcher.ADAPT_INTERVAL):
+            fetcher.adapt_batch_size(100.0)
+        assert fetcher.batch_size == 200
+
+
+@pytest.mark.parametrize("producers", [2, 3])
+def test_index_with_sector_ranges(test_db, producers, test_tokenizer):
+    for sector in range(50):
+        for _ in range(sector % 7 + 1):
+            test_db.add_place(rank_address=30, rank_search=30, sector=sector)
+    test_db.add_place(rank_address=30, rank_search=30, sector=None)
+    test_db.add_place(rank_address=29, rank_search=29)
+
+    idx = indexer.Indexer('dbname=test_nominatim_python_unittest', test_tokenizer, 6,
+                          indexer.IndexerSettings(sector_ranges=producers))
+    idx.index_by_rank(29, 30)
+
+    assert test_db.placex_unindexed() == 0
+
+
+def test_index_with_checkpoints_resumes(test_db, test_tokenizer):
+    for _ in range(40):
+        test_db.add_place(rank_address=30, rank_search=30)
+
+    with checkpoints.IndexingCheckpoints('dbname=test_nominatim_python_unittest') as store:
+        store.save('rank 30', 100, 60)
+
+    idx = indexer.Indexer('dbname=test_nominatim_python_unittest', test_tokenizer, 4,
+                          indexer.IndexerSettings(checkpoints=True))
+    idx.index_by_rank(30, 30)
+
+    assert test_db.placex_unindexed() == 0
+    assert test_db.scalar("""SELECT done FROM indexer_checkpoints
+                             WHERE runner = 'rank 30' and finished""") == 100
+
+
+@pytest.mark.parametrize("pending", [0, 5])
+def test_index_with_checkpoints_finished(test_db, test_tokenizer, pending):
+    for _ in range(pending):
+        test_db.add_place(rank_address=29, rank_search=29)
+    test_db.add_place(rank_address=30, rank_search=30)
+
+    with checkpoints.IndexingCheckpoints('dbname=test_nominatim_python_unittest') as store:
+        store.save('rank 29', 10, 10, finished=True)
+
+    idx = indexer.Indexer('dbname=test_nominatim_python_unittest', test_tokenizer, 4,
+                          indexer.IndexerSettings(checkpoints=True))
+    idx.index_by_rank(29, 30)
+
+    assert test_db.placex_unindexed() == 0
+    assert test_db.scalar("""SELECT total FROM indexer_checkpoints
+                             WHERE runner = 'rank 29' and finished""") == (pending or 10)
+
+
+def test_index_full_clears_checkpoints(test_db, test_tokenizer):
+    for rank in range(4, 31):
+        test_db.add_place(rank_address=rank, rank_search=rank)
+
+    idx = indexer.Indexer('dbname=test_nominatim_python_unittest', test_tokenizer, 4,
+                          indexer.IndexerSettings(checkpoints=True))
+    idx.index_full(analyse=False)
+
+    assert test_db.placex_unindexed() == 0
+    assert test_db.scalar("SELECT count(*) FROM indexer_checkpoints") == 0
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_index_collects_metrics(test_db, processes, test_tokenizer):
+    for rank in range(26, 31):
+        for _ in range(10):
+            test_db.add_place(rank_address=rank, rank_search=rank)
+
+    metrics = indexer.IndexerMetrics()
+    idx = indexer.Indexer('dbname=test_nominatim_python_unittest', test_tokenizer, 2,
+                          indexer.IndexerSettings(analysis_processes=processes),
+                          metrics=metrics)
+    idx.index_by_rank(26, 30)
+
+    report = metrics.report()
+    steps = {s['name']: s for s in report['steps']}
+
+    assert report['places'] == 50
+    assert steps['rank 30']['places'] == 10
+    assert steps['rank 30']['finished']
+    assert steps['rank 30']['slowest_batches']
+    assert sum(steps['rank 26']['worker_rows_per_second']) > 0
+
+
+@pytest.mark.parametrize("threads", [1, 15])
+def test_index_with_estimated_counts(test_db, threads, test_tokenizer):
+    for rank in range(31):
+        test_db.add_place(rank_address=rank, rank_search=rank)
+    for _ in range(300):
+        test_db.add_place(rank_address=30, rank_search=30)
+    test_db.add_osmline()
+    test_db.add_postcode('de', '12345')
+
+    idx = indexer.Indexer('dbname=test_nominatim_python_unittest', test_tokenizer, threads,
+                          indexer.IndexerSettings(estimate_counts=True))
+    assert idx.index_by_rank(0, 30) == 332
+    assert idx.index_postcodes() == 1
+
+    assert test_db.placex_unindexed() == 0
+    assert test_db.osmline_unindexed() == 0
+
+
+def test_progress_refine_estimated_total():
+    progress = indexer.ProgressLogger('test', 10, estimated=True)
+
+    progress.refine_total(5, False)
+    assert progress.total_places == 10
+
+    progress.refine_total(20, False)
+    assert progress.total_places == 22
+    assert progress.estimated
+
+    progress.refine_total(25, True)
+    assert progress.total_places == 25
+    assert not progress.estimated
+
+
+def test_settings_from_config(def_config, monkeypatch):
+    monkeypatch.setenv('NOMINATIM_INDEXER_SECTOR_RANGES', '4')
+    monkeypatch.setenv('NOMINATIM_INDEXER_CHECKPOINTS', 'yes')
+
+    settings = indexer.IndexerSettings.from_config(def_config)
+
+    assert settings.sector_ranges == 4
+    assert settings.checkpoints
+    assert settings.copy_chunk_size == indexer.IndexerSettings().copy_chunk_size
+
+
+def test_settings_defaults_match_config(def_config):
+    assert indexer.IndexerSettings.from_config(def_config) == indexer.IndexerSettings()
@@ -0,0 +1,95 @@
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Tests for the collection of indexing metrics.
+"""
+import io
+import json
+
+from nominatim.indexer.metrics import IndexerMetrics, RunnerMetrics, statistics_delta
+
+
+def test_statistics_delta():
+    assert statistics_delta({'a': 1, 'b': 2.0}, {'a': 3, 'b': 2.0, 'c': 1}) \
+             == {'a': 2, 'c': 1}
+
+
+def test_runner_metrics_slowest_batches(monkeypatch):
+    monkeypatch.setattr(RunnerMetrics, 'NUM_SLOWEST_BATCHES', 2)
+    metrics = RunnerMetrics('test')
+
+    metrics.add_batch([1, 2, 3], 0.5)
+    metrics.add_batch([10, 4], 2.0)
+    metrics.add_batch([7], 1.0)
+    metrics.add_batch([], 10.0)
+
+    report = metrics.to_dict()
+
+    assert report['places'] == 6
+    assert report['batches'] == 3
+    assert report['slowest_batches'] == [
+        {'time': 2.0, 'first_place_id': 4, 'last_place_id': 10, 'places': 2},
+        {'time': 1.0, 'first_place_id': 7, 'last_place_id': 7, 'places': 1}]
+
+
+def test_runner_metrics_analyzer_statistics():
+    metrics = RunnerMetrics('test')
+
+    metrics.add_analysis(1.5, {'name_cache_hits': 3, 'name_cache_misses': 1})
+    metrics.add_analysis(0.5, {'name_cache_hits': 3, 'sanitizer_time': 0.25})
+
+    report = metrics.to_dict()
+
+    assert report['analysis_time'] == 2.0
+    assert report['analyzer'] == {'name_cache_hits': 6, 'name_cache_misses': 1,
+                                  'name_cache_hit_rate': 0.8571, 'sanitizer_time': 0.25}
+
+
+def test_runner_metrics_workers():
+    metrics = RunnerMetrics('test')
+    worker1, worker2 = object(), object()
+
+    metrics.add_worker_rows(worker1, 10)
+    metrics.add_worker_rows(worker2, 5)
+    metrics.add_worker_rows(worker1, 10)
+    metrics.finish()
+
+    rates = metrics.to_dict()['worker_rows_per_second']
+
+    assert len(rates) == 2
+    assert rates[0] >= rates[1]
+
+
+def test_indexer_metrics_report():
+    metrics = IndexerMetrics()
+    metrics.start_runner('rank 1').add_batch([1, 2], 0.1)
+    metrics.start_runner('rank 2').add_batch([3], 0.1)
+
+    report = metrics.report()
+
+    assert report['places'] == 3
+    assert [s['name'] for s in report['steps']] == ['rank 1', 'rank 2']
+
+
+def test_indexer_metrics_stream():
+    stream = io.StringIO()
+    metrics = IndexerMetrics(stream, interval=0.0001)
+    metrics.next_snapshot = 0
+
+    metrics.tick()
+    metrics.write(stream)
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    assert [line['type'] for line in lines] == ['snapshot', 'report']
+
+
+def test_indexer_metrics_no_stream():
+    metrics = IndexerMetrics(None, interval=1)
+    metrics.next_snapshot = 0
+
+    metrics.tick()
@@ -0,0 +1,98 @@
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Tests for splitting ranks into ranges of geometry sectors.
+"""
+import pytest
+
+from nominatim.indexer.sector_ranges import SectorRange, SectorRangeQueue, split_sectors
+
+
+def _as_tuples(ranges):
+    return [(r.first, r.last) for r in ranges]
+
+
+def test_split_sectors_empty():
+    assert split_sectors([], 4) == []
+
+
+@pytest.mark.parametrize('num', [1, 2, 5, 20])
+def test_split_sectors_covers_all(num):
+    counts = [(s, s % 5 + 1) for s in range(10, 110)]
+
+    ranges = _as_tuples(split_sectors(counts, num))
+
+    assert len(ranges) <= num
+    assert ranges[0][0] == 10
+    assert ranges[-1][1] == 109
+    for prev, cur in zip(ranges, ranges[1:]):
+        assert cur[0] == prev[1] + 1
+
+
+def test_split_sectors_balanced():
+    counts = [(1, 100), (2, 1), (3, 1), (4, 100), (5, 1), (6, 1)]
+
+    assert _as_tuples(split_sectors(counts, 2)) == [(1, 3), (4, 6)]
+
+
+def test_range_take_within_range():
+    srange = SectorRange(10, 20)
+
+    rows, at_end = srange.take([(1, 10), (2, 12)])
+
+    assert rows == [(1, 10), (2, 12)]
+    assert not at_end
+    assert srange.remaining() == 8
+
+
+def test_range_split_and_take():
+    srange = SectorRange(10, 20)
+    srange.take([(1, 10), (2, 12)])
+
+    stolen = srange.split()
+
+    assert (stolen.first, stolen.last) == (17, 20)
+    assert srange.last == 16
+
+    rows, at_end = srange.take([(3, 16), (4, 17), (5, 18)])
+    assert rows == [(3, 16)]
+    assert at_end
+
+
+def test_range_split_too_small():
+    srange = SectorRange(10, 11)
+    srange.take([(1, 10)])
+
+    assert srange.split() is None
+
+
+def test_queue_steals_from_largest_range():
+    queue = SectorRangeQueue([SectorRange(0, 9), SectorRange(10, 99)])
+
+    first = queue.next_range()
+    second = queue.next_range()
+    stolen = queue.next_range()
+
+    assert (first.first, first.last) == (0, 9)
+    assert (second.first, second.last) == (10, 54)
+    assert (stolen.first, stolen.last) == (55, 99)
+
+
+def test_queue_empty_after_done():
+    queue = SectorRangeQueue([SectorRange(0, 1)])
+
+    srange = queue.next_range()
+    queue.done(srange)
+
+    assert queue.next_range() is None
+
+
+def test_queue_cancel():
+    queue = SectorRangeQueue([SectorRange(0, 9)])
+    queue.cancel()
+
+    assert queue.next_range() is None
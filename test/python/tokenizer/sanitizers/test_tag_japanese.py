@@ -63,3 +63,8 @@ class TestTagJapanese:
     def test_neighbourhood_quarter(self):
         res = self.run_sanitizer_on('address', neighbourhood='8',quarter='kase')
         assert res == [('kase-8','place')] 
+
+    def test_kanji_numerals(self):
+        res = self.run_sanitizer_on('address', block_number='二十三', housenumber='１２',
+                                    quarter='千代田')
+        assert res == [('23-12','housenumber'),('千代田','place')]
@@ -185,6 +185,36 @@ def test_init_from_project(test_config, tokenizer_factory):
     assert tok.loader is not None
 
 
+def test_init_from_project_reuses_analysis(test_config, tokenizer_factory, monkeypatch):
+    tok = tokenizer_factory()
+    tok.init_new_db(test_config)
+
+    setups = []
+    orig_setup = nominatim.tokenizer.icu_rule_loader.ICURuleLoader._setup_analysis
+    def _setup(self):
+        setups.append(1)
+        orig_setup(self)
+    monkeypatch.setattr(nominatim.tokenizer.icu_rule_loader.ICURuleLoader,
+                        '_setup_analysis', _setup)
+
+    tok = tokenizer_factory()
+    tok.init_from_project(test_config)
+
+    assert len(setups) == 1
+
+
+def test_shared_analyzer_factory(test_config, tokenizer_factory):
+    tok = tokenizer_factory()
+    tok.init_new_db(test_config)
+
+    make_analyzer = tok.shared_analyzer_factory()
+
+    with make_analyzer() as ana1, make_analyzer() as ana2:
+        assert ana1 is not ana2
+        assert ana1.token_analysis is ana2.token_analysis
+        assert ana1.sanitizer is ana2.sanitizer
+
+
 def test_update_sql_functions(db_prop, temp_db_cursor,
                               tokenizer_factory, test_config, table_factory,
                               monkeypatch):
@@ -597,6 +627,41 @@ class TestPlaceAddress:
         assert 'addr' not in info
 
 
+    def test_process_places_same_as_single(self, word_table, getorcreate_hnr_id):
+        places = [PlaceInfo({'name': {'name': 'Grand Road'}}),
+                  PlaceInfo({'address': {'street': 'Grand Road', 'housenumber': '45',
+                                         'postcode': '12345', 'city': 'Zwickau'}}),
+                  PlaceInfo({'address': {'housenumber': '45;46', 'place': 'Honu Lulu'}})]
+
+        infos = self.analyzer.process_places(places)
+
+        assert len(infos) == 3
+        assert eval(infos[1]['street']) == self.name_token_set('#Grand Road')
+        assert eval(infos[1]['addr']['city']) == self.name_token_set('ZWICKAU')
+        assert eval(infos[2]['place']) == self.name_token_set('HONU', 'LULU')
+        assert word_table.get_postcodes() == {'12345'}
+        # All tokens are now cached, so single processing yields the same.
+        assert [self.analyzer.process_place(p) for p in places] == infos
+
+
+    def test_process_places_empty(self):
+        assert self.analyzer.process_places([]) == []
+
+
+    def test_process_places_statistics(self, word_table, getorcreate_hnr_id):
+        places = [PlaceInfo({'address': {'street': 'Grand Road', 'city': 'Zwickau'}}),
+                  PlaceInfo({'address': {'street': 'Grand Road', 'city': 'Zwickau'}})]
+
+        self.analyzer.process_places(places)
+        stats = self.analyzer.get_statistics()
+
+        assert stats['street_cache_misses'] == 1
+        assert stats['street_cache_hits'] == 1
+        assert stats['partial_cache_misses'] == 1
+        assert stats['partial_cache_hits'] == 1
+        assert stats['sanitizer_time'] >= 0
+
+
 class TestPlaceHousenumberWithAnalyser:
 
     @pytest.fixture(autouse=True)
@@ -658,6 +723,34 @@ class TestPlaceHousenumberWithAnalyser:
         assert eval(info['hnr_tokens']) == {-3}
 
 
+class TestAnalyzerTokenCache:
+
+    def test_preload_from_word_table(self, analyzer, word_table, temp_db_cursor):
+        word_table.add_full_word(1000, 'hauptstr')
+        temp_db_cursor.execute("""INSERT INTO word (word_id, word_token, type, info)
+                                  VALUES (1001, 'hauptstr', 'w', '{"count": 4}'::jsonb)""")
+        word_table.add_housenumber(2000, '45')
+        word_table.add_postcode(' 12345', '12345')
+
+        with analyzer() as anl:
+            with anl.conn.cursor() as cur:
+                anl._cache.preload(cur, 10, False)
+
+            assert anl._cache.names == {'hauptstr': (1000, [1001])}
+            assert anl._cache.partials == {'hauptstr': 1001}
+            assert anl._cache.fulls == {'hauptstr': [1000]}
+            assert anl._cache.housenumbers == {'45': (2000, '45')}
+            assert anl._cache.postcodes == {'12345'}
+
+
+    def test_snapshot_on_close(self, analyzer, tmp_path):
+        with analyzer() as anl:
+            anl.cache_file = tmp_path / 'cache.gz'
+            anl._cache.partials['haupt'] = 2
+
+        assert (tmp_path / 'cache.gz').exists()
+
+
 class TestUpdateWordTokens:
 
     @pytest.fixture(autouse=True)
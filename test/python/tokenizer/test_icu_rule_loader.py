@@ -136,6 +136,19 @@ class TestIcuRuleLoader:
         assert trans.transliterate(" axxt ") == " byt "
 
 
+    def test_rules_hash(self, monkeypatch):
+        self.config_rules('~street => s,st')
+        loader = ICURuleLoader(self.project_env)
+
+        assert loader.get_rules_hash() == ICURuleLoader(self.project_env).get_rules_hash()
+
+        self.config_rules('~street => str')
+        # Make sure that the changed file is read again.
+        monkeypatch.setattr('nominatim.config.CONFIG_CACHE', {})
+
+        assert loader.get_rules_hash() != ICURuleLoader(self.project_env).get_rules_hash()
+
+
     def test_search_rules(self):
         self.config_rules('~street => s,st', 'master => mstr')
         proc = ICURuleLoader(self.project_env).make_token_analysis()
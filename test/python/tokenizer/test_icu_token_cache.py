@@ -0,0 +1,97 @@
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Tests for the token cache of the ICU tokenizer.
+"""
+import pytest
+
+from nominatim.tokenizer.icu_token_cache import TokenCache
+
+
+def test_check_counts_lookups():
+    cache = TokenCache()
+    cache.partials['haupt'] = 2
+
+    assert cache.check('partial', 'haupt', set())
+    assert cache.check('partial', 'neben', {'neben'})
+    assert not cache.check('partial', 'neben', set())
+    assert not cache.check('street', 'haupt', set())
+
+    assert cache.statistics == {'partial_cache_hits': 2, 'partial_cache_misses': 1,
+                                'street_cache_misses': 1}
+
+
+def test_trim_unlimited():
+    cache = TokenCache()
+    cache.partials.update((str(i), i) for i in range(100))
+
+    cache.trim()
+
+    assert len(cache.partials) == 100
+
+
+def test_trim_keeps_newest():
+    cache = TokenCache(max_size=10)
+    cache.partials.update((str(i), i) for i in range(11))
+    cache.postcodes.update(str(i) for i in range(11))
+    cache.fulls['a'] = [1]
+
+    cache.trim()
+
+    assert cache.partials == {str(i): i for i in range(6, 11)}
+    assert len(cache.postcodes) == 5
+    assert cache.fulls == {'a': [1]}
+
+
+def test_snapshot_roundtrip(tmp_path):
+    cache = TokenCache()
+    cache.names['hauptstr'] = (1, [2, 3])
+    cache.partials['haupt'] = 2
+    cache.fulls['HAUPTSTR'] = [1]
+    cache.postcodes.add('12345')
+    cache.housenumbers['45'] = (4, '45')
+
+    cache.save(tmp_path / 'cache.gz', (1, 100))
+
+    loaded = TokenCache()
+    assert loaded.load(tmp_path / 'cache.gz', (1, 120))
+
+    assert loaded.names == cache.names
+    assert loaded.partials == cache.partials
+    assert loaded.fulls == cache.fulls
+    assert loaded.postcodes == cache.postcodes
+    assert loaded.housenumbers == cache.housenumbers
+
+
+def test_snapshot_skips_missing_streets(tmp_path):
+    cache = TokenCache()
+    cache.fulls['HAUPTSTR'] = [1]
+    cache.fulls['NEBENSTR'] = []
+
+    cache.save(tmp_path / 'cache.gz', (1, 100))
+
+    loaded = TokenCache()
+    assert loaded.load(tmp_path / 'cache.gz', (1, 100))
+    assert loaded.fulls == {'HAUPTSTR': [1]}
+
+
+@pytest.mark.parametrize('fingerprint', [(2, 100), (1, 99)])
+def test_snapshot_outdated(tmp_path, fingerprint):
+    cache = TokenCache()
+    cache.partials['haupt'] = 2
+    cache.save(tmp_path / 'cache.gz', (1, 100))
+
+    loaded = TokenCache()
+    assert not loaded.load(tmp_path / 'cache.gz', fingerprint)
+    assert len(loaded) == 0
+
+
+def test_snapshot_broken_file(tmp_path):
+    (tmp_path / 'cache.gz').write_text('nonsense')
+
+    cache = TokenCache()
+    assert not cache.load(tmp_path / 'cache.gz', (1, 100))
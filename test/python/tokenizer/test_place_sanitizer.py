@@ -12,6 +12,7 @@ import pytest
 from nominatim.errors import UsageError
 import nominatim.tokenizer.place_sanitizer as sanitizer
 from nominatim.data.place_info import PlaceInfo
+from nominatim.tokenizer.sanitizers.base import ProcessInfo, StepFilter
 
 
 def test_placeinfo_clone_new_name():
@@ -75,3 +76,50 @@ def test_sanitizer_empty_list(def_config, rules):
 def test_sanitizer_missing_step_definition(def_config):
     with pytest.raises(UsageError):
         san = sanitizer.PlaceSanitizer([{'id': 'split-name-list'}], def_config)
+
+
+@pytest.mark.parametrize('step_filter,country,names,address,result',
+                         [(StepFilter(), None, {}, {}, True),
+                          (StepFilter(countries=frozenset(('jp', ))), 'jp', {}, {}, True),
+                          (StepFilter(countries=frozenset(('jp', ))), 'de', {}, {}, False),
+                          (StepFilter(needs_names=True), None, {}, {'street': 'x'}, False),
+                          (StepFilter(needs_names=True), None, {'name': 'A'}, {}, True),
+                          (StepFilter(needs_address=True), None, {'name': 'A'}, {}, False),
+                          (StepFilter(address_kinds=frozenset(('postcode', ))),
+                           None, {}, {'street': 'x'}, False),
+                          (StepFilter(address_kinds=frozenset(('postcode', ))),
+                           None, {}, {'postcode': '123'}, True)])
+def test_step_filter_matches(step_filter, country, names, address, result):
+    obj = ProcessInfo(PlaceInfo({'country_code': country, 'name': names,
+                                 'address': address}))
+
+    assert step_filter.matches(obj) == result
+
+
+def test_sanitizer_skips_filtered_steps(def_config):
+    san = sanitizer.PlaceSanitizer([{'step': 'split-name-list'},
+                                    {'step': 'tag-japanese'},
+                                    {'step': 'split-name-list'}],
+                                   def_config, statistics=True)
+
+    san.process_names(PlaceInfo({'country_code': 'de', 'name': {'name': 'A;B'}}))
+    san.process_names(PlaceInfo({'country_code': 'jp', 'name': {'name': 'A'}}))
+    san.process_names(PlaceInfo({'country_code': 'jp'}))
+
+    stats = san.get_statistics()
+
+    assert stats['sanitizer_split_name_list_calls'] == 2
+    assert stats['sanitizer_split_name_list_skipped'] == 1
+    assert stats['sanitizer_tag_japanese_calls'] == 2
+    assert stats['sanitizer_tag_japanese_skipped'] == 1
+    assert stats['sanitizer_split_name_list_2_calls'] == 2
+    assert stats['sanitizer_tag_japanese_time'] >= 0
+
+
+def test_sanitizer_without_statistics(def_config):
+    san = sanitizer.PlaceSanitizer([{'step': 'split-name-list'}], def_config)
+
+    name, _ = san.process_names(PlaceInfo({'name': {'name': 'A;B'}}))
+
+    assert len(name) == 2
+    assert san.get_statistics() == {}
@@ -118,6 +118,38 @@ def test_variants_only(rules, name, variants):
     assert set(get_normalized_variants(proc, name)) == variants
 
 
+class TestVariantCache:
+
+    def test_repeated_names_are_memoized(self):
+        proc = make_analyser('street -> st')
+
+        first = get_normalized_variants(proc, 'Main Street')
+        proc.to_ascii = None # must not be used again
+
+        assert get_normalized_variants(proc, 'Main Street') == first
+
+
+    def test_result_is_a_copy(self):
+        proc = make_analyser('street -> st')
+
+        get_normalized_variants(proc, 'Main Street').append('garbage')
+
+        assert 'garbage' not in get_normalized_variants(proc, 'Main Street')
+
+
+    def test_caches_are_bounded(self, monkeypatch):
+        monkeypatch.setattr(module.GenericTokenAnalysis, 'VARIANT_CACHE_SIZE', 4)
+        monkeypatch.setattr(module.GenericTokenAnalysis, 'TRANSLITERATION_CACHE_SIZE', 6)
+        proc = make_analyser('street -> st')
+
+        for i in range(20):
+            assert set(get_normalized_variants(proc, f'Street {i}')) \
+                     == {f'street {i}', f'st {i}'}
+
+        assert len(proc._variants) <= 4
+        assert len(proc._transliterations) <= 6
+
+
 class TestGetReplacements:
 
     @staticmethod
@@ -0,0 +1,58 @@
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# This file is part of Nominatim. (https://nominatim.org)
+#
+# Copyright (C) 2023 by the Nominatim developer community.
+# For a full list of authors see the git log.
+"""
+Tests for the normalization of numbers in Japanese addresses.
+"""
+import pytest
+
+from nominatim.utils.japanese import normalize_numbers
+
+@pytest.mark.parametrize('text,result',
+                         [('', ''),
+                          ('丸の内', '丸の内'),
+                          ('三丁目', '3丁目'),
+                          ('一二三', '123'),
+                          ('零〇', '00'),
+                          ('１－２', '1－2'),
+                          ('丸の内１２３', '丸の内123')])
+def test_digits(text, result):
+    assert normalize_numbers(text) == result
+
+
+@pytest.mark.parametrize('text,result',
+                         [('十一', '11'),
+                          ('二十', '20'),
+                          ('二十三', '23'),
+                          ('百五', '105'),
+                          ('三百', '300'),
+                          ('千二百三十四', '1234'),
+                          ('二千二十三', '2023'),
+                          ('二十三丁目', '23丁目'),
+                          ('三条十二丁目', '3条12丁目')])
+def test_numerals(text, result):
+    assert normalize_numbers(text) == result
+
+
+@pytest.mark.parametrize('text,result',
+                         [('千代田区', '千代田区'),
+                          ('十日町市', '十日町市'),
+                          ('百合ヶ丘', '百合ヶ丘'),
+                          ('十丁目', '10丁目'),
+                          ('十番地', '10番地'),
+                          ('十-3', '10-3'),
+                          ('北十', '北10')])
+def test_single_multiplier(text, result):
+    assert normalize_numbers(text) == result
+
+
+def test_full_address():
+    assert normalize_numbers('東京都千代田区丸の内二丁目７－３') \
+             == '東京都千代田区丸の内2丁目7－3'
+
+
+def test_mixed_digits():
+    assert normalize_numbers('二十３') == '203'